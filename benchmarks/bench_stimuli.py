@@ -0,0 +1,108 @@
+"""Per-frame update costs of the visigoth stimuli.
+
+Benchmarks follow the airspeed velocity conventions: ``setup`` is called
+with each combination of ``params`` before timing the ``time_*`` methods.
+Classes with ``frame_budget = True`` measure work that happens on every
+screen refresh and are checked against the frame budget by ``run.py``.
+
+"""
+import numpy as np
+
+from common import make_window
+
+
+class RandomDotMotion(object):
+
+    params = [[16.7, 50, 100], [5, 10, 20]]
+    param_names = ["density", "aperture"]
+    frame_budget = True
+
+    def setup(self, density, aperture):
+
+        from visigoth.stimuli import RandomDotMotion
+        np.random.seed(0)
+        self.stim = RandomDotMotion(make_window(), density=density,
+                                    aperture=aperture)
+
+    def time_update(self, density, aperture):
+
+        self.stim.update(0, .5)
+
+
+class RandomDotColorMotion(object):
+
+    params = [[16.7, 50, 100], [5, 10, 20]]
+    param_names = ["density", "aperture"]
+    frame_budget = True
+
+    def setup(self, density, aperture):
+
+        from visigoth.stimuli import RandomDotColorMotion
+        np.random.seed(0)
+        self.stim = RandomDotColorMotion(make_window(), density=density,
+                                         aperture=aperture)
+
+    def time_update(self, density, aperture):
+
+        self.stim.update(0, .5, 180, .5)
+
+
+class Noise(object):
+
+    params = [["gaussian", "uniform"], [2, 5, 10], [20, 40]]
+    param_names = ["kind", "size", "pix_per_deg"]
+    frame_budget = True
+
+    def setup(self, kind, size, pix_per_deg):
+
+        from visigoth.stimuli import GaussianNoise, UniformNoise
+        klass = dict(gaussian=GaussianNoise, uniform=UniformNoise)[kind]
+        self.stim = klass(make_window(), size=size, pix_per_deg=pix_per_deg)
+        self.rng = np.random.RandomState(0)
+
+    def time_update(self, kind, size, pix_per_deg):
+
+        self.stim.update(self.rng)
+
+
+class Pattern(object):
+
+    params = [[2, 4, 8, 16]]
+    param_names = ["n"]
+    frame_budget = True
+
+    def setup(self, n):
+
+        from visigoth.stimuli import Pattern
+        self.stim = Pattern(make_window(), n, sfs=2, sizes=5)
+        self.rng = np.random.RandomState(0)
+
+    def time_randomize_phases(self, n):
+
+        self.stim.randomize_phases(self.rng)
+
+    def time_counterphase(self, n):
+
+        self.stim.counterphase()
+
+
+class PointsColor(object):
+
+    params = [[2, 8, 32]]
+    param_names = ["n"]
+    frame_budget = True
+
+    def setup(self, n):
+
+        from visigoth.stimuli import Points
+        pos = [(i, 0) for i in range(n)]
+        self.stim = Points(make_window(), pos)
+        self.colors = [(1, -1, -1)] * n
+
+    def time_set_single_color(self, n):
+
+        self.stim.color = (-1, 1, -1)
+
+    def time_set_color_list(self, n):
+
+        self.stim.color = self.colors
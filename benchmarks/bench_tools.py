@@ -0,0 +1,42 @@
+"""Costs of the visigoth.tools sampling helpers."""
+import numpy as np
+from scipy import stats
+
+from visigoth.tools import flexible_values, truncated_sample
+
+
+class FlexibleValues(object):
+
+    params = [["scalar", "list", "dist"], [None, 10, 1000, 100000]]
+    param_names = ["spec", "size"]
+
+    specs = dict(scalar=2,
+                 list=[.5, 1, 2, 4],
+                 dist=("truncexpon", 3, .2, .1))
+
+    def setup(self, spec, size):
+
+        self.val = self.specs[spec]
+        self.rng = np.random.RandomState(0)
+
+    def time_flexible_values(self, spec, size):
+
+        flexible_values(self.val, size, self.rng)
+
+    def time_flexible_values_limited(self, spec, size):
+
+        flexible_values(self.val, size, self.rng, min=.3, max=3)
+
+
+class TruncatedSample(object):
+
+    params = [[None, 10, 1000, 100000], [1, .5]]
+    param_names = ["size", "limit"]
+
+    def setup(self, size, limit):
+
+        self.rv = stats.norm(0, 1)
+
+    def time_truncated_sample(self, size, limit):
+
+        truncated_sample(self.rv, size, -limit, limit)
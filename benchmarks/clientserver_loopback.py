@@ -0,0 +1,258 @@
+"""Loopback benchmark of the experiment/remote socket protocol.
+
+A SocketServerThread and a SocketClientThread are connected over localhost
+and driven the way the Experiment and RemoteApp drive them. The benchmark
+measures:
+
+- screen message latency (from the experiment queue to the remote queue)
+  at several send rates and payload sizes
+- trial message throughput for a burst of messages
+- round-trip time of a server-initiated param sync and a client param fetch
+- the CPU time used by the server and client threads, as a share of one core
+
+Usage::
+
+    python benchmarks/clientserver_loopback.py [--rates 60,144,500,1000]
+        [--sizes 100,1000,10000] [--duration 2] [--json FILE]
+
+"""
+import sys
+import json
+import time
+import queue
+import argparse
+import platform
+import threading
+
+import numpy as np
+
+from visigoth import clientserver
+from visigoth.ext.bunch import Bunch
+
+
+def thread_cpu_time(thread):
+    """Return the CPU time (in seconds) used so far by another thread."""
+    try:
+        clock = time.pthread_getcpuclockid(thread.ident)
+        return time.clock_gettime(clock)
+    except (AttributeError, OSError):
+        return np.nan
+
+
+class Loopback(object):
+    """Connected server and client threads with the queues that feed them."""
+    def __init__(self, params=None):
+
+        self.exp = Bunch(cmd_q=queue.Queue(), param_q=queue.Queue(),
+                         trial_q=queue.Queue(), screen_q=queue.Queue(),
+                         p=Bunch({} if params is None else params))
+        self.remote = Bunch(cmd_q=queue.Queue(), param_q=queue.Queue(),
+                            trial_q=queue.Queue(), screen_q=queue.Queue(),
+                            host="localhost")
+
+        self.server = clientserver.SocketServerThread(self.exp, port=0)
+        self.server.start()
+        self.client = clientserver.SocketClientThread(self.remote,
+                                                      self.server.port)
+        self.client.start()
+
+        while not self.server.connected:
+            time.sleep(.001)
+
+    def close(self):
+
+        self.client.join()
+        self.server.join()
+
+    def cpu_times(self):
+        return thread_cpu_time(self.server), thread_cpu_time(self.client)
+
+
+class CPUMeter(object):
+    """Context manager measuring thread CPU use as a share of wall time."""
+    def __init__(self, loopback):
+
+        self.loopback = loopback
+
+    def __enter__(self):
+
+        self.start_wall = time.perf_counter()
+        self.start_cpu = self.loopback.cpu_times()
+        return self
+
+    def __exit__(self, *args):
+
+        wall = time.perf_counter() - self.start_wall
+        end_cpu = self.loopback.cpu_times()
+        server, client = np.subtract(end_cpu, self.start_cpu) / wall
+        self.result = dict(server_cpu_share=server, client_cpu_share=client)
+
+
+def summarize_latency(latencies):
+
+    latencies = np.asarray(latencies) * 1000
+    if not latencies.size:
+        return dict(n=0)
+    pcts = np.percentile(latencies, [50, 90, 99])
+    return dict(n=int(latencies.size),
+                mean_ms=float(latencies.mean()),
+                p50_ms=float(pcts[0]),
+                p90_ms=float(pcts[1]),
+                p99_ms=float(pcts[2]),
+                max_ms=float(latencies.max()))
+
+
+def screen_latency(loopback, rate, size, duration):
+    """Send timestamped screen messages at a fixed rate."""
+    padding = "x" * max(size - 40, 0)
+    latencies = []
+    received = []
+
+    def consume():
+        while not done.is_set() or not loopback.remote.screen_q.empty():
+            try:
+                data = loopback.remote.screen_q.get(timeout=.05)
+            except queue.Empty:
+                continue
+            now = time.perf_counter()
+            latencies.append(now - json.loads(data)["t"])
+            received.append(now)
+
+    done = threading.Event()
+    consumer = threading.Thread(target=consume)
+    consumer.start()
+
+    interval = 1 / rate
+    n_messages = int(duration * rate)
+    with CPUMeter(loopback) as meter:
+        start = time.perf_counter()
+        for i in range(n_messages):
+            deadline = start + i * interval
+            delay = deadline - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            msg = json.dumps(dict(t=time.perf_counter(), pad=padding))
+            loopback.exp.screen_q.put(msg)
+
+        # Give the pipeline a moment to drain
+        time.sleep(.25)
+        backlog = loopback.exp.screen_q.qsize()
+        done.set()
+        consumer.join()
+
+    res = dict(rate=rate, payload=len(msg), sent=n_messages,
+               received=len(received), backlog=backlog)
+    res.update(summarize_latency(latencies))
+    res.update(meter.result)
+    return res
+
+
+def trial_throughput(loopback, size, n_messages):
+    """Send a burst of trial messages and time how long they take."""
+    msg = "x" * size
+    with CPUMeter(loopback) as meter:
+        start = time.perf_counter()
+        for _ in range(n_messages):
+            loopback.exp.trial_q.put(msg)
+        for _ in range(n_messages):
+            loopback.remote.trial_q.get()
+        elapsed = time.perf_counter() - start
+
+    res = dict(payload=size, messages=n_messages, seconds=elapsed,
+               messages_per_s=n_messages / elapsed,
+               mb_per_s=n_messages * size / elapsed / 1e6)
+    res.update(meter.result)
+    return res
+
+
+def param_round_trip(loopback, n_requests, timeout=1):
+    """Time server-initiated param syncs and client param fetches.
+
+    Requests that get no reply within ``timeout`` are counted as lost.
+
+    """
+    exchanges = dict(server_sync=(loopback.exp.cmd_q, loopback.exp.param_q),
+                     client_fetch=(loopback.remote.cmd_q,
+                                   loopback.remote.param_q))
+
+    results = {}
+    for kind, (cmd_q, param_q) in exchanges.items():
+        times = []
+        lost = 0
+        for _ in range(n_requests):
+            start = time.perf_counter()
+            cmd_q.put(clientserver.SocketThread.PARAM_REQUEST)
+            try:
+                param_q.get(timeout=timeout)
+                times.append(time.perf_counter() - start)
+            except queue.Empty:
+                lost += 1
+        results[kind] = summarize_latency(times)
+        results[kind]["lost"] = lost
+
+    return results
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rates", default="60,144,500,1000",
+                        help="comma-separated screen message rates (Hz)")
+    parser.add_argument("--sizes", default="100,1000,10000",
+                        help="comma-separated payload sizes (bytes)")
+    parser.add_argument("--duration", type=float, default=2,
+                        help="seconds to send screen messages per condition")
+    parser.add_argument("--trials", type=int, default=200,
+                        help="number of trial messages in each burst")
+    parser.add_argument("--params", type=int, default=20,
+                        help="number of param round trips")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args(argv)
+
+    rates = [float(r) for r in args.rates.split(",")]
+    sizes = [int(s) for s in args.sizes.split(",")]
+
+    # Params with a size typical of a real study
+    params = {f"param_{i}": [i, i / 2, "value"] for i in range(100)}
+
+    loopback = Loopback(params)
+    results = dict(screen=[], trial=[])
+    try:
+
+        for size in sizes:
+            for rate in rates:
+                res = screen_latency(loopback, rate, size, args.duration)
+                results["screen"].append(res)
+                print(("screen {rate:6.0f} Hz {payload:6d} B: "
+                       "p50 {p50_ms:6.2f} ms, p99 {p99_ms:6.2f} ms, "
+                       "received {received}/{sent}, "
+                       "cpu {server_cpu_share:.1%} / {client_cpu_share:.1%}"
+                       ).format(**res))
+
+        for size in sizes:
+            res = trial_throughput(loopback, size, args.trials)
+            results["trial"].append(res)
+            print(("trial  {payload:6d} B: {messages_per_s:8.1f} msg/s, "
+                   "{mb_per_s:6.2f} MB/s, "
+                   "cpu {server_cpu_share:.1%} / {client_cpu_share:.1%}"
+                   ).format(**res))
+
+        res = param_round_trip(loopback, args.params)
+        results["param"] = res
+        for kind, stats in res.items():
+            print("param {}: p50 {:.2f} ms, max {:.2f} ms, lost {}".format(
+                kind, stats.get("p50_ms", np.nan), stats.get("max_ms", np.nan),
+                stats["lost"]))
+
+    finally:
+        loopback.close()
+
+    if args.json is not None:
+        results.update(python=platform.python_version(),
+                       machine=platform.platform())
+        with open(args.json, "w") as fid:
+            json.dump(results, fid, indent=2)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,37 @@
+"""Shared setup for the visigoth benchmarks."""
+import os
+
+FRAME_RATE = 144
+FRAME_BUDGET = 1 / FRAME_RATE
+
+_window = None
+
+
+def make_window(size=(1920, 1080), width=50, distance=60):
+    """Return a hidden window with the attributes visigoth adds to windows.
+
+    Benchmarks measure the Python-side cost of updating stimuli, so nothing
+    is rendered and the window is shared across benchmarks.
+
+    """
+    global _window
+    if _window is not None:
+        return _window
+
+    os.environ.setdefault("PYGLET_HEADLESS", "1")
+    from psychopy import monitors, tools
+    from visigoth import headless
+
+    monitor = monitors.Monitor(name="benchmark", width=width,
+                               distance=distance, autoLog=False)
+    monitor.setSizePix(size)
+
+    offscreen = headless.offscreen_window(0, size, monitor)
+    win = headless.HeadlessWindow(headless.VsyncClock(), FRAME_RATE, size,
+                                  monitor, win=offscreen)
+    win.background_color = 0
+    win.deg_per_pix = tools.monitorunittools.pix2deg(1, monitor)
+    win.pix_per_deg = tools.monitorunittools.deg2pix(1, monitor)
+
+    _window = win
+    return win
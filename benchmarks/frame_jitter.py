@@ -0,0 +1,144 @@
+"""Frame-interval jitter of a trial loop with and without real-time mode.
+
+A loop waits for frame deadlines at a fixed rate (as a flip would) while
+producing cyclic garbage, optionally with busy processes competing for the
+CPU. The same loop is run with the RealtimeMode interventions off and on,
+and the distribution of intervals between frame wake-ups is compared. No
+display is needed.
+
+Usage::
+
+    python benchmarks/frame_jitter.py [--rate 144] [--duration 10]
+        [--garbage 2000] [--load 0] [--cores 0] [--priority 10] [--json FILE]
+
+Scheduling interventions need permission (e.g. ``CAP_SYS_NICE`` for
+``SCHED_FIFO`` and a raised memlock limit for ``mlockall``); the ones that
+fail are reported and skipped.
+
+"""
+import sys
+import json
+import time
+import argparse
+import platform
+import multiprocessing as mp
+
+import numpy as np
+
+from visigoth.timing import HybridSleeper
+from visigoth.realtime import RealtimeMode
+
+
+def busy(stop):
+    """Keep a core busy until told to stop."""
+    while not stop.is_set():
+        sum(range(10000))
+
+
+def make_garbage(n):
+    """Create ``n`` reference cycles for the garbage collector to find."""
+    for _ in range(n):
+        a = {}
+        b = {"a": a}
+        a["b"] = b
+
+
+def frame_loop(rate, duration, garbage, sleeper):
+    """Return the intervals (in seconds) between frame wake-ups."""
+    frametime = 1 / rate
+    n_frames = int(duration * rate)
+    wakes = np.empty(n_frames)
+
+    start = time.perf_counter()
+    for i in range(n_frames):
+        make_garbage(garbage)
+        sleeper.wait_until(start + (i + 1) * frametime)
+        wakes[i] = time.perf_counter()
+
+    return np.diff(wakes)
+
+
+def summarize(intervals, rate):
+
+    frametime = 1 / rate
+    ms = intervals * 1000
+    pcts = np.percentile(ms, [50, 99, 99.9])
+    return dict(frames=int(len(ms) + 1),
+                mean_ms=float(ms.mean()),
+                sd_ms=float(ms.std()),
+                p50_ms=float(pcts[0]),
+                p99_ms=float(pcts[1]),
+                p999_ms=float(pcts[2]),
+                max_ms=float(ms.max()),
+                missed=int(np.sum(intervals > 1.5 * frametime)))
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rate", type=float, default=144,
+                        help="simulated refresh rate (Hz)")
+    parser.add_argument("--duration", type=float, default=10,
+                        help="seconds to run each condition")
+    parser.add_argument("--garbage", type=int, default=2000,
+                        help="reference cycles created on each frame")
+    parser.add_argument("--load", type=int, default=0,
+                        help="number of busy processes competing for the CPU")
+    parser.add_argument("--cores", help="comma-separated cores to pin to")
+    parser.add_argument("--priority", type=int, default=10,
+                        help="SCHED_FIFO priority for real-time mode")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args(argv)
+
+    cores = None
+    if args.cores is not None:
+        cores = [int(c) for c in args.cores.split(",")]
+
+    stop = mp.Event()
+    workers = [mp.Process(target=busy, args=(stop,), daemon=True)
+               for _ in range(args.load)]
+    for proc in workers:
+        proc.start()
+
+    sleeper = HybridSleeper()
+    results = dict(sleep_margin=sleeper.margin)
+    try:
+
+        for mode in ["off", "on"]:
+
+            realtime = None
+            if mode == "on":
+                realtime = RealtimeMode(cores, args.priority)
+                results["interventions"] = realtime.enable()
+
+            try:
+                intervals = frame_loop(args.rate, args.duration,
+                                       args.garbage, sleeper)
+            finally:
+                if realtime is not None:
+                    realtime.disable()
+
+            res = summarize(intervals, args.rate)
+            results[mode] = res
+            print(("realtime {mode:3s}: p50 {p50_ms:6.2f} ms, "
+                   "p99 {p99_ms:6.2f} ms, p99.9 {p999_ms:6.2f} ms, "
+                   "max {max_ms:6.2f} ms, missed {missed}/{frames}"
+                   ).format(mode=mode, **res))
+
+        for name, outcome in results["interventions"].items():
+            print(f"  {name}: {outcome}")
+
+    finally:
+        stop.set()
+        for proc in workers:
+            proc.join()
+
+    if args.json is not None:
+        results.update(python=platform.python_version(),
+                       machine=platform.platform())
+        with open(args.json, "w") as fid:
+            json.dump(results, fid, indent=2)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""Report the import cost of visigoth modules.
+
+Each module is imported in a fresh interpreter with ``python -X importtime``
+and the per-module timings are aggregated by top-level package, so it is easy
+to see which dependencies an entry point pulls in at startup.
+
+Usage::
+
+    python benchmarks/import_time.py [--json FILE] [--top N] [module ...]
+
+"""
+import sys
+import json
+import argparse
+import subprocess
+from collections import defaultdict
+
+
+DEFAULT_MODULES = [
+    "visigoth",
+    "visigoth.commandline",
+    "visigoth.clientserver",
+    "visigoth.tools",
+    "visigoth.stimuli",
+    "visigoth.remote",
+    "visigoth.experiment",
+]
+
+
+def import_time(module, repeats=3):
+    """Return total and per-package import times (in ms) for a module.
+
+    The fastest of ``repeats`` imports is used to reduce the influence of a
+    cold filesystem cache.
+
+    """
+    best = None
+    for _ in range(repeats):
+        cmd = [sys.executable, "-X", "importtime", "-c", f"import {module}"]
+        res = subprocess.run(cmd, stderr=subprocess.PIPE,
+                             stdout=subprocess.DEVNULL,
+                             universal_newlines=True)
+        if res.returncode:
+            err = res.stderr.strip().splitlines()
+            return dict(error=err[-1] if err else "import failed")
+
+        packages = defaultdict(float)
+        total = 0
+        for line in res.stderr.splitlines():
+            if not line.startswith("import time:") or "self [us]" in line:
+                continue
+            self_us, cumulative_us, name = line[12:].split("|")
+            name = name.strip()
+            packages[name.split(".")[0]] += int(self_us) / 1000
+            if name == module:
+                total = int(cumulative_us) / 1000
+
+        if best is None or total < best["total_ms"]:
+            best = dict(total_ms=total, packages=dict(packages))
+
+    return best
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--top", type=int, default=5,
+                        help="number of packages to list per module")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    results = {}
+    for module in args.modules:
+
+        res = import_time(module, args.repeats)
+        results[module] = res
+
+        if "error" in res:
+            print(f"{module:<24} failed: {res['error']}")
+            continue
+
+        print(f"{module:<24} {res['total_ms']:8.1f} ms")
+        packages = sorted(res["packages"].items(), key=lambda x: -x[1])
+        for name, ms in packages[:args.top]:
+            print(f"    {name:<20} {ms:8.1f} ms")
+
+    if args.json is not None:
+        with open(args.json, "w") as fid:
+            json.dump(results, fid, indent=2, sort_keys=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Run the visigoth benchmarks and write the results as JSON.
+
+The benchmark modules follow the airspeed velocity layout, so they can also
+be run with asv. This runner has no dependencies beyond visigoth itself: it
+times each ``time_*`` method for every parameter combination, reports the
+fastest per-call time of several repeats, and checks benchmarks that run on
+every screen refresh against the frame budget.
+
+Usage::
+
+    python benchmarks/run.py [--json FILE] [--rate HZ] [--check] [pattern]
+
+"""
+import os
+import sys
+import json
+import glob
+import timeit
+import argparse
+import importlib
+import itertools
+import platform
+import traceback
+
+
+def discover(bench_dir, pattern=None):
+    """Yield (name, class) for each benchmark class in the directory."""
+    for fname in sorted(glob.glob(os.path.join(bench_dir, "bench_*.py"))):
+        module_name = os.path.splitext(os.path.basename(fname))[0]
+        module = importlib.import_module(module_name)
+        for name, obj in sorted(vars(module).items()):
+            if not isinstance(obj, type) or obj.__module__ != module_name:
+                continue
+            full_name = f"{module_name}.{name}"
+            if pattern is None or pattern in full_name:
+                yield full_name, obj
+
+
+def time_method(func, args, repeat=5, min_time=.2):
+    """Return the fastest per-call time of ``func(*args)`` in seconds."""
+    timer = timeit.Timer(lambda: func(*args))
+    number = 1
+    while timer.timeit(number) < min_time / repeat:
+        number *= 2
+    return min(timer.repeat(repeat, number)) / number
+
+
+def last_error():
+    """Return the final line of the current exception's traceback."""
+    return traceback.format_exc().strip().splitlines()[-1]
+
+
+def run_class(name, klass, budget, repeat):
+
+    params = getattr(klass, "params", [])
+    param_names = getattr(klass, "param_names", [])
+    if params and not isinstance(params[0], list):
+        params = [params]
+    methods = sorted(m for m in dir(klass) if m.startswith("time_"))
+
+    results = []
+    for args in itertools.product(*params):
+
+        bench = klass()
+        info = dict(params=dict(zip(param_names, args)))
+        try:
+            if hasattr(bench, "setup"):
+                bench.setup(*args)
+        except Exception:
+            for method in methods:
+                results.append(dict(info, name=f"{name}.{method}",
+                                    error=last_error()))
+            continue
+
+        for method in methods:
+            res = dict(info, name=f"{name}.{method}")
+            try:
+                seconds = time_method(getattr(bench, method), args, repeat)
+            except Exception:
+                res["error"] = last_error()
+            else:
+                res["seconds"] = seconds
+                if getattr(klass, "frame_budget", False):
+                    res["budget_fraction"] = seconds / budget
+                    res["within_budget"] = seconds <= budget
+            results.append(res)
+
+    return results
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("pattern", nargs="?",
+                        help="only run benchmarks with names containing this")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--rate", type=float, default=144,
+                        help="refresh rate (Hz) that sets the frame budget")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--check", action="store_true",
+                        help="exit with an error if any benchmark fails or "
+                             "exceeds the frame budget")
+    args = parser.parse_args(argv)
+
+    bench_dir = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, bench_dir)
+    budget = 1 / args.rate
+
+    import visigoth
+    results = []
+    for name, klass in discover(bench_dir, args.pattern):
+        for res in run_class(name, klass, budget, args.repeat):
+            results.append(res)
+            params = ", ".join(f"{k}={v}" for k, v in res["params"].items())
+            label = f"{res['name']}({params})"
+            if "error" in res:
+                print(f"{label:<72} failed: {res['error']}")
+                continue
+            line = f"{label:<72} {res['seconds'] * 1000:9.3f} ms"
+            if not res.get("within_budget", True):
+                line += "  OVER BUDGET"
+            print(line)
+
+    if args.json is not None:
+        output = dict(visigoth_version=visigoth.__version__,
+                      python=platform.python_version(),
+                      machine=platform.platform(),
+                      frame_rate=args.rate,
+                      frame_budget=budget,
+                      results=results)
+        with open(args.json, "w") as fid:
+            json.dump(output, fid, indent=2)
+
+    if args.check:
+        failed = [r for r in results
+                  if "error" in r or not r.get("within_budget", True)]
+        if failed:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -64,17 +64,21 @@ def run_trial(exp, info):
     # Wait before showing the dots
     exp.wait_until(timeout=info.wait_dots, draw=["fix", "targets"])
 
+    # Resolve the stimuli drawn on every frame of the dot epoch
+    dot_stims = exp.plan(["fix", "targets", "dots"])
+
     # Initialize a clock to get RT
     rt_clock = core.Clock()
 
-    # Draw each frame of the stimulus
-    for i in exp.frame_range(seconds=exp.p.wait_resp):
+    # Draw each frame of the stimulus, logging any dropped frames
+    for i in exp.frame_range(seconds=exp.p.wait_resp,
+                             report=info, report_prefix="dots"):
 
         # Displace the dots with specified coherent motion
         exp.s.dots.update(info.dot_dir, info.dot_coh)
 
         # Draw the dots on the screen
-        exp.draw(["fix", "targets", "dots"])
+        exp.draw(dot_stims)
 
         if not exp.check_fixation():
 
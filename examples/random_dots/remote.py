@@ -39,9 +39,13 @@ def initialize_trial_figure(app):
     return fig, axes
 
 
-def update_trial_figure(app, trial_data):
+def deserialize_trial_data(app, trial_data):
+
+    # This runs on the network thread, keeping the parsing off the GUI
+    return pd.read_json(trial_data, typ="series")
 
-    trial_data = pd.read_json(trial_data, typ="series")
+
+def update_trial_figure(app, trial_data):
 
     app.trial_data.append(trial_data)
     trial_df = pd.DataFrame(app.trial_data)
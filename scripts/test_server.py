@@ -1,31 +1,38 @@
+import sys
 import time
-import json
-import numpy as np
-from visigoth import experiment
+from visigoth import experiment, clientserver
+from visigoth.simulation import SyntheticGaze
 from visigoth.ext.bunch import Bunch
 
 
 if __name__ == "__main__":
 
+    # Optionally specify the rate of screen updates (in Hz)
+    rate = float(sys.argv[1]) if len(sys.argv) > 1 else 60
+
     exp = experiment.Experiment()
+    exp.p = Bunch(x_offset=0, y_offset=0, fix_window=3,
+                  target_pos=[(-5, 0), (5, 0)], target_window=2,
+                  remote_keyframe_interval=1, server_process=False)
     exp.initialize_server()
-    exp.p = Bunch(x_offset=0, y_offset=0, fix_window=3)
+
+    gaze_source = SyntheticGaze(rate=rate,
+                                targets=exp.p.target_pos,
+                                saccade_rate=.5)
 
     try:
 
-        print ("Simulating eye data")
-        xy = (0, 0)
+        print("Simulating eye data")
+        start = time.time()
         while True:
 
             if exp.server.connected:
-                xy += np.random.randn(2) / 3
-                signs = np.sign(xy)
-                oob = np.abs(xy) > 5
-                xy[oob] = (signs * 5)[oob]
-                data = dict(gaze=tuple(xy),
-                            stims=["fix"])
-                exp.screen_q.put(json.dumps(data))
-            time.sleep(.016)
+                now = time.time() - start
+                gaze = gaze_source.read(now)
+                snapshot = clientserver.snapshot_stims([("fix", None, [])])
+                data = exp.screen_encoder.encode(now, gaze, snapshot)
+                exp.screen_q.put(data)
+            time.sleep(1 / rate)
 
     finally:
         exp.shutdown_server()
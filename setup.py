@@ -17,7 +17,7 @@ SCRIPTS = [
     "scripts/visigoth-remote",
     "scripts/visigoth-screencheck"
 ]
-PACKAGES = ["visigoth", "visigoth.stimuli", "visigoth.ext"]
+PACKAGES = ["visigoth", "visigoth.stimuli", "visigoth.ext", "visigoth.tests"]
 
 INCLUDE_PACKAGE_DATA = True
 
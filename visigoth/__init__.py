@@ -1,7 +1,46 @@
-from .experiment import Experiment  # noqa: F401
-from .tools import *  # noqa: F401,F403
-from .ext.bunch import Bunch  # noqa: F401
+import importlib
 
-from ._version import get_versions
-__version__ = get_versions()['version']
-del get_versions
+# Public names are resolved on first access so that light submodules (e.g. the
+# client side of the remote, or the command line parser) can be imported
+# without paying for psychopy, pandas, and scipy
+_lazy_attrs = {
+    "Experiment": "experiment",
+    "Bunch": "ext.bunch",
+    "AcquireFixation": "tools",
+    "AcquireTarget": "tools",
+    "check_gaze": "tools",
+    "flexible_values": "tools",
+    "truncated_sample": "tools",
+    "limited_repeat_sequence": "tools",
+    "GazeWindows": "tools",
+}
+
+_submodules = [
+    "audio", "clientserver", "commandline", "displays", "experiment",
+    "eyetracker", "headless", "realtime", "remote", "session", "simulation",
+    "stimuli", "timing", "tools", "worker",
+]
+
+__all__ = list(_lazy_attrs)
+
+
+def __getattr__(name):
+
+    if name == "__version__":
+        from ._version import get_versions
+        value = get_versions()["version"]
+    elif name in _lazy_attrs:
+        module = importlib.import_module("." + _lazy_attrs[name], __name__)
+        value = getattr(module, name)
+    elif name in _submodules:
+        value = importlib.import_module("." + name, __name__)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+
+    return sorted(set(globals()) | set(_lazy_attrs) | set(_submodules))
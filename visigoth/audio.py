@@ -0,0 +1,285 @@
+"""Low-latency playback of auditory feedback."""
+from __future__ import division
+import os
+import time
+import wave
+import threading
+from collections import deque
+
+import numpy as np
+
+
+SOUND_NAMES = dict(start="chimes",
+                   correct="ding",
+                   wrong="signon",
+                   nofix="secalert",
+                   nochoice="updalert",
+                   fixbreak="click")
+
+_pcm_cache = {}
+
+
+def load_wav(fname, rate=44100, channels=2):
+    """Decode a WAV file into a float32 array with shape (frames, channels).
+
+    The sound is resampled to ``rate`` and mono sounds are duplicated across
+    ``channels``. Decoded buffers are cached, so each file is only read once
+    per process.
+
+    """
+    key = fname, os.stat(fname).st_mtime, rate, channels
+    if key in _pcm_cache:
+        return _pcm_cache[key]
+
+    with wave.open(fname) as fid:
+        n_channels = fid.getnchannels()
+        width = fid.getsampwidth()
+        file_rate = fid.getframerate()
+        frames = fid.readframes(fid.getnframes())
+
+    if width == 1:
+        pcm = (np.frombuffer(frames, np.uint8).astype(np.float32) - 128) / 128
+    elif width == 2:
+        pcm = np.frombuffer(frames, "<i2").astype(np.float32) / 2 ** 15
+    elif width == 4:
+        pcm = np.frombuffer(frames, "<i4").astype(np.float32) / 2 ** 31
+    else:
+        raise ValueError(f"Unsupported sample width in {fname}: {width}")
+    pcm = pcm.reshape(-1, n_channels)
+
+    if file_rate != rate:
+        n_in = len(pcm)
+        n_out = int(round(n_in * rate / file_rate))
+        t_in = np.arange(n_in) / file_rate
+        t_out = np.arange(n_out) / rate
+        pcm = np.column_stack([np.interp(t_out, t_in, pcm[:, i])
+                               for i in range(n_channels)])
+
+    if n_channels != channels:
+        pcm = np.repeat(pcm[:, :1], channels, axis=1)
+
+    pcm = np.ascontiguousarray(pcm, np.float32)
+    pcm.setflags(write=False)
+    _pcm_cache[key] = pcm
+    return pcm
+
+
+class Sound(object):
+    """Handle to a preloaded sound that can be played through an engine."""
+    def __init__(self, engine, name, pcm):
+
+        self.engine = engine
+        self.name = name
+        self.pcm = pcm
+
+    @property
+    def duration(self):
+        return len(self.pcm) / self.engine.rate
+
+    def play(self):
+        """Start playing the sound without blocking."""
+        self.engine.play(self)
+
+
+class _Voice(object):
+
+    __slots__ = ["pcm", "pos", "entry"]
+
+    def __init__(self, pcm, entry):
+
+        self.pcm = pcm
+        self.pos = 0
+        self.entry = entry
+
+
+class AudioEngine(object):
+    """Base class for audio playback backends.
+
+    Requests to play a sound return immediately. Each request is logged with
+    the time it was made and the time the sound (is expected to have) reached
+    the output, both on the clock passed to the engine, so that feedback
+    timing can be aligned with the trial data.
+
+    """
+    backend = None
+
+    def __init__(self, clock=None, rate=44100, channels=2):
+
+        self.clock = clock
+        self.rate = rate
+        self.channels = channels
+        self.log = deque()
+
+    def now(self):
+        """Return the current time on the engine's clock."""
+        if self.clock is None:
+            return time.perf_counter()
+        return self.clock.getTime()
+
+    def load(self, name, fname):
+        """Decode a sound file and return a playable :class:`Sound`."""
+        return Sound(self, name, load_wav(fname, self.rate, self.channels))
+
+    def play(self, sound):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def log_entry(self, sound):
+
+        entry = dict(sound=sound.name, backend=self.backend,
+                     request=self.now(), onset=np.nan, latency=np.nan)
+        self.log.append(entry)
+        return entry
+
+
+class SoundDeviceEngine(AudioEngine):
+    """Playback through a persistent low-latency sounddevice output stream.
+
+    Sounds are mixed into the stream in the audio callback, so starting a
+    sound never opens a device or allocates a buffer. Onset times come from
+    the DAC time that PortAudio reports for the buffer a sound starts in.
+
+    """
+    backend = "sounddevice"
+
+    def __init__(self, clock=None, rate=44100, channels=2,
+                 device=None, blocksize=64, latency="low"):
+
+        super(SoundDeviceEngine, self).__init__(clock, rate, channels)
+
+        import sounddevice
+
+        self.pending = deque()
+        self.voices = []
+        self.lock = threading.Lock()
+
+        self.stream = sounddevice.OutputStream(samplerate=rate,
+                                               channels=channels,
+                                               dtype="float32",
+                                               device=device,
+                                               blocksize=blocksize,
+                                               latency=latency,
+                                               callback=self.callback)
+        self.stream.start()
+
+    def play(self, sound):
+
+        entry = self.log_entry(sound)
+        with self.lock:
+            entry["stream_request"] = self.stream.time
+            self.pending.append(_Voice(sound.pcm, entry))
+
+    def callback(self, outdata, frames, time_info, status):
+
+        outdata.fill(0)
+        dac_time = time_info.outputBufferDacTime
+
+        with self.lock:
+            while self.pending:
+                voice = self.pending.popleft()
+                entry = voice.entry
+                entry["latency"] = dac_time - entry.pop("stream_request")
+                entry["onset"] = entry["request"] + entry["latency"]
+                self.voices.append(voice)
+
+        active = []
+        for voice in self.voices:
+            chunk = voice.pcm[voice.pos:voice.pos + frames]
+            outdata[:len(chunk)] += chunk
+            voice.pos += len(chunk)
+            if voice.pos < len(voice.pcm):
+                active.append(voice)
+        self.voices = active
+
+    def close(self):
+
+        self.stream.stop()
+        self.stream.close()
+
+
+class PsychoPyEngine(AudioEngine):
+    """Playback through PsychoPy Sound objects.
+
+    The PsychoPy backend does not report when sounds reach the output, so
+    only the duration of the call to ``play`` is logged as the latency.
+
+    """
+    backend = "psychopy"
+
+    def __init__(self, clock=None, rate=44100, channels=2):
+
+        super(PsychoPyEngine, self).__init__(clock, rate, channels)
+
+        from psychopy import prefs
+        prefs.hardware["audiolib"] = ["PTB", "sounddevice"]
+        from psychopy import sound
+        self.sound = sound
+
+        self.objects = {}
+
+    def load(self, name, fname):
+
+        sound = super(PsychoPyEngine, self).load(name, fname)
+        self.objects[name] = self.sound.Sound(sound.pcm, sampleRate=self.rate)
+        return sound
+
+    def play(self, sound):
+
+        entry = self.log_entry(sound)
+        self.objects[sound.name].play()
+        entry["latency"] = self.now() - entry["request"]
+
+
+class NullEngine(AudioEngine):
+    """Silent backend that logs the timing a persistent stream would have.
+
+    The expected onset of each sound is the start of the next output buffer
+    after the request, plus the nominal output latency of the device.
+
+    """
+    backend = "null"
+
+    def __init__(self, clock=None, rate=44100, channels=2,
+                 blocksize=64, output_latency=.005):
+
+        super(NullEngine, self).__init__(clock, rate, channels)
+
+        self.block_duration = blocksize / rate
+        self.output_latency = output_latency
+
+    def play(self, sound):
+
+        entry = self.log_entry(sound)
+        wait = self.block_duration - entry["request"] % self.block_duration
+        entry["latency"] = wait + self.output_latency
+        entry["onset"] = entry["request"] + entry["latency"]
+
+
+def create_engine(backend="auto", clock=None, **kwargs):
+    """Return an audio engine, choosing the best available if "auto"."""
+    if backend == "auto":
+        try:
+            import sounddevice
+        except (ImportError, OSError) as err:
+            # OSError is raised when the PortAudio library cannot be found
+            print(f"Using psychopy sound backend; sounddevice unavailable: {err}")
+            return PsychoPyEngine(clock)
+        try:
+            engine = SoundDeviceEngine(clock, **kwargs)
+        except sounddevice.PortAudioError as err:
+            print(f"Using psychopy sound backend; could not open stream: {err}")
+            return PsychoPyEngine(clock)
+        print("Using sounddevice sound backend")
+        return engine
+    elif backend == "sounddevice":
+        return SoundDeviceEngine(clock, **kwargs)
+    elif backend == "psychopy":
+        return PsychoPyEngine(clock)
+    elif backend == "null":
+        kwargs.pop("device", None)
+        kwargs.pop("latency", None)
+        return NullEngine(clock, **kwargs)
+    else:
+        raise ValueError(f"Unknown sound backend: {backend}")
@@ -4,12 +4,153 @@ import socket
 import threading
 import queue
 
+import numpy as np
 
-class SocketThread(threading.Thread):
 
+def jsonable(value):
+    """Convert attribute values (e.g. numpy arrays) to plain json types."""
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    if isinstance(value, tuple):
+        return [jsonable(v) for v in value]
+    return value
+
+
+def snapshot_stims(stims):
+    """Return the current value of the synced attributes of each stimulus.
+
+    Parameters
+    ----------
+    stims : sequence of (name, object, attributes) tuples
+        Stimuli on the screen, in drawing order.
+
+    Returns
+    -------
+    snapshot : dict
+        Maps each stimulus name to a dict of its attribute values.
+
+    """
+    return {name: {attr: jsonable(getattr(obj, attr)) for attr in attrs}
+            for name, obj, attrs in stims}
+
+
+class ScreenEncoder(object):
+    """Encode the screen state as changes since the previous message.
+
+    Each message has the time and gaze position. The names of stimuli on
+    the screen are only included when they change, and the stimulus
+    attributes only when their values change. Every ``keyframe_interval``
+    seconds the full state is sent instead, so a client can always recover
+    the complete screen. The interval is timed with the performance counter
+    rather than the message times, which restart when the experiment clock
+    is reset.
+
+    """
+    def __init__(self, keyframe_interval=1):
+
+        self.keyframe_interval = keyframe_interval
+        self.reset()
+
+    def reset(self):
+        """Forget what has been sent so that the next message is a keyframe."""
+        self.state = {}
+        self.on = None
+        self.last_keyframe = -np.inf
+
+    def encode(self, t, gaze, snapshot):
+        """Return a json message for the current gaze and stimulus snapshot."""
+        on = list(snapshot)
+        now = time.perf_counter()
+
+        if now - self.last_keyframe >= self.keyframe_interval:
+            msg = dict(t=t, gaze=gaze, key=True, on=on, stims=snapshot)
+            self.state = {}
+            self.last_keyframe = now
+        else:
+            msg = dict(t=t, gaze=gaze)
+            if on != self.on:
+                msg["on"] = on
+            changes = {}
+            for name, attrs in snapshot.items():
+                old = self.state.get(name, {})
+                diff = {attr: value for attr, value in attrs.items()
+                        if attr not in old or old[attr] != value}
+                if diff:
+                    changes[name] = diff
+            if changes:
+                msg["stims"] = changes
+
+        for name, attrs in snapshot.items():
+            self.state.setdefault(name, {}).update(attrs)
+        self.on = on
+
+        return json.dumps(msg)
+
+
+class ScreenDecoder(object):
+    """Rebuild the full screen state from keyframes and changes.
+
+    Messages must be decoded in the order they were sent. Messages in the
+    older format (gaze and a position for each stimulus) are also accepted.
+
+    """
+    def __init__(self):
+
+        self.state = {}
+        self.on = []
+
+    def decode(self, data):
+        """Return the time, gaze, and attributes of each stimulus on screen."""
+        msg = json.loads(data)
+
+        if "t" not in msg:
+            stims = {name: {} if pos is None else dict(pos=pos)
+                     for name, pos in msg["stims"].items()}
+            return dict(t=None, gaze=msg["gaze"], stims=stims)
+
+        if msg.get("key", False):
+            self.state = {}
+        for name, attrs in msg.get("stims", {}).items():
+            self.state.setdefault(name, {}).update(attrs)
+        if "on" in msg:
+            self.on = msg["on"]
+
+        stims = {name: dict(self.state.get(name, {})) for name in self.on}
+        return dict(t=msg["t"], gaze=msg["gaze"], stims=stims)
+
+
+class MessageProtocol(object):
+    """Message kinds and framing shared by every client and server.
+
+    Each message is a one-character kind and a zero-padded payload size,
+    followed by the ascii payload.
+
+    """
     (SERVER_REQUEST, NEW_SCREEN, TRIAL_DATA,
      PARAM_REQUEST, NEW_PARAMS, OLD_PARAMS) = range(6)
     HEADER_SIZE = 10
+    PORT = 50001
+
+    def package(self, kind, data=""):
+
+        kind = str(kind)
+        size = str(len(data)).zfill(self.HEADER_SIZE - 1)
+
+        package = "".join([kind, size, data])
+        return package.encode("ascii")
+
+    def read_header(self, b):
+
+        s = b.decode("ascii")
+        if s:
+            kind = int(s[0])
+            size = int(s[1:])
+        else:
+            kind, size = None, None
+        return kind, size
+
+
+class SocketThread(MessageProtocol, threading.Thread):
 
     def __init__(self):
 
@@ -22,14 +163,6 @@ class SocketThread(threading.Thread):
         self.alive.clear()
         threading.Thread.join(self, timeout)
 
-    def package(self, kind, data=""):
-
-        kind = str(kind)
-        size = str(len(data)).zfill(self.HEADER_SIZE - 1)
-
-        package = "".join([kind, size, data])
-        return package.encode("ascii")
-
     def recvall(self, size, source=None):
 
         if source is None:
@@ -42,30 +175,31 @@ class SocketThread(threading.Thread):
             missing = size - len(data)
         return data
 
-    def read_header(self, b):
-
-        s = b.decode("ascii")
-        if s:
-            kind = int(s[0])
-            size = int(s[1:])
-        else:
-            kind, size = None, None
-        return kind, size
-
 
 class SocketClientThread(SocketThread):
 
-    def __init__(self, remote):
+    def __init__(self, remote, port=None):
 
         super(SocketClientThread, self).__init__()
 
+        self.port = self.PORT if port is None else port
+
         self.screen_q = remote.screen_q
         self.param_q = remote.param_q
         self.trial_q = remote.trial_q
         self.cmd_q = remote.cmd_q
 
+        # Optional hooks to decode messages here rather than on the GUI
+        # thread, and to merge screen messages the GUI has not yet taken
+        self.decode_screen = getattr(remote, "decode_screen", None)
+        self.decode_trial = getattr(remote, "decode_trial", None)
+        self.coalesce_screens = getattr(remote, "coalesce_screens", None)
+
+        # Optional log of every message received from the server
+        self.recorder = getattr(remote, "recorder", None)
+
         self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.socket.connect((remote.host, 50001))
+        self.socket.connect((remote.host, self.port))
         self.socket.settimeout(.01)
 
     def run(self):
@@ -104,7 +238,8 @@ class SocketClientThread(SocketThread):
                 elif kind == self.NEW_SCREEN:
                     try:
                         data = self.recvall(size)
-                        self.screen_q.put(data)
+                        self.record(kind, data)
+                        self.put_screen(data)
                     except socket.timeout:
                         continue
 
@@ -112,6 +247,9 @@ class SocketClientThread(SocketThread):
                 elif kind == self.TRIAL_DATA:
                     try:
                         data = self.recvall(size)
+                        self.record(kind, data)
+                        if self.decode_trial is not None:
+                            data = self.decode_trial(data)
                         self.trial_q.put(data)
                     except socket.timeout:
                         continue
@@ -120,6 +258,7 @@ class SocketClientThread(SocketThread):
                 elif kind == self.NEW_PARAMS:
                     try:
                         data = self.recvall(size)
+                        self.record(kind, data)
                         self.param_q.put(data)
                     except socket.timeout:
                         continue
@@ -127,6 +266,7 @@ class SocketClientThread(SocketThread):
                 # Send current parameters up to the server
                 elif kind == self.PARAM_REQUEST:
 
+                    self.record(kind, "")
                     try:
                         new_params = self.param_q.get(block=False)
                         data = self.package(self.NEW_PARAMS, new_params)
@@ -138,10 +278,29 @@ class SocketClientThread(SocketThread):
 
             self.socket.close()
 
+    def record(self, kind, data):
+
+        if self.recorder is not None:
+            self.recorder.record(kind, data)
+
+    def put_screen(self, data):
+        """Decode a screen message and queue it, merging with a stale one."""
+        if self.decode_screen is not None:
+            data = self.decode_screen(data)
+
+        if self.coalesce_screens is not None:
+            try:
+                data = self.coalesce_screens(self.screen_q.get(block=False),
+                                             data)
+            except queue.Empty:
+                pass
+
+        self.screen_q.put(data)
+
 
 class SocketServerThread(SocketThread):
 
-    def __init__(self, exp):
+    def __init__(self, exp, port=None):
 
         super(SocketServerThread, self).__init__()
 
@@ -154,9 +313,12 @@ class SocketServerThread(SocketThread):
 
         self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        self.socket.bind(("0.0.0.0", 50001))
+        self.socket.bind(("0.0.0.0", self.PORT if port is None else port))
         self.socket.listen(2)
 
+        # Port 0 binds to a free port; report the one that was chosen
+        self.port = self.socket.getsockname()[1]
+
         self.daemon = True
 
         self.connected = False
@@ -180,8 +342,12 @@ class SocketServerThread(SocketThread):
                     # TODO take items off the screen queue here?
                     continue
 
+                # The client has hung up
+                if kind is None:
+                    break
+
                 # Handle a request for server-side params
-                if kind == self.PARAM_REQUEST:
+                elif kind == self.PARAM_REQUEST:
                     params = json.dumps(self.exp.p)
                     data = self.package(self.NEW_PARAMS, params)
                     clientsocket.sendall(data)
@@ -202,9 +368,12 @@ class SocketServerThread(SocketThread):
                         data = self.package(self.PARAM_REQUEST, "")
                         clientsocket.sendall(data)
 
-                        # Handle the reply with new params
-                        kind, size = self.read_header(
-                            clientsocket.recv(self.HEADER_SIZE))
+                        # Handle the reply with new params, skipping requests
+                        # the client sent before it saw ours
+                        kind = self.SERVER_REQUEST
+                        while kind == self.SERVER_REQUEST:
+                            kind, size = self.read_header(
+                                clientsocket.recv(self.HEADER_SIZE))
 
                         # Params have been updated client-side
                         if kind == self.NEW_PARAMS:
@@ -34,6 +34,15 @@ def define_experiment_parser():
         "--mouse", action="store_true", dest="eye_simulate",
         help="simulate eye position using mouse",
     )
+    parser.add_argument(
+        "--gaze_source", dest="eye_simulate_source",
+        help=("simulate eye position with 'synthetic' gaze or by replaying "
+              "an eye data csv file"),
+    )
+    parser.add_argument(
+        "--sound_backend", choices=["auto", "sounddevice", "psychopy", "null"],
+        help="audio backend for feedback sounds, overriding params module",
+    )
     parser.add_argument(
         "--demo", action="store_true", help="run experiment in demo mode",
     )
@@ -41,6 +50,35 @@ def define_experiment_parser():
         "--refresh_error", default=.5, type=float,
         help="maximum tolerable refresh rate error, in Hz",
     )
+    parser.add_argument(
+        "--display_cache",
+        help=("json file for caching display profiles and refresh rate "
+              "measurements between runs"),
+    )
+    parser.add_argument(
+        "--full_refresh_check", action="store_true",
+        help="measure the refresh rate fully, ignoring cached measurements",
+    )
+    parser.add_argument(
+        "--headless", choices=["offscreen", "null"],
+        help=("run without a display on a simulated clock, rendering to "
+              "a hidden window or not at all (null only works for studies "
+              "that do not create PsychoPy stimuli)"),
+    )
+    parser.add_argument(
+        "--headless_report",
+        help="write the per-frame cost of a headless run to this json file",
+    )
+    parser.add_argument(
+        "--server_process", action="store_true", default=None,
+        help=("run the remote server and trial writer in a separate process "
+              "that communicates through shared memory"),
+    )
+    parser.add_argument(
+        "--realtime", action="store_true", default=None,
+        help=("raise scheduling priority, lock memory, and collect garbage "
+              "only between trials"),
+    )
     parser.add_argument(
         "--display_name",
         help="load parameters for this display, overriding params module",
@@ -75,5 +113,34 @@ def define_remote_parser():
         "--notrials", action="store_false", dest="trial_app",
         help="only show eye-tracking panel, not trial information",
     )
+    parser.add_argument(
+        "--render_hz", type=float, default=60,
+        help="maximum rate for redrawing the gaze display",
+    )
+    parser.add_argument(
+        "--trail_length", type=int, default=30,
+        help="number of recent gaze positions to show in the trail",
+    )
+    parser.add_argument(
+        "--transport", default="thread", choices=["thread", "qt"],
+        help=("receive data in a polling thread or on the Qt event loop "
+              "(lower latency and idle CPU use)"),
+    )
+    parser.add_argument(
+        "--request_hz", type=float, default=100,
+        help="rate of data requests when idle with the qt transport",
+    )
+    parser.add_argument(
+        "--record", metavar="FILE",
+        help="log the data stream from the server to a session file",
+    )
+    parser.add_argument(
+        "--replay", metavar="FILE",
+        help="replay a recorded session instead of connecting to a server",
+    )
+    parser.add_argument(
+        "--speed", type=float, default=1,
+        help="replay speed relative to the recording (0 for maximum speed)",
+    )
 
     return parser
@@ -0,0 +1,166 @@
+"""Cached loading of display profiles and refresh rate measurements."""
+from __future__ import division
+import os
+import os.path as op
+import time
+import json
+import ctypes
+import hashlib
+import platform
+
+import yaml
+
+
+def gl_fingerprint():
+    """Return a string identifying the OpenGL vendor, renderer, and driver."""
+    try:
+        from pyglet import gl
+        strings = []
+        for name in [gl.GL_VENDOR, gl.GL_RENDERER, gl.GL_VERSION]:
+            ptr = gl.glGetString(name)
+            strings.append(ctypes.cast(ptr, ctypes.c_char_p).value.decode())
+        return " / ".join(strings)
+    except Exception:
+        return "unknown"
+
+
+def load_display_info(display_name, fnames):
+    """Parse the profile for a display from a sequence of yaml files.
+
+    Later files update the definitions in earlier files. Missing files are
+    skipped.
+
+    """
+    display_info = {}
+    for fname in fnames:
+        if op.exists(fname):
+            with open(fname) as fid:
+                display_info.update(yaml.load(fid, Loader=yaml.FullLoader))
+
+    info = display_info[display_name]
+
+    # Store date as a string to avoid crashing json dump downstream
+    if "date" in info:
+        info["date"] = info["date"].strftime("%Y-%m-%d")
+
+    return info
+
+
+class DisplayCache(object):
+    """On-disk cache of parsed display profiles and refresh measurements.
+
+    Parsed profiles are reused as long as the yaml files they came from have
+    not changed. Refresh rate measurements are stored per display and graphics
+    fingerprint (OpenGL driver, platform, and resolution) and are considered
+    stale after ``max_age`` seconds.
+
+    """
+    def __init__(self, fname, max_age=24 * 60 * 60):
+
+        self.fname = op.expanduser(fname)
+        self.max_age = max_age
+
+        try:
+            with open(self.fname) as fid:
+                self.data = json.load(fid)
+        except (OSError, ValueError):
+            self.data = {}
+
+        self.data.setdefault("profiles", {})
+        self.data.setdefault("refresh", {})
+
+    def save(self):
+        """Write the cache, ignoring failures (e.g. a read-only home)."""
+        try:
+            cache_dir = op.dirname(self.fname)
+            if not op.exists(cache_dir):
+                os.makedirs(cache_dir)
+            tmp_fname = self.fname + ".tmp"
+            with open(tmp_fname, "w") as fid:
+                json.dump(self.data, fid, indent=2, sort_keys=True)
+            os.replace(tmp_fname, self.fname)
+        except OSError:
+            pass
+
+    def load_profile(self, display_name, fnames):
+        """Return the profile for a display, parsing the files if changed."""
+        fnames = [f for f in fnames if op.exists(f)]
+        sources = [[f, os.stat(f).st_mtime, os.stat(f).st_size]
+                   for f in fnames]
+
+        entry = self.data["profiles"].get(display_name)
+        if entry is not None and entry["sources"] == sources:
+            return entry["info"]
+
+        info = load_display_info(display_name, fnames)
+        self.data["profiles"][display_name] = dict(sources=sources, info=info)
+        self.save()
+
+        return info
+
+    def fingerprint(self, display_name, win):
+        """Return a key identifying this display on this graphics setup."""
+        parts = [display_name, platform.platform(), gl_fingerprint(),
+                 "{:d}x{:d}".format(*win.size)]
+        return hashlib.md5("|".join(parts).encode()).hexdigest()
+
+    def get_refresh(self, key):
+        """Return cached refresh stats for a display key, or None if stale."""
+        entry = self.data["refresh"].get(key)
+        if entry is not None and (time.time() - entry["time"]) < self.max_age:
+            return entry
+
+    def set_refresh(self, key, refresh_hz, **kwargs):
+        """Store a new refresh rate measurement."""
+        entry = dict(refresh_hz=refresh_hz, time=time.time(), **kwargs)
+        self.data["refresh"][key] = entry
+        self.save()
+
+
+def measure_refresh(win, cache=None, key=None, full=False,
+                    spot_frames=10, tolerance=.5):
+    """Measure the refresh rate, possibly using a fast cached check.
+
+    Parameters
+    ----------
+    win : PsychoPy Window
+        Window to measure.
+    cache : DisplayCache, optional
+        Cache with previous measurements. Without a cache, the measurement
+        is always the full PsychoPy procedure.
+    key : str, optional
+        Display key in the cache; see :meth:`DisplayCache.fingerprint`.
+    full : bool, optional
+        If True, always perform the full measurement.
+    spot_frames : int, optional
+        Number of frames to flip when spot-checking a cached measurement.
+    tolerance : float, optional
+        Maximum difference (in Hz) between the spot check and the cached
+        value before falling back to a full measurement.
+
+    Returns
+    -------
+    refresh_hz : float
+        Measured refresh rate.
+    mode : "fast" | "full"
+        Which measurement was performed.
+
+    """
+    from psychopy import visual
+
+    cached = None
+    if cache is not None and not full:
+        cached = cache.get_refresh(key)
+
+    if cached is not None:
+        frametime, _, _ = visual.getMsPerFrame(win, nFrames=spot_frames)
+        refresh_hz = 1000 / frametime
+        if abs(refresh_hz - cached["refresh_hz"]) <= tolerance:
+            return refresh_hz, "fast"
+
+    frametime, _, _ = visual.getMsPerFrame(win)
+    refresh_hz = 1000 / frametime
+    if cache is not None:
+        cache.set_refresh(key, refresh_hz)
+
+    return refresh_hz, "full"
@@ -8,14 +8,14 @@ import json
 import hashlib
 import queue
 
-import yaml
 import numpy as np
 import pandas as pd
 
 from psychopy import core, tools, visual, event, monitors, logging
 
 from .ext.bunch import Bunch
-from . import stimuli, eyetracker, commandline, clientserver, _version
+from . import (stimuli, eyetracker, commandline, clientserver, displays,
+               audio, headless, timing, worker, realtime, _version)
 
 
 class Experiment(object):
@@ -30,6 +30,9 @@ class Experiment(object):
         self.win = None
         self.tracker = None
         self.server = None
+        self.audio = None
+        self.sleeper = None
+        self.realtime = None
 
         self._aborted = False
         self._clean_exit = True
@@ -37,10 +40,8 @@ class Experiment(object):
         self.clock = core.Clock()
         logging.defaultClock = self.clock
 
-        # Initialize some related variables about the eye
-        # TODO this might be squatting on a good name
-        self.eye = Bunch(most_recent_fixation=0,
-                         most_recent_blink=0)
+        # Track fixation (and blinks) across calls to check_fixation
+        self.fix_monitor = None
 
         self.trial = 0
         self.trial_data = []
@@ -74,8 +75,12 @@ class Experiment(object):
             if self.p.initialize_trial_generator:
                 next(trial_generator)
 
+            # Reduce scheduling and garbage collection jitter during trials
+            if self.p.realtime:
+                self.initialize_realtime()
+
             # Wait for a trigger to start
-            if self.p.trigger is not None:
+            if self.p.trigger is not None and self.p.headless is None:
                 self.wait_for_trigger()
 
             # Wait a certain amount of time before starting the run
@@ -97,14 +102,22 @@ class Experiment(object):
 
             for trial_info in trial_generator:
 
+                if self.fix_monitor is not None:
+                    self.fix_monitor.reset_stats()
+
                 trial_info = self.run_trial(trial_info)
                 self.iti_start = self.clock.getTime()
 
+                self.record_fixation_stats(trial_info)
+
                 self.trial_data.append(trial_info)
                 self.sync_remote_trials(trial_info)
 
                 self.sync_remote_params()
 
+                if self.realtime is not None:
+                    self.realtime.collect()
+
                 self.check_abort()
 
             # Wait at the end of the run for exact duration
@@ -121,14 +134,23 @@ class Experiment(object):
 
         finally:
 
-            if self._clean_exit:
+            self.shutdown_realtime()
+
+            # The params are missing if the run failed before they were read
+            finished = self._clean_exit and self.p is not None
+
+            if finished and self.p.headless != "null":
                 self.show_performance(*self.compute_performance())
 
+            if isinstance(self.win, headless.HeadlessWindow):
+                self.report_headless_run()
+
             self.save_data()
             self.shutdown_server()
             self.shutdown_eyetracker()
+            self.shutdown_sounds()
 
-            if self._clean_exit:
+            if finished and self.p.headless is None:
                 self.wait_for_exit()
 
             self.shutdown_display()
@@ -344,6 +366,16 @@ class Experiment(object):
         # Awkward solution to handling command-line display name
         if args.display_name is None:
             delattr(args, "display_name")
+        if args.sound_backend is None:
+            delattr(args, "sound_backend")
+        if args.server_process is None:
+            delattr(args, "server_process")
+        if args.realtime is None:
+            delattr(args, "realtime")
+        if args.display_cache is None:
+            delattr(args, "display_cache")
+        if args.eye_simulate_source is None:
+            delattr(args, "eye_simulate_source")
 
         # Define the parameters object with information from the params
         # module and from the command line invocation
@@ -368,6 +400,24 @@ class Experiment(object):
         if p.demo:
             p.save_data = False
 
+        # Without a display, run on a simulated clock with simulated gaze
+        if p.headless is not None:
+            self.clock = headless.VsyncClock()
+            logging.defaultClock = self.clock
+            p.sound_backend = "null"
+            p.eye_acquisition_thread = False
+            if p.eye_simulate_source is None:
+                p.eye_simulate_source = "synthetic"
+            p.eye_simulate = False
+
+        # Sleep coarsely and spin only near deadlines when waiting; the
+        # simulated clock can simply jump ahead
+        if p.headless is None:
+            self.sleeper = timing.HybridSleeper(self.clock, p.sleep_margin)
+            p.sleep_margin = self.sleeper.margin
+        else:
+            self.sleeper = self.clock
+
         self.p = p
         self.debug = args.debug
 
@@ -382,29 +432,49 @@ class Experiment(object):
         self.output_stem = output_stem
 
     def initialize_sounds(self):
-        """Create PsychoPy Sound objects for auditory feedback."""
-        from psychopy import prefs
-        prefs.hardware["audiolib"] = ["PTB", "sounddevice"]
-        from psychopy import sound
+        """Decode the feedback sounds and open the audio output."""
+        self.audio = audio.create_engine(self.p.sound_backend,
+                                         clock=self.clock,
+                                         device=self.p.sound_device,
+                                         blocksize=self.p.sound_blocksize)
 
         # Locate the sound files
         sound_dir = os.path.join(os.path.dirname(__file__), "sounds")
-        sound_names = dict(start="chimes",
-                           correct="ding",
-                           wrong="signon",
-                           nofix="secalert",
-                           nochoice="updalert",
-                           fixbreak="click",)
 
         # Load the sounds and save in a Bunch
         self.sounds = Bunch()
-        for result, sound_name in sound_names.items():
+        for result, sound_name in audio.SOUND_NAMES.items():
             fname = os.path.join(sound_dir, sound_name + ".wav")
-            sound_obj = sound.Sound(fname)
-            self.sounds[result] = sound_obj
+            self.sounds[result] = self.audio.load(result, fname)
 
     def initialize_server(self):
-        """Start a server in an independent thread for experiment control."""
+        """Start a server in an independent thread for experiment control.
+
+        With the ``server_process`` param, the server runs in a child process
+        that also writes each trial to disk as it finishes.
+
+        """
+        # Screen updates are sent as changes since the last message
+        self.screen_encoder = clientserver.ScreenEncoder(
+            self.p.remote_keyframe_interval
+        )
+
+        if self.p.server_process:
+
+            trial_fname = None
+            if self.p.save_data:
+                trial_fname = self.output_stem + "_trials.jsonl"
+
+            self.server = worker.ServerProcess(self, trial_fname=trial_fname)
+            self.server.start()
+
+            self.cmd_q = self.server.cmd_q
+            self.trial_q = self.server.trial_q
+            self.param_q = self.server.param_q
+            self.screen_q = self.server.screen_q
+
+            return
+
         self.cmd_q = queue.Queue()
         self.trial_q = queue.Queue()
         self.param_q = queue.Queue()
@@ -414,6 +484,19 @@ class Experiment(object):
         self.server = clientserver.SocketServerThread(self)
         self.server.start()
 
+    def initialize_realtime(self):
+        """Raise priority, pin cores, lock memory, and manage the collector.
+
+        The outcome of each intervention is logged in the params.
+
+        """
+        self.realtime = realtime.RealtimeMode(self.p.realtime_cores,
+                                              self.p.realtime_priority,
+                                              self.p.realtime_lock_memory)
+        log = self.realtime.enable()
+        for name, outcome in log.items():
+            self.p["realtime_" + name] = outcome
+
     def initialize_display(self, gamma_correct=True, debug=False,
                            debug_res=(800, 600)):
         """Open the PsychoPy window to begin the experiment."""
@@ -422,18 +505,15 @@ class Experiment(object):
         global_fname = op.join(op.dirname(__file__), "displays.yaml")
         local_fname = op.join(self.p.study_dir, "displays.yaml")
 
-        with open(global_fname) as fid:
-            display_info = yaml.load(fid, Loader=yaml.FullLoader)
-
-        if os.path.exists(local_fname):
-            with open(local_fname) as fid:
-                display_info.update(yaml.load(fid, Loader=yaml.FullLoader))
-
-        info = display_info[self.p.display_name]
-
-        # Store date as a string to avoid crashing json dump downstream
-        if "date" in info:
-            info["date"] = info["date"].strftime("%Y-%m-%d")
+        # Reuse the parsed profile and refresh measurements from earlier runs
+        if self.p.display_cache is None:
+            cache = None
+            info = displays.load_display_info(self.p.display_name,
+                                              [global_fname, local_fname])
+        else:
+            cache = displays.DisplayCache(self.p.display_cache)
+            info = cache.load_profile(self.p.display_name,
+                                      [global_fname, local_fname])
 
         # Determine the background color of the display
         if self.p.display_luminance is None:
@@ -452,6 +532,9 @@ class Experiment(object):
 
         # Open the psychopy window
         logging.console.setLevel(logging.CRITICAL)
+        if self.p.headless is not None:
+            return self.initialize_headless_display(info, color, monitor)
+
         res = debug_res if debug else info["resolution"]
         self.win = win = visual.Window(units="deg",
                                        screen=0,
@@ -476,17 +559,69 @@ class Experiment(object):
         else:
             self.aperture = None
 
-        # Test window performance
+        # Test window performance, with only a spot check when the last
+        # measurement on this display and graphics driver is recent
         win.recordFrameIntervals = True
-        frametime, _, _ = visual.getMsPerFrame(win)
-        refresh_hz = 1000 / frametime
+        key = None if cache is None else cache.fingerprint(
+            self.p.display_name, win
+        )
+        refresh_hz, refresh_check = displays.measure_refresh(
+            win, cache, key, full=self.p.full_refresh_check,
+            tolerance=self.p.refresh_error,
+        )
+        if refresh_check == "fast":
+            cached = cache.get_refresh(key)
+            print("Refresh rate spot-checked at {:.2f} Hz against a cached "
+                  "measurement of {:.2f} Hz from {:.0f} min ago; use "
+                  "--full_refresh_check to measure it fully".format(
+                      refresh_hz, cached["refresh_hz"],
+                      (time.time() - cached["time"]) / 60))
         refresh_error = abs(info["refresh_hz"] - refresh_hz)
         if refresh_error > self.p.refresh_error and not debug:
             text = "Display refresh rate differs from expected by {:.2} Hz"
             raise RuntimeError(text.format(refresh_error))
         win.recordFrameIntervals = False
 
-        # Assign attributes with helpful information and log in params
+        self.log_display_info(win, info, color, monitor,
+                              refresh_hz, refresh_check)
+
+        return win
+
+    def initialize_headless_display(self, info, color, monitor):
+        """Setup a simulated display for running without a screen.
+
+        In "offscreen" mode, stimuli are rendered to a hidden window; in
+        "null" mode, nothing is rendered. In both cases, screen flips advance
+        the experiment clock to the next simulated refresh rather than
+        waiting for the display.
+
+        """
+        offscreen = None
+        if self.p.headless == "offscreen":
+            offscreen = headless.offscreen_window(color, info["resolution"],
+                                                  monitor)
+
+        self.win = win = headless.HeadlessWindow(self.clock,
+                                                 info["refresh_hz"],
+                                                 info["resolution"],
+                                                 monitor, color, offscreen)
+
+        # Apertures need an OpenGL context
+        if self.p.aperture_radius is not None and offscreen is not None:
+            self.aperture = stimuli.BoreAperture(win,
+                                                 self.p.aperture_radius,
+                                                 self.p.aperture_center)
+        else:
+            self.aperture = None
+
+        self.log_display_info(win, info, color, monitor,
+                              info["refresh_hz"], "simulated")
+
+        return win
+
+    def log_display_info(self, win, info, color, monitor,
+                         refresh_hz, refresh_check):
+        """Assign helpful attributes to the window and log them in params."""
         win.background_color = color
         win.frametime = 1 / info["refresh_hz"]
         win.framerate = info["refresh_hz"]
@@ -495,13 +630,13 @@ class Experiment(object):
         self.p.update(win_frametime=win.frametime,
                       win_framerate=win.framerate,
                       win_deg_per_pix=win.deg_per_pix,
-                      win_pix_per_deg=win.pix_per_deg)
+                      win_pix_per_deg=win.pix_per_deg,
+                      win_refresh_hz=refresh_hz,
+                      win_refresh_check=refresh_check)
 
         # Store the display information in the params
         self.p.update(display_info=info)
 
-        return win
-
     def initialize_eyetracker(self):
         """Connect to and calibrate eyetracker."""
         # TODO Need to figure out how to handle non eye-tracking centrally
@@ -511,6 +646,10 @@ class Experiment(object):
             self.tracker = eyetracker.EyeTracker(self, self.p.eyelink_fname)
             self.tracker.run_calibration()
 
+            self.fix_monitor = eyetracker.FixationMonitor(
+                self.p.eye_fixbreak_timeout, self.p.eye_blink_timeout,
+            )
+
             # Initialize the gaze marker when simulating
             if self.p.eye_simulate:
                 stimuli.GazeStim(self.win, self.tracker)
@@ -520,7 +659,12 @@ class Experiment(object):
 
     def initialize_stimuli(self):
         """Setup stimulus objects."""
-        stims = self.create_stimuli()
+        try:
+            stims = self.create_stimuli()
+        except headless.NullWindowError as err:
+            msg = ("This study creates PsychoPy stimuli, which need a window; "
+                   "run it with `--headless offscreen` instead of `null`")
+            raise RuntimeError(msg) from err
 
         # Remove the experiment object from the stimuli
         # (allows study code to simply return locals)
@@ -551,6 +695,13 @@ class Experiment(object):
 
     # ==== Shutdown functions ====
 
+    def shutdown_realtime(self):
+        """Restore normal execution and log the between-trial collections."""
+        if self.realtime is not None:
+            self.realtime.disable()
+            self.p.realtime_gc_collections = self.realtime.gc_collections
+            self.p.realtime_gc_seconds = self.realtime.gc_seconds
+
     def shutdown_server(self):
         """Cleanly close down the experiment server process."""
         # TODO we should send some sort of shutdown signal to the
@@ -563,6 +714,30 @@ class Experiment(object):
         if self.tracker is not None:
             self.tracker.shutdown()
 
+    def shutdown_sounds(self):
+        """Close the audio output and save the log of sound onsets."""
+        if self.audio is not None:
+            self.audio.close()
+            if self.p.save_data and self.audio.log:
+                log_df = pd.DataFrame(list(self.audio.log))
+                log_fname = self.output_stem + "_sounds.csv"
+                log_df.to_csv(log_fname, index=False)
+
+    def report_headless_run(self):
+        """Log the per-frame CPU cost of a headless run in the params."""
+        summary = self.win.cost_summary()
+        self.p.update(summary)
+
+        text = ("Headless run: {headless_frames} frames, "
+                "{headless_frame_cost_median:.2f} ms median "
+                "({headless_frame_cost_p95:.2f} ms 95th percentile) "
+                "per frame, {headless_speedup:.1f}x real time")
+        print(text.format(**summary))
+
+        if self.p.headless_report is not None:
+            with open(self.p.headless_report, "w") as fid:
+                json.dump(summary, fid, sort_keys=True, indent=4)
+
     def shutdown_display(self):
         """Cleanly exit out of the psychopy window."""
         if self.win is not None:
@@ -576,23 +751,63 @@ class Experiment(object):
 
             gaze = self.tracker.read_gaze()
 
-            # Pass stimuli on the screen and their position
-            # (if they have a `pos` attribute).
-            # Note that we want to find a better way to sync arbitrary
-            # Psychopy and matplotlib commands for a richer client view
-            stim_data = {}
-            for s in stims:
-                pos = getattr(self.s[s], "pos", None)
-                pos = pos if pos is None else tuple(pos)
-                stim_data[s] = pos
+            # Pass stimuli on the screen and the attributes that are synced
+            # for each (by default, their position), sending only changes
+            if isinstance(stims, DrawPlan):
+                sync_stims = stims.sync_stims
+            else:
+                if not isinstance(stims, list):
+                    stims = [stims]
+                sync_stims = [(name, self.s[name], self.remote_attrs(name))
+                              for name in stims]
+
+            snapshot = clientserver.snapshot_stims(sync_stims)
+            data = self.screen_encoder.encode(self.clock.getTime(),
+                                              gaze, snapshot)
 
-            data = json.dumps(dict(gaze=gaze, stims=stim_data))
-            self.screen_q.put(data)
+            # If the message can't be queued (or is too large for the
+            # server process ring), drop it and send the full state next time
+            try:
+                self.screen_q.put(data, block=False)
+            except (queue.Full, ValueError):
+                self.screen_encoder.reset()
+
+    def remote_attrs(self, name):
+        """Return the attributes of a stimulus that are synced to the remote.
+
+        These are defined per stimulus name in the ``remote_stim_attrs``
+        param, falling back to ``remote_attrs``. Attributes the stimulus does
+        not have are skipped.
+
+        """
+        obj = self.s[name]
+        attrs = self.p.remote_stim_attrs.get(name, self.p.remote_attrs)
+        return [attr for attr in attrs if hasattr(obj, attr)]
 
     def sync_remote_trials(self, trial_info):
-        """Send trial information to the remote client for plotting."""
-        if self.server.connected:
-            self.trial_q.put(self.serialize_trial_info(trial_info))
+        """Send trial information to the remote client for plotting.
+
+        With the ``server_process`` param, trials are always sent, as the
+        server process also writes them to disk. A trial that the process
+        cannot take (because it died or is not keeping up) is skipped with a
+        message rather than stopping the run; all trials are still saved at
+        the end.
+
+        """
+        if not self.p.server_process:
+            if self.server.connected:
+                self.trial_q.put(self.serialize_trial_info(trial_info))
+            return
+
+        if not self.server.is_alive():
+            print("Server process is not running; trial not sent")
+            return
+        try:
+            self.trial_q.put(self.serialize_trial_info(trial_info), timeout=1)
+        except (queue.Full, ValueError) as err:
+            print("Trial not sent to server process: {}".format(
+                err or "queue is full"
+            ))
 
     def sync_remote_params(self):
         """Update eyetracking params using values from the remote client.
@@ -625,6 +840,10 @@ class Experiment(object):
                 # Currently it's not dynamically logged. See notes above.
                 self.p.fix_window = p["fix_window"]
 
+                # The server process has its own copy of the params
+                if self.p.server_process:
+                    self.server.update_params(self.p)
+
     def wait_for_exit(self):
         """Wait until the experimenter quits."""
         while True:
@@ -680,7 +899,7 @@ class Experiment(object):
         return pd.Series(t_info)
 
     def wait_until(self, end=None, timeout=np.inf, sleep=0, draw=None,
-                   check_abort=False, args=(), **kwargs):
+                   static=False, check_abort=False, args=(), **kwargs):
         """Wait limited by callback and timeout, possibly drawing stimuli.
 
         Parameters
@@ -696,8 +915,14 @@ class Experiment(object):
             Amount of time to wait on each interval. If ``0``, the window is
             drawn after each call to ``func`` and so the interval is controlled
             by the window's framerate.
-        draw : string or list of strings, optional
+        draw : string, list of strings, or DrawPlan, optional
             Name(s) of stimuli to draw in each interval.
+        static : bool, optional
+            If True, the ``draw`` stimuli do not change while waiting. They
+            are drawn once, and the screen is then left alone (with ``end``
+            checked and the remote updated once per frame) until the final
+            refreshes before the end time or timeout, which are flipped as
+            usual so that the wait stays locked to the screen refresh.
         check_abort : bool
             If True, check for the abort key after each flip.
         args : tuple
@@ -717,6 +942,10 @@ class Experiment(object):
         if sleep and stims:
             raise ValueError("`sleep` must be `0` to draw stimuli.")
 
+        # Resolve the stimuli once rather than on every flip
+        if stims and not isinstance(stims, DrawPlan):
+            stims = self.plan(stims)
+
         # Don't include final window refresh in the timeout check
         if not sleep:
             timeout -= self.win.frametime
@@ -734,8 +963,19 @@ class Experiment(object):
                 return (self.clock.getTime() + self.win.frametime) >= end
 
         # Maximum wait is controlled by timeout value
-        clock = core.Clock()
-        while clock.getTime() < timeout:
+        start = self.clock.getTime()
+
+        # Avoid redrawing an unchanging screen until the end is near
+        if static and stims:
+            resume = start + timeout
+            if func is not None and not (callable(end) or isinstance(end, str)):
+                resume = min(resume, end - self.win.frametime)
+            func_val = self.wait_static(stims, resume - 2 * self.win.frametime,
+                                        func, check_abort, args, kwargs)
+            if func_val:
+                return func_val
+
+        while (self.clock.getTime() - start) < timeout:
 
             # Check for a nonzero return from the function
             if func is not None:
@@ -749,12 +989,88 @@ class Experiment(object):
 
             # Either sleep or draw and wait for the screen refresh
             if sleep:
-                core.wait(sleep, sleep)
+                self.sleeper.wait(sleep)
             else:
                 self.draw(stims, flip=True)
 
+    def wait_static(self, stims, until, func=None, check_abort=False,
+                    args=(), kwargs=None):
+        """Show stimuli and wait without flipping, for :meth:`wait_until`.
+
+        The stimuli are drawn and flipped once. Then, once per frame until
+        ``until`` (on the experiment clock), ``func`` is checked and the
+        remote is updated, with the thread sleeping in between. Frame
+        intervals are not recorded over the gap, as no refreshes are missed.
+
+        """
+        if not isinstance(stims, (list, DrawPlan)):
+            stims = [stims]
+        kwargs = {} if kwargs is None else kwargs
+        self.draw(stims, flip=True)
+
+        record_intervals = self.win.recordFrameIntervals
+        self.win.recordFrameIntervals = False
+        try:
+            next_check = self.clock.getTime() + self.win.frametime
+            while next_check < until:
+
+                self.sleeper.wait_until(next_check)
+                next_check += self.win.frametime
+
+                if func is not None:
+                    func_val = func(*args, **kwargs)
+                    if func_val:
+                        return func_val
+
+                if check_abort:
+                    self.check_abort()
+
+                self.sync_remote_screen(stims)
+
+        finally:
+            self.win.recordFrameIntervals = record_intervals
+
+    def plan(self, stims):
+        """Resolve a list of stimulus names for fast repeated drawing.
+
+        Parameters
+        ----------
+        stims : string or list of strings
+            Name(s) of stimuli to draw, in order.
+
+        Returns
+        -------
+        plan : DrawPlan
+            Object that can be passed to :meth:`draw` or :meth:`wait_until`
+            in place of the stimulus names. The plan holds the stimulus
+            objects themselves, so it must be recreated if a stimulus in
+            ``exp.s`` is replaced (changing its attributes is fine).
+
+        """
+        return DrawPlan(self, stims)
+
+    def timeline(self, phases, round_func=np.floor, check_abort=False):
+        """Compile the phases of a trial into a frame-accurate timeline.
+
+        Parameters
+        ----------
+        phases : list of :class:`timing.Phase`
+            Phases of the trial, in order.
+        round_func : callable, optional
+            Function used to turn a duration into a number of frames.
+        check_abort : bool, optional
+            If True, check for the abort key after each flip.
+
+        Returns
+        -------
+        timeline : :class:`timing.Timeline`
+            Timeline whose ``run`` method executes the trial.
+
+        """
+        return timing.Timeline(self, phases, round_func, check_abort)
+
     def draw(self, stims, flip=True):
-        """Draw each named stimulus in the order provided."""
+        """Draw each named stimulus (or those in a DrawPlan) in order."""
 
         # TODO We want to use this central drawing method to send information
         # about what's on the screen to the client in a standardized way.
@@ -766,14 +1082,19 @@ class Experiment(object):
         # code is written that way, but not enforce it (or handle cases where
         # it is not true well)
 
-        if not isinstance(stims, list):
-            stims = [stims]
+        if isinstance(stims, DrawPlan):
+            for draw in stims.draw_funcs:
+                draw()
+        else:
+
+            if not isinstance(stims, list):
+                stims = [stims]
 
-        for stim in stims:
-            self.s[stim].draw()
+            for stim in stims:
+                self.s[stim].draw()
 
-        if self.aperture is not None:
-            self.aperture.draw()
+            if self.aperture is not None:
+                self.aperture.draw()
 
         self.sync_remote_screen(stims)
 
@@ -787,7 +1108,7 @@ class Experiment(object):
 
     def frame_range(self, seconds=None, frames=None, round_func=np.floor,
                     adjust_for_missed=True, yield_skipped=False,
-                    expected_offset=None):
+                    expected_offset=None, report=None, report_prefix="frames"):
         """Generator function for timing events based on screen flips.
 
         Either ``seconds`` or ``frames``, but not both, are required.
@@ -817,6 +1138,14 @@ class Experiment(object):
             Expected offset time for the stimulus. If provided, the generator
             will check the experiment clock and end if the next flip will be
             after the expected offset time.
+        report : dict or pandas Series, optional
+            If provided, when the generator finishes (or the loop over it is
+            exited early) the intended number of frames, the number of frames
+            generated, the indices of skipped frames, and the slippage (in
+            seconds) at the last frame are written to this object (e.g., the
+            trial info).
+        report_prefix : str, optional
+            Prefix for the keys of the values written to ``report``.
 
         Yields
         ------
@@ -840,70 +1169,88 @@ class Experiment(object):
             self.win.recordFrameIntervals = True
             self.win.frameIntervals = []
 
+        # Keep a running total of the recorded frame intervals so that each
+        # frame only adds the intervals recorded since the previous frame
+        elapsed = 0
+        n_intervals = 0
+        slippage = 0
+
+        shown = 0
+        all_skipped = []
+
         skip = 0
         frame = 0
-        while frame < frames:
+        try:
+            while frame < frames:
+
+                if frame and adjust_for_missed:
+
+                    intervals = self.win.frameIntervals
+                    elapsed += sum(intervals[n_intervals:])
+                    n_intervals = len(intervals)
 
-            if frame and adjust_for_missed:
+                    # The window does not record the interval ending at the
+                    # first flip, so the recorded intervals span the flips
+                    # from frame 0 to the last one drawn (frame - 1)
+                    slippage = elapsed - (self.win.frametime * (frame - 1))
 
-                slippage = (np.sum(self.win.frameIntervals)
-                            - (self.win.frametime * frame))
+                    # Flips land on refreshes, so round rather than floor to
+                    # avoid missing a dropped frame that measures just under
+                    # one refresh
+                    skip = max(0, int(round(slippage / self.win.frametime)))
 
-                if slippage > 0:
-                    skip = int(slippage // self.win.frametime)
+                    skipped_frames = list(range(frame, frame + skip))
+                    all_skipped.extend(skipped_frames)
+                    frame += skip
                 else:
-                    skip = 0
+                    skipped_frames = []
 
-                skipped_frames = list(range(frame, frame + skip))
-                frame += skip
-            else:
-                skipped_frames = []
+                if expected_offset is not None:
+                    now = self.clock.getTime()
+                    if expected_offset < (now + self.win.frametime):
+                        return
 
-            if expected_offset is not None:
-                now = self.clock.getTime()
-                if expected_offset < (now + self.win.frametime):
-                    return
+                shown += 1
+                if yield_skipped:
+                    yield frame, skipped_frames
+                else:
+                    yield frame
 
-            if yield_skipped:
-                yield frame, skipped_frames
-            else:
-                yield frame
+                frame += 1
+
+        finally:
 
-            frame += 1
+            if adjust_for_missed:
+                self.win.recordFrameIntervals = False
 
-        if adjust_for_missed:
-            self.win.recordFrameIntervals = False
+            if report is not None:
+                report[report_prefix + "_intended"] = frames
+                report[report_prefix + "_shown"] = shown
+                report[report_prefix + "_skipped"] = all_skipped
+                report[report_prefix + "_slippage"] = slippage
 
     def check_fixation(self, allow_blinks=False, fix_pos=None):
         """Enforce fixation but possibly allow blinks."""
         if fix_pos is None:
             fix_pos = self.p.fix_pos
         now = self.clock.getTime()
-        if self.tracker.check_fixation(fix_pos, self.p.fix_window):
-            # Eye is open and in fixation window
-            self.eye.most_recent_fixation = self.clock.getTime()
-            return True
-
-        if allow_blinks:
-
-            if self.tracker.check_eye_open(new_sample=False):
-                # Eye is outside of fixation, maybe at start or end of blink
-                last_fix = self.eye.most_recent_fixation
-                last_blink = self.eye.most_recent_blink
-                if (now - last_fix) < self.p.eye_fixbreak_timeout:
-                    return True
-                elif (now - last_blink) < self.p.eye_fixbreak_timeout:
-                    return True
+        gaze = self.tracker.read_gaze()
+        return self.fix_monitor.update(now, gaze, fix_pos, self.p.fix_window,
+                                       allow_blinks)
 
-            else:
-                # Eye is closed (or otherwise not providing valid data)
-                self.eye.most_recent_blink = now
-                blink_duration = now - self.eye.most_recent_fixation
-                if blink_duration < self.p.eye_blink_timeout:
-                    return True
+    def record_fixation_stats(self, trial_info):
+        """Add fixation statistics to the trial info, if fixation was checked.
 
-        # Either we are outside of fixation or eye has closed for too long
-        return False
+        This only works when ``trial_info`` is a pandas Series or dict; other
+        types are left unchanged.
+
+        """
+        monitor = self.fix_monitor
+        if monitor is None or not monitor.n_samples:
+            return
+        if isinstance(trial_info, (pd.Series, dict)):
+            for key, val in monitor.stats().items():
+                trial_info[key] = val
 
     def show_feedback(self, stim, result, idx=None):
         """Change the color of a stimulus to show feedback."""
@@ -948,9 +1295,62 @@ class Experiment(object):
         return (now + self.win.frametime) >= end
 
 
+class DrawPlan(object):
+    """Stimuli resolved for drawing together on many frames.
+
+    Obtain with :meth:`Experiment.plan`. The bound draw methods (including
+    the display aperture) are looked up once, as are the stimulus attributes
+    that describe the screen to the remote client.
+
+    """
+    def __init__(self, exp, stims):
+
+        if not isinstance(stims, list):
+            stims = [stims]
+        self.stims = list(stims)
+
+        objs = [exp.s[name] for name in self.stims]
+        self.draw_funcs = [obj.draw for obj in objs]
+        if exp.aperture is not None:
+            self.draw_funcs.append(exp.aperture.draw)
+
+        self.sync_stims = [(name, obj, exp.remote_attrs(name))
+                           for name, obj in zip(self.stims, objs)]
+
+    def __len__(self):
+        return len(self.stims)
+
+    def __iter__(self):
+        return iter(self.stims)
+
+    def __repr__(self):
+        return f"DrawPlan({self.stims!r})"
+
+
 default_params = dict(
 
     display_luminance=None,
+    display_cache=None,
+
+    headless=None,
+    headless_report=None,
+
+    sound_backend="auto",
+    sound_device=None,
+    sound_blocksize=64,
+
+    sleep_margin=None,
+
+    remote_attrs=["pos"],
+    remote_stim_attrs={},
+    remote_keyframe_interval=1,
+
+    server_process=False,
+
+    realtime=False,
+    realtime_cores=None,
+    realtime_priority=10,
+    realtime_lock_memory=True,
 
     aperture_radius=None,
     aperture_center=(0, 0),
@@ -981,6 +1381,19 @@ default_params = dict(
 
     eye_host_address="100.1.1.1",
 
+    eye_simulate_source=None,
+    eye_simulate_rate=1000,
+
+    eye_background_transfer=True,
+    eye_transfer_wait=300,
+
+    eye_acquisition_thread=False,
+    eye_buffer_size=4096,
+
+    eye_saccade_velocity=30,
+    eye_saccade_acceleration=9500,
+    eye_saccade_min_duration=.01,
+
     # TODO use fixbreak timeout exclusively for allowing blinks
     # or more generally allow small deviations from fix window?
     eye_fixbreak_timeout=.25,
@@ -1,9 +1,14 @@
+import os
 import itertools
+import tempfile
+import threading
+import hashlib
 import queue
+import time
+from collections import deque
 import numpy as np
 import pandas as pd
-from scipy.spatial import distance
-from psychopy import visual, event
+from psychopy import visual
 from psychopy.tools.monitorunittools import pix2deg
 
 try:
@@ -16,6 +21,9 @@ except ImportError:
     EyeLinkCustomDisplay = object
 
 from .stimuli import Point
+from .simulation import create_gaze_source
+from .ext.bunch import Bunch
+from .tools import check_gaze
 
 
 class EyeTracker(object):
@@ -33,7 +41,8 @@ class EyeTracker(object):
 
         # Extract relevant parameters
         self.host_address = exp.p.eye_host_address
-        self.simulate = exp.p.eye_simulate
+        self.simulate = (exp.p.eye_simulate
+                         or exp.p.eye_simulate_source is not None)
         self.save_data = exp.p.save_data
         self.fix_window_radius = exp.p.fix_radius
         self.monitor = exp.win.monitor
@@ -45,25 +54,57 @@ class EyeTracker(object):
         # Set up a base for log file names
         self.host_edf = edf_stem + ".EDF"
         self.save_edf = self.exp.output_stem + "_eyedat.edf"
+        self.background_transfer = exp.p.eye_background_transfer
+        self.transfer = None
 
         # Initialize lists for the logged data
         self.log_timestamps = []
         self.log_positions = []
         self.log_offsets = []
 
+        # Optionally acquire samples at the full tracker rate in the background
+        self.use_thread = exp.p.eye_acquisition_thread
+        self.buffer = GazeBuffer(exp.p.eye_buffer_size)
+        self.acquisition = None
+        if self.save_data:
+            self.sample_fname = self.exp.output_stem + "_eyesamples.csv"
+        else:
+            self.sample_fname = None
+
+        # Parse the gaze stream into fixation, saccade, and blink events
+        self.detector = GazeEventDetector(exp.p.eye_saccade_velocity,
+                                          exp.p.eye_saccade_acceleration,
+                                          exp.p.eye_saccade_min_duration)
+        self.detector_time = -np.inf
+
+        # Estimated experiment clock time minus tracker time
+        self.clock_offset = None
+        self.clock_offset_time = None
+
+        # Serialize access to the link when a second thread is reading it
+        self.link_lock = threading.Lock()
+
         # Initialize the connection to the EyeLink box
         self.setup_eyelink()
 
+        # The mouse can only be read from the main thread
+        if self.simulate and not self.tracker.threadsafe:
+            self.use_thread = False
+
     def setup_eyelink(self):
         """Connect to the EyeLink box at given host address and run setup."""
         if self.simulate:
-            self.tracker = event.Mouse(visible=False, win=self.exp.win)
+            self.tracker = create_gaze_source(self.exp)
 
         else:
 
             if not have_pylink:
                 raise ImportError("No module named pylink")
 
+            # The link can't be shared with the EDF transfer of a prior run
+            wait_for_transfers(self.host_address,
+                               self.exp.p.eye_transfer_wait)
+
             # Connect to the eyetracker
             self.tracker = pylink.EyeLink(self.host_address)
 
@@ -115,23 +156,116 @@ class EyeTracker(object):
             self.tracker.startRecording(1, 1, 1, 1)
             self.send_message("SYNCTIME")
 
+        if self.use_thread:
+            self.acquisition = GazeAcquisitionThread(self, self.sample_fname)
+            self.acquisition.start()
+
     def send_message(self, msg):
         """Send a message to the eyetracker, or no-op in simulation mode."""
         if not self.simulate:
-            self.tracker.sendMessage(msg)
+            with self.link_lock:
+                self.tracker.sendMessage(msg)
+
+    def convert_sample(self, sample):
+        """Return gaze position (in degrees) from an EyeLink sample object."""
+        if sample.isLeftSample():
+            gaze_eyelink = np.array(sample.getLeftEye().getGaze())
+        elif sample.isRightSample():
+            gaze_eyelink = np.array(sample.getRightEye().getGaze())
+        else:
+            raise RuntimeError("Must do monocular tracking!")
+
+        if any(gaze_eyelink == pylink.MISSING_DATA):
+            gaze = np.nan, np.nan
+        else:
+            gaze_pix = np.subtract(gaze_eyelink, self.center)
+            gaze = tuple(pix2deg(gaze_pix, self.monitor))
+
+        return gaze
+
+    def drain_samples(self):
+        """Return every sample waiting in the link queue.
+
+        Each sample is a tuple of (timestamp, tracker time, x, y), where
+        the timestamp is the experiment clock time when the sample was read,
+        the tracker time is in seconds on the EyeLink clock, and the position
+        is in degrees (without offsets).
+
+        """
+        if self.simulate:
+            return self.tracker.drain(self.exp.clock.getTime())
+
+        samples = []
+        with self.link_lock:
+            while True:
+                data_type = self.tracker.getNextData()
+                if not data_type:
+                    break
+                if data_type == pylink.SAMPLE_TYPE:
+                    sample = self.tracker.getFloatData()
+                    timestamp = self.exp.clock.getTime()
+                    x, y = self.convert_sample(sample)
+                    samples.append((timestamp, sample.getTime() / 1000, x, y))
+        return samples
+
+    def sync_clocks(self, timestamp, tracker_time, max_drift=1e-4):
+        """Update the offset between the experiment and tracker clocks.
+
+        The offset is the smallest difference seen between the time a sample
+        was read and its tracker time, as that sample was read with the least
+        delay. The estimate may rise by ``max_drift`` seconds per second to
+        follow a host clock that runs faster than the tracker clock.
+
+        """
+        offset = timestamp - tracker_time
+        if self.clock_offset is not None:
+            elapsed = tracker_time - self.clock_offset_time
+            offset = min(offset, self.clock_offset + max_drift * elapsed)
+        self.clock_offset = offset
+        self.clock_offset_time = tracker_time
+
+    def sample_time(self, tracker_time):
+        """Return the experiment clock time when a sample was taken."""
+        return tracker_time + self.clock_offset
+
+    def latest_sample(self):
+        """Return (timestamp, x, y) of newest buffered sample, without offsets.
+
+        Returns None if the acquisition thread has not provided a sample.
+
+        """
+        sample = self.buffer.latest()
+        if sample is not None:
+            return sample[0], sample[2], sample[3]
+
+    def recent_samples(self, n):
+        """Return an (n, 4) array with the most recent buffered samples.
+
+        Columns are timestamp, tracker time, x, and y, without offsets.
+
+        """
+        return self.buffer.last(n)
 
     def read_gaze(self, log=True, apply_offsets=True):
         """Return the position of gaze in degrees, subject to offsets."""
         timestamp = self.exp.clock.getTime()
 
-        # Allow simulation using the mouse
-        if self.simulate:
+        if self.acquisition is not None:
 
-            if self.tracker.getPressed()[0]:
-                # Simulate blinks with main button down
+            # Use the most recent sample from the acquisition thread
+            sample = self.latest_sample()
+            if sample is None:
                 gaze = np.nan, np.nan
             else:
-                gaze = self.tracker.getPos()
+                gaze = sample[1:]
+
+        elif self.simulate:
+
+            # Allow simulation using the mouse or a synthetic gaze source,
+            # which produces a new sample at its own rate
+            gaze = self.tracker.read(timestamp)
+            if timestamp - self.detector_time >= 1 / self.tracker.rate:
+                self.parse_sample(timestamp, gaze)
 
         else:
 
@@ -140,20 +274,11 @@ class EyeTracker(object):
 
             if sample is None:
                 gaze = np.nan, np.nan
-
             else:
-                if sample.isLeftSample():
-                    gaze_eyelink = np.array(sample.getLeftEye().getGaze())
-                elif sample.isRightSample():
-                    gaze_eyelink = np.array(sample.getRightEye().getGaze())
-                else:
-                    raise RuntimeError("Must do monocular tracking!")
-
-                if any(gaze_eyelink == pylink.MISSING_DATA):
-                    gaze = np.nan, np.nan
-                else:
-                    gaze_pix = np.subtract(gaze_eyelink, self.center)
-                    gaze = tuple(pix2deg(gaze_pix, self.monitor))
+                gaze = self.convert_sample(sample)
+                tracker_time = sample.getTime() / 1000
+                self.sync_clocks(timestamp, tracker_time)
+                self.parse_sample(self.sample_time(tracker_time), gaze)
 
         # Add to the low-resolution log
         if log:
@@ -167,6 +292,17 @@ class EyeTracker(object):
 
         return gaze
 
+    def parse_sample(self, sample_time, gaze):
+        """Pass a sample to the event detector if it has not seen it yet.
+
+        Without the acquisition thread, this happens when gaze is read, so
+        events are parsed at the read rate.
+
+        """
+        if sample_time > self.detector_time:
+            self.detector_time = sample_time
+            self.detector.update(sample_time, *gaze)
+
     def check_fixation(self, pos=(0, 0), radius=None,
                        new_sample=True, log=True):
         """Return True if eye is in the fixation window."""
@@ -176,11 +312,7 @@ class EyeTracker(object):
             gaze = np.array(self.log_positions[-1]) + self.log_offsets[-1]
         if radius is None:
             radius = self.fix_window_radius
-        if np.isfinite(gaze).all():
-            fix_distance = distance.euclidean(pos, gaze)
-            if fix_distance < radius:
-                return True
-        return False
+        return check_gaze(gaze, pos, radius)
 
     def check_eye_open(self, new_sample=True, log=True):
         """Return True if we get a valid sample of the eye position."""
@@ -212,15 +344,28 @@ class EyeTracker(object):
             pass
 
     def close_connection(self):
-        """Close down the connection to Eyelink and save the eye data."""
+        """Close down the connection to Eyelink and save the eye data.
+
+        The acquisition thread (if any) is stopped first, which finishes
+        writing the full-rate sample log.
+
+        When the ``eye_background_transfer`` parameter is True, this happens
+        in a background thread so that the method returns immediately. The
+        thread is not a daemon, so the process stays alive until the EDF file
+        has been received, and a new run waits (up to ``eye_transfer_wait``
+        seconds) for it to finish before connecting to the tracker.
+
+        """
+        if self.acquisition is not None:
+            self.acquisition.join(timeout=5)
         if not self.simulate:
-            self.tracker.stopRecording()
-            self.tracker.setOfflineMode()
-            pylink.msecDelay(500)
-            self.tracker.closeDataFile()
-            if self.save_data:
-                self.tracker.receiveDataFile(self.host_edf, self.save_edf)
-            self.tracker.close()
+            save_edf = self.save_edf if self.save_data else None
+            self.transfer = EDFTransfer(self.tracker, self.host_edf, save_edf,
+                                        TransferLock(self.host_address))
+            if self.background_transfer:
+                self.transfer.start()
+            else:
+                self.transfer.close_tracker()
 
     def write_log_data(self):
         """Save the low temporal resolution eye tracking data."""
@@ -239,6 +384,586 @@ class EyeTracker(object):
             self.write_log_data()
 
 
+_pending_transfers = []
+
+
+def wait_for_transfers(host=None, timeout=None):
+    """Block until EDF transfers over the link have finished.
+
+    Transfers started in this process are always waited for. With ``host``,
+    transfers that a previous run (in another process) is still receiving
+    from that tracker are waited for too, up to ``timeout`` seconds, after
+    which a RuntimeError is raised.
+
+    """
+    while _pending_transfers:
+        transfer = _pending_transfers.pop()
+        if transfer.is_alive():
+            transfer.join(timeout)
+
+    if host is not None:
+        lock = TransferLock(host)
+        if not lock.acquire(block=False):
+            print("Waiting for a previous run to receive its EDF file")
+            if not lock.acquire(timeout=timeout):
+                err = ("The EDF file of a previous run is still being "
+                       "received from {}".format(host))
+                raise RuntimeError(err)
+        lock.release()
+
+
+class TransferLock(object):
+    """Lock on the link to one EyeLink host that works across processes.
+
+    The lock is held while an EDF file is being received. It is an operating
+    system lock on a file in the temporary directory, so it is released if
+    the process holding it dies.
+
+    """
+    def __init__(self, host):
+
+        name = "visigoth-edf-{}.lock".format(host.replace(":", "-"))
+        self.fname = os.path.join(tempfile.gettempdir(), name)
+        self.fid = None
+
+    def _try_lock(self):
+
+        fid = open(self.fname, "a")
+        try:
+            if os.name == "nt":
+                import msvcrt
+                msvcrt.locking(fid.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(fid.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            fid.close()
+            return False
+        self.fid = fid
+        return True
+
+    def acquire(self, block=True, timeout=None, poll_interval=.1):
+        """Take the lock, returning False if it could not be taken in time."""
+        start = time.time()
+        while not self._try_lock():
+            if not block or (timeout is not None
+                             and time.time() - start > timeout):
+                return False
+            time.sleep(poll_interval)
+        return True
+
+    def release(self):
+
+        if self.fid is not None:
+            if os.name == "nt":
+                import msvcrt
+                self.fid.seek(0)
+                msvcrt.locking(self.fid.fileno(), msvcrt.LK_UNLCK, 1)
+            self.fid.close()
+            self.fid = None
+
+
+class EDFTransfer(threading.Thread):
+    """Shut down the EyeLink and retrieve the EDF file in the background.
+
+    The file is first written with a ``.part`` suffix and renamed once it has
+    been received completely, and an md5 checksum is saved next to it (with an
+    ``.md5`` suffix). Progress (the number of bytes received) is printed every
+    ``report_interval`` seconds. When a :class:`TransferLock` is given, it is
+    held until the connection is closed, so a run in another process can
+    wait for the link to be free.
+
+    """
+    def __init__(self, tracker, host_edf, save_edf=None, lock=None,
+                 report_interval=2):
+
+        super(EDFTransfer, self).__init__()
+        self.tracker = tracker
+        self.host_edf = host_edf
+        self.save_edf = save_edf
+        self.lock = lock
+        self.report_interval = report_interval
+
+        self.done = threading.Event()
+        self.checksum = None
+        self.error = None
+
+        _pending_transfers.append(self)
+
+    @property
+    def part_fname(self):
+        return self.save_edf + ".part"
+
+    def progress(self):
+        """Return the number of bytes received so far."""
+        if self.save_edf is None:
+            return 0
+        for fname in [self.part_fname, self.save_edf]:
+            if os.path.exists(fname):
+                return os.path.getsize(fname)
+        return 0
+
+    def report_progress(self):
+        """Print progress of the transfer until it is done."""
+        while not self.done.wait(self.report_interval):
+            print("Receiving {}: {:,d} bytes".format(self.host_edf,
+                                                     self.progress()))
+
+    def close_tracker(self):
+        """Stop recording, receive the EDF file, and close the connection."""
+        if self.lock is None:
+            self._close_tracker()
+        else:
+            self.lock.acquire()
+            try:
+                self._close_tracker()
+            finally:
+                self.lock.release()
+
+    def _close_tracker(self):
+
+        self.tracker.stopRecording()
+        self.tracker.setOfflineMode()
+        pylink.msecDelay(500)
+        self.tracker.closeDataFile()
+
+        if self.save_edf is not None:
+
+            self.tracker.receiveDataFile(self.host_edf, self.part_fname)
+
+            md5 = hashlib.md5()
+            with open(self.part_fname, "rb") as fid:
+                for chunk in iter(lambda: fid.read(2 ** 20), b""):
+                    md5.update(chunk)
+            self.checksum = md5.hexdigest()
+
+            with open(self.save_edf + ".md5", "w") as fid:
+                fid.write("{}  {}\n".format(self.checksum,
+                                            os.path.basename(self.save_edf)))
+            os.replace(self.part_fname, self.save_edf)
+
+        self.tracker.close()
+
+    def run(self):
+
+        reporter = threading.Thread(target=self.report_progress)
+        reporter.daemon = True
+        reporter.start()
+
+        try:
+            self.close_tracker()
+            if self.save_edf is not None:
+                print("Saved {} (md5 {})".format(self.save_edf, self.checksum))
+        except Exception as err:
+            self.error = err
+            print("EDF transfer failed: {}".format(err))
+        finally:
+            self.done.set()
+
+
+class GazeBuffer(object):
+    """Fixed-size ring buffer of gaze samples.
+
+    The buffer is designed for one writer (the acquisition thread) and any
+    number of readers. The writer fills a row before advancing the sample
+    count, so readers can take the newest samples without acquiring a lock.
+    Each row has the timestamp, tracker time, and x, y gaze position.
+
+    """
+    def __init__(self, size=4096):
+
+        self.size = size
+        self.data = np.full((size, 4), np.nan)
+        self.count = 0
+
+    def append(self, sample):
+        """Add a (timestamp, tracker time, x, y) sample."""
+        self.data[self.count % self.size] = sample
+        self.count += 1
+
+    def latest(self):
+        """Return a copy of the newest sample, or None if buffer is empty."""
+        count = self.count
+        if count:
+            return self.data[(count - 1) % self.size].copy()
+
+    def last(self, n):
+        """Return a copy of (up to) the ``n`` newest samples, oldest first.
+
+        At most ``size - 1`` samples are returned, as the row after the
+        newest one may be being overwritten.
+
+        """
+        while True:
+            count = self.count
+            n_rows = min(n, count, self.size - 1)
+            idx = np.arange(count - n_rows, count) % self.size
+            data = self.data[idx]
+
+            # Retry if the writer wrapped around onto the oldest copied rows
+            if self.count < count - n_rows + self.size:
+                return data
+
+
+class GazeAcquisitionThread(threading.Thread):
+    """Background thread that reads samples at the full tracker rate.
+
+    When ``log_fname`` is given, every sample is appended to it as a csv
+    row. Rows are written in chunks of ``chunk_size`` samples, or after
+    ``flush_interval`` seconds, so memory use stays constant and little is
+    lost if the process crashes.
+
+    """
+    def __init__(self, tracker, log_fname=None, poll_interval=.0005,
+                 chunk_size=1000, flush_interval=1):
+
+        super(GazeAcquisitionThread, self).__init__()
+        self.tracker = tracker
+        self.log_fname = log_fname
+        self.poll_interval = poll_interval
+        self.chunk_size = chunk_size
+        self.flush_interval = flush_interval
+        self.alive = threading.Event()
+        self.alive.set()
+        self.daemon = True
+
+    def join(self, timeout=None):
+
+        self.alive.clear()
+        threading.Thread.join(self, timeout)
+
+    def write_samples(self, fid, samples):
+
+        np.savetxt(fid, samples, fmt="%.6f", delimiter=",")
+        fid.flush()
+
+    def run(self):
+
+        if self.log_fname is None:
+            self.acquire(None)
+        else:
+            with open(self.log_fname, "w") as fid:
+                fid.write("time,tracker_time,x,y\n")
+                self.acquire(fid)
+
+    def acquire(self, fid):
+
+        tracker = self.tracker
+        buffer = tracker.buffer
+
+        pending = []
+        last_write = time.perf_counter()
+
+        while self.alive.is_set():
+
+            # Events are parsed using the time each sample was taken, as a
+            # backlog of samples is read at nearly the same time; the newest
+            # sample was read with the least delay, so it syncs the clocks
+            samples = tracker.drain_samples()
+            if samples:
+                tracker.sync_clocks(*samples[-1][:2])
+            for sample in samples:
+                buffer.append(sample)
+                tracker.parse_sample(tracker.sample_time(sample[1]),
+                                     sample[2:])
+
+            if fid is not None:
+                pending.extend(samples)
+                now = time.perf_counter()
+                if pending and (len(pending) >= self.chunk_size
+                                or now - last_write > self.flush_interval):
+                    self.write_samples(fid, pending)
+                    pending = []
+                    last_write = now
+
+            if not samples:
+                time.sleep(self.poll_interval)
+
+        if pending:
+            self.write_samples(fid, pending)
+
+
+class GazeEventDetector(object):
+    """Online parser of the gaze stream into oculomotor events.
+
+    Each sample is classified using velocity and acceleration thresholds,
+    similar to the EyeLink parser, with a constant amount of work per sample.
+    To keep measurement noise from looking like eye movements, velocity is
+    estimated with a five-sample central difference, so each sample is
+    classified once the two samples after it have arrived. A saccade ending
+    sooner than ``min_saccade_duration`` is treated as noise, and the
+    fixation it interrupted continues. Completed events are stored (up to
+    ``max_events``) as Bunch objects with ``kind`` ("fixation", "saccade",
+    or "blink"), ``onset``, and ``offset`` fields; saccades also have
+    ``start_pos``, ``end_pos``, and ``peak_velocity``.
+    Timestamps use whatever clock the samples come with, and must be the
+    times the samples were taken, not when they were read.
+
+    """
+    def __init__(self, velocity_threshold=30, acceleration_threshold=None,
+                 min_saccade_duration=.01, max_events=64):
+
+        self.velocity_threshold = velocity_threshold
+        if acceleration_threshold is None:
+            acceleration_threshold = np.inf
+        self.acceleration_threshold = acceleration_threshold
+        self.min_saccade_duration = min_saccade_duration
+
+        self.events = deque(maxlen=max_events)
+
+        # Current (kind, onset) pair, reassigned as a unit for other threads
+        self.current = None, None
+
+        self._window = deque(maxlen=5)
+        self._velocity = None
+        self._fixation_onset = None
+        self._start_pos = None
+        self._peak_velocity = 0
+
+    @property
+    def state(self):
+        """Kind of the ongoing event, or None before the first sample."""
+        return self.current[0]
+
+    def _begin(self, kind, onset):
+
+        self.current = kind, onset
+
+    def _end(self, offset, **kwargs):
+
+        kind, onset = self.current
+        if kind == "saccade":
+            # The fixation before a saccade is only complete once the
+            # saccade has been confirmed
+            self.events.append(Bunch(kind="fixation",
+                                     onset=self._fixation_onset,
+                                     offset=onset))
+            kwargs.update(start_pos=self._start_pos,
+                          peak_velocity=self._peak_velocity)
+        if kind is not None:
+            self.events.append(Bunch(kind=kind, onset=onset, offset=offset,
+                                     **kwargs))
+
+    def update(self, timestamp, x, y):
+        """Process a new sample (in degrees) and return the current state.
+
+        The state applies to the sample two before this one (or to this
+        sample, at the start of a fixation or blink).
+
+        """
+        window = self._window
+        state = self.current[0]
+
+        # Missing data means the eye is closed (or tracking was lost)
+        if x != x or y != y:
+            if state != "blink":
+                if window:
+                    offset, x_last, y_last = window[-1]
+                else:
+                    offset, x_last, y_last = timestamp, x, y
+                if state == "saccade":
+                    self._end(offset, end_pos=(x_last, y_last))
+                else:
+                    self._end(offset)
+                self._begin("blink", timestamp)
+            window.clear()
+            return "blink"
+
+        if window and timestamp <= window[-1][0]:
+            return state
+
+        window.append((timestamp, x, y))
+
+        # First valid sample after a blink (or ever) starts a fixation
+        if len(window) == 1:
+            self._end(timestamp)
+            self._begin("fixation", timestamp)
+            self._velocity = None
+            return "fixation"
+
+        if len(window) < 5:
+            return state
+
+        # Velocity of the middle sample from the two samples on either side
+        (t0, x0, y0), (t1, x1, y1), (t2, x2, y2), (t3, x3, y3), \
+            (t4, x4, y4) = window
+        span = t4 + t3 - t1 - t0
+        vx = (x4 + x3 - x1 - x0) / span
+        vy = (y4 + y3 - y1 - y0) / span
+        velocity = (vx * vx + vy * vy) ** .5
+
+        if self._velocity is None:
+            acceleration = 0
+        else:
+            acceleration = abs(velocity - self._velocity) / (t2 - t1)
+        moving = (velocity > self.velocity_threshold
+                  or (state == "fixation"
+                      and acceleration > self.acceleration_threshold))
+
+        if moving:
+            if state != "saccade":
+                self._fixation_onset = self.current[1]
+                self._begin("saccade", t1)
+                self._start_pos = x1, y1
+                self._peak_velocity = velocity
+            elif velocity > self._peak_velocity:
+                self._peak_velocity = velocity
+            state = "saccade"
+
+        elif state == "saccade":
+            onset = self.current[1]
+            if t2 - onset >= self.min_saccade_duration:
+                self._end(t2, end_pos=(x2, y2))
+                self._begin("fixation", t2)
+            else:
+                self._begin("fixation", self._fixation_onset)
+            state = "fixation"
+
+        self._velocity = velocity
+        return state
+
+    def last_event(self, kind=None):
+        """Return the most recent completed event, optionally of one kind."""
+        for evt in reversed(list(self.events)):
+            if kind is None or evt.kind == kind:
+                return evt
+
+    def saccade_onset(self, now, tolerance=.01):
+        """Return onset of the saccade in progress around time ``now``.
+
+        A saccade counts if it is ongoing or ended no more than ``tolerance``
+        seconds before ``now``. Returns None otherwise, so that an unrelated
+        earlier saccade is never reported.
+
+        """
+        kind, onset = self.current
+        if kind == "saccade":
+            return onset
+        last = self.last_event("saccade")
+        if last is not None and last.offset >= now - tolerance:
+            return last.onset
+
+
+class FixationMonitor(object):
+    """State machine that enforces fixation while possibly allowing blinks.
+
+    The monitor consumes one gaze sample per call to :meth:`update` and moves
+    between four states: "fixating" (eye in the window), "excursion" (eye open
+    but briefly outside the window, e.g. at the start or end of a blink),
+    "blinking" (no valid data), and "broken" (fixation was not maintained).
+    It also accumulates per-trial statistics about blinks and fixation breaks.
+
+    """
+    __slots__ = [
+        "fixbreak_timeout", "blink_timeout",
+        "state", "last_fixation", "last_blink", "last_update",
+        "n_samples", "n_blinks", "n_excursions", "n_breaks",
+        "blink_time", "excursion_time",
+    ]
+
+    def __init__(self, fixbreak_timeout=.25, blink_timeout=.5):
+
+        self.fixbreak_timeout = fixbreak_timeout
+        self.blink_timeout = blink_timeout
+
+        self.state = None
+        self.last_fixation = 0
+        self.last_blink = 0
+
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Clear the statistics (e.g. at the start of a trial)."""
+        self.last_update = None
+        self.n_samples = 0
+        self.n_blinks = 0
+        self.n_excursions = 0
+        self.n_breaks = 0
+        self.blink_time = 0
+        self.excursion_time = 0
+
+    def _enter(self, state, now):
+
+        # Attribute the time since the last sample to the previous state
+        if self.last_update is not None:
+            elapsed = now - self.last_update
+            if self.state == "blinking":
+                self.blink_time += elapsed
+            elif self.state == "excursion":
+                self.excursion_time += elapsed
+
+        if state != self.state:
+            if state == "blinking":
+                self.n_blinks += 1
+            elif state == "excursion":
+                self.n_excursions += 1
+            elif state == "broken":
+                self.n_breaks += 1
+
+        self.state = state
+        self.last_update = now
+        self.n_samples += 1
+
+    def update(self, now, gaze, pos, window, allow_blinks=False):
+        """Advance the state machine and return True if fixation is held.
+
+        Parameters
+        ----------
+        now : float
+            Timestamp of the sample.
+        gaze : 2 tuple
+            Gaze coordinates, (x, y), with NaN when the eye is not tracked.
+        pos : 2 tuple
+            Center of the fixation window.
+        window : float
+            Radius of the fixation window.
+        allow_blinks : bool
+            If True, tolerate missing data and brief excursions from the
+            window according to the timeout values.
+
+        Returns
+        -------
+        fixating : bool
+            False if fixation should be considered broken.
+
+        """
+        x, y = gaze
+        valid = x == x and y == y
+
+        if valid:
+            dx, dy = x - pos[0], y - pos[1]
+            if (dx * dx + dy * dy) < (window * window):
+                self.last_fixation = now
+                self._enter("fixating", now)
+                return True
+
+        if allow_blinks:
+
+            if valid:
+                if ((now - self.last_fixation) < self.fixbreak_timeout
+                        or (now - self.last_blink) < self.fixbreak_timeout):
+                    self._enter("excursion", now)
+                    return True
+
+            else:
+                self.last_blink = now
+                if (now - self.last_fixation) < self.blink_timeout:
+                    self._enter("blinking", now)
+                    return True
+
+        self._enter("broken", now)
+        return False
+
+    def stats(self):
+        """Return a dict of fixation statistics since the last reset."""
+        return dict(fix_samples=self.n_samples,
+                    fix_blinks=self.n_blinks,
+                    fix_blink_time=self.blink_time,
+                    fix_excursions=self.n_excursions,
+                    fix_excursion_time=self.excursion_time,
+                    fix_breaks=self.n_breaks)
+
+
 class Calibrator(EyeLinkCustomDisplay):
 
     def __init__(self, win, target_color):
@@ -246,6 +971,11 @@ class Calibrator(EyeLinkCustomDisplay):
         self.win = win
         self.target = CalibrationTarget(win, target_color)
         self.eye_image_size = 384, 320
+        self.eye_image_offset = np.divide(self.eye_image_size, 2)
+
+        # Crosshair segments are reused across frames of the camera image
+        self.cross_hair_lines = []
+        self.cross_hair_count = 0
 
     def get_input_key(self):
         # TODO This will let things run but experiment keyboard won't
@@ -321,7 +1051,10 @@ class Calibrator(EyeLinkCustomDisplay):
 
         # Note differences from numpy convention in terms of rows/cols
         # Also may not generalize to other eyetracker models.
-        self.rgb_index_array = np.zeros((height / 2, width / 2), np.uint8)
+        # The index and RGB buffers persist and are filled in place.
+        shape = height // 2, width // 2
+        self.rgb_index_array = np.zeros(shape, np.uint8)
+        self.rgb_image = np.zeros(shape + (3,), np.float32)
 
         # TODO test width/height against the hardcoded values and make
         # it more obvious when we are trying to set up on an Eyelink model
@@ -339,31 +1072,43 @@ class Calibrator(EyeLinkCustomDisplay):
 
         # Note that Eyelink increases the index as you move down the screen,
         # opposite to the convention in PsychoPy. We could also flip the array.
-        self.rgb_index_array[-line] = np.asarray(buff)
+        self.rgb_index_array[-line] = buff
 
         if line == total_lines:
 
-            image = self.rgb_palette[self.rgb_index_array]
-            self.eye_image.image = image
+            # Palette lookup into the persistent image buffer
+            np.take(self.rgb_palette, self.rgb_index_array, axis=0,
+                    out=self.rgb_image, mode="clip")
+            self.eye_image.image = self.rgb_image
 
             self.eye_image.draw()
             self.eye_image_title.draw()
+            self.cross_hair_count = 0
             self.draw_cross_hair()
 
             self.win.flip()
 
     def draw_line(self, x1, y1, x2, y2, colorindex):
 
-        xadj, yadj = np.divide(self.eye_image_size, 2)
+        xadj, yadj = self.eye_image_offset
         start = x1 - xadj, -y1 + yadj
         end = x2 - xadj, -y2 + yadj
-        line = visual.Line(self.win, start, end,
-                           units="pix", lineColor="white")
+
+        if self.cross_hair_count < len(self.cross_hair_lines):
+            line = self.cross_hair_lines[self.cross_hair_count]
+            line.start = start
+            line.end = end
+        else:
+            line = visual.Line(self.win, start, end,
+                               units="pix", lineColor="white", autoLog=False)
+            self.cross_hair_lines.append(line)
+        self.cross_hair_count += 1
+
         line.draw()
 
     def set_image_palette(self, r, g, b):
 
-        rgb = np.column_stack([r, g, b]).astype(np.float)
+        rgb = np.column_stack([r, g, b]).astype(np.float32)
         self.rgb_palette = rgb / 255
 
 
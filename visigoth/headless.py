@@ -0,0 +1,181 @@
+"""Windows and clocks for running experiments without a display."""
+from __future__ import division
+import time
+
+import numpy as np
+
+
+class VsyncClock(object):
+    """Virtual clock with the PsychoPy Clock API driven by simulated flips.
+
+    Time only advances when the window flips (to the next simulated vertical
+    blank) or when code explicitly waits, so an experiment runs as fast as
+    the Python code allows while its timing logic sees a perfect display.
+
+    """
+    def __init__(self, frametime=None):
+
+        self.frametime = frametime
+        self.time = 0.
+        self.reset_time = 0.
+
+    def getTime(self):
+        return self.time - self.reset_time
+
+    def reset(self, newT=0.):
+        self.reset_time = self.time + newT
+
+    def wait(self, secs):
+        """Advance the clock by ``secs``."""
+        self.time += max(secs, 0)
+
+    def wait_until(self, t):
+        """Advance the clock to ``t`` (if it is in the future)."""
+        self.wait(t - self.getTime())
+
+    def next_vsync(self):
+        """Advance the clock to the next vertical blank and return it."""
+        frames = np.floor(self.time / self.frametime + 1e-6) + 1
+        self.time = frames * self.frametime
+        return self.time
+
+
+class NullWindowError(AttributeError):
+    """Raised when code needs a real window in the "null" headless mode."""
+    pass
+
+
+class HeadlessWindow(object):
+    """Stand-in for a PsychoPy Window with simulated screen refreshes.
+
+    When ``win`` is an (offscreen) PsychoPy Window, stimuli are still drawn
+    into it and attributes that the stand-in does not manage itself are read
+    from and written to it, but flips do not wait for a display and instead
+    advance the virtual clock. Without a window (the "null" mode), nothing is
+    rendered, so PsychoPy stimuli cannot be created.
+
+    The CPU time spent between consecutive flips is recorded to profile the
+    per-frame cost of the Python code.
+
+    """
+    # Attributes that belong to the stand-in rather than the wrapped window
+    _own_attrs = frozenset([
+        "_win", "clock", "framerate", "frametime",
+        "_record_intervals", "frameIntervals", "nDroppedFrames",
+        "frame_costs", "last_flip", "last_cpu", "start_cpu", "start_time",
+    ])
+
+    def __init__(self, clock, framerate, size, monitor, color=0, win=None):
+
+        clock.frametime = 1 / framerate
+
+        self._win = win
+        self.clock = clock
+        self.framerate = framerate
+        self.frametime = 1 / framerate
+
+        # A wrapped window has its own display attributes
+        if win is None:
+            self.size = np.asarray(size)
+            self.monitor = monitor
+            self.color = color
+            self.units = "deg"
+
+        self._record_intervals = False
+        self.frameIntervals = []
+        self.nDroppedFrames = 0
+
+        self.frame_costs = []
+        self.last_flip = None
+        self.last_cpu = time.perf_counter()
+        self.start_cpu = self.last_cpu
+        self.start_time = clock.time
+
+    def __getattr__(self, name):
+
+        win = self.__dict__.get("_win")
+        if win is None:
+            err = (f"Headless null window has no attribute {name!r}; "
+                   "use offscreen mode to create PsychoPy stimuli")
+            raise NullWindowError(err)
+        return getattr(win, name)
+
+    def __setattr__(self, name, value):
+
+        win = self.__dict__.get("_win")
+        if (win is None or name in self._own_attrs
+                or hasattr(type(self), name)):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(win, name, value)
+
+    @property
+    def recordFrameIntervals(self):
+        return self._record_intervals
+
+    @recordFrameIntervals.setter
+    def recordFrameIntervals(self, value):
+        # As in PsychoPy, the interval ending at the first flip after
+        # recording is (re)enabled is not recorded
+        if value and not self._record_intervals:
+            self.last_flip = None
+        self._record_intervals = value
+
+    def flip(self, clearBuffer=True):
+        """Render (if possible) and advance the clock to the next refresh."""
+        if self._win is not None:
+            self._win.flip(clearBuffer)
+
+        now = time.perf_counter()
+        self.frame_costs.append(now - self.last_cpu)
+        self.last_cpu = now
+
+        flip_time = self.clock.next_vsync()
+        if self.recordFrameIntervals and self.last_flip is not None:
+            self.frameIntervals.append(flip_time - self.last_flip)
+        self.last_flip = flip_time
+
+        return flip_time
+
+    def setMouseVisible(self, visible):
+        pass
+
+    def close(self):
+
+        if self._win is not None:
+            self._win.close()
+
+    def cost_summary(self):
+        """Return statistics about the per-frame CPU cost (in ms)."""
+        costs = np.asarray(self.frame_costs) * 1000
+        real = time.perf_counter() - self.start_cpu
+        virtual = self.clock.time - self.start_time
+        if not costs.size:
+            costs = np.full(1, np.nan)
+        return dict(
+            headless_frames=len(self.frame_costs),
+            headless_frame_cost_mean=float(np.mean(costs)),
+            headless_frame_cost_median=float(np.median(costs)),
+            headless_frame_cost_p95=float(np.percentile(costs, 95)),
+            headless_frame_cost_max=float(np.max(costs)),
+            headless_frame_overruns=int(np.sum(costs > self.frametime * 1000)),
+            headless_speedup=float(virtual / real) if real else np.nan,
+        )
+
+
+def offscreen_window(color, size, monitor):
+    """Open a hidden PsychoPy window that renders without a display.
+
+    Set ``PYGLET_HEADLESS=1`` before importing PsychoPy to render with EGL
+    when there is no X server (e.g. with Mesa's software renderer).
+
+    """
+    from psychopy import visual
+    return visual.Window(units="deg",
+                         fullscr=False,
+                         allowGUI=False,
+                         color=color,
+                         size=size,
+                         monitor=monitor,
+                         waitBlanking=False,
+                         autoLog=False)
@@ -0,0 +1,155 @@
+"""Process settings that reduce timing jitter while trials are running."""
+import gc
+import os
+import time
+import ctypes
+import ctypes.util
+
+MCL_CURRENT = 1
+
+
+def _libc():
+
+    return ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+
+
+class RealtimeMode(object):
+    """Opt-in interventions against dropped frames during a run.
+
+    Each intervention is attempted independently and skipped (with the
+    reason logged) if the platform does not support it or the process lacks
+    permission. The outcome of each is stored in :attr:`log`, so it can be
+    saved with the params.
+
+    The scheduling interventions apply to the thread that calls
+    :meth:`enable` (the drawing loop); threads that are already running,
+    like the server and gaze acquisition threads, are left alone.
+
+    Parameters
+    ----------
+    cores : list of ints, optional
+        CPU cores to pin the calling thread to.
+    priority : int, optional
+        ``SCHED_FIFO`` priority to request; if that is not permitted, the
+        process niceness is lowered as far as allowed instead. If None, the
+        scheduling is not changed.
+    lock_memory : bool, optional
+        If True, lock the pages the process has mapped into RAM to avoid page
+        faults. Memory allocated later is not locked, so that allocations
+        during the run cannot fail once the memlock limit is reached.
+    manage_gc : bool, optional
+        If True, freeze the objects created during initialization so the
+        collector ignores them, and collect only between trials.
+
+    """
+    def __init__(self, cores=None, priority=None, lock_memory=True,
+                 manage_gc=True):
+
+        self.cores = cores
+        self.priority = priority
+        self.lock_memory = lock_memory
+        self.manage_gc = manage_gc
+
+        self.log = {}
+        self.gc_collections = 0
+        self.gc_seconds = 0.
+
+        self._restore = []
+
+    def enable(self):
+        """Apply the interventions and return the log of their outcomes."""
+        if self.cores is not None:
+            self.log["affinity"] = self.set_affinity(self.cores)
+        if self.priority is not None:
+            self.log["scheduler"] = self.set_priority(self.priority)
+        if self.lock_memory:
+            self.log["mlockall"] = self.lock_all_memory()
+        if self.manage_gc:
+            self.log["gc"] = self.freeze_gc()
+        return self.log
+
+    def disable(self):
+        """Undo the interventions, in reverse order."""
+        while self._restore:
+            restore = self._restore.pop()
+            try:
+                restore()
+            except OSError:
+                pass
+
+    def set_affinity(self, cores):
+
+        if not hasattr(os, "sched_setaffinity"):
+            return "unsupported"
+        try:
+            previous = os.sched_getaffinity(0)
+            os.sched_setaffinity(0, cores)
+        except OSError as err:
+            return f"failed: {err}"
+        self._restore.append(lambda: os.sched_setaffinity(0, previous))
+        return "cores " + ",".join(str(c) for c in sorted(cores))
+
+    def set_priority(self, priority):
+
+        if hasattr(os, "sched_setscheduler"):
+            try:
+                policy = os.sched_getscheduler(0)
+                param = os.sched_getparam(0)
+                os.sched_setscheduler(0, os.SCHED_FIFO,
+                                      os.sched_param(priority))
+                self._restore.append(
+                    lambda: os.sched_setscheduler(0, policy, param)
+                )
+                return f"SCHED_FIFO priority {priority}"
+            except OSError as err:
+                fifo_err = err
+        else:
+            fifo_err = "unsupported"
+
+        # Without permission for a real-time policy, lower the niceness
+        try:
+            previous = os.getpriority(os.PRIO_PROCESS, 0)
+            for niceness in range(-20, previous):
+                try:
+                    os.setpriority(os.PRIO_PROCESS, 0, niceness)
+                    break
+                except OSError:
+                    continue
+            else:
+                return f"failed: {fifo_err}; niceness unchanged"
+        except AttributeError:
+            return f"failed: {fifo_err}"
+        self._restore.append(
+            lambda: os.setpriority(os.PRIO_PROCESS, 0, previous)
+        )
+        return f"niceness {niceness} (SCHED_FIFO failed: {fifo_err})"
+
+    def lock_all_memory(self):
+
+        try:
+            libc = _libc()
+            mlockall = libc.mlockall
+        except (OSError, AttributeError, TypeError):
+            return "unsupported"
+        if mlockall(MCL_CURRENT):
+            return f"failed: {os.strerror(ctypes.get_errno())}"
+        self._restore.append(libc.munlockall)
+        return "locked"
+
+    def freeze_gc(self):
+
+        gc.collect()
+        gc.freeze()
+        gc.disable()
+        self._restore.append(gc.enable)
+        self._restore.append(gc.unfreeze)
+        return f"frozen {gc.get_freeze_count()} objects, automatic off"
+
+    def collect(self):
+        """Run a garbage collection (between trials) and time it."""
+        if not self.manage_gc:
+            return
+        start = time.perf_counter()
+        gc.collect()
+        self.gc_seconds += time.perf_counter() - start
+        self.gc_collections += 1
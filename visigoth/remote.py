@@ -1,6 +1,7 @@
 """PyQT GUI offering remote monitoring and control of experiment execution."""
 import sys
 import json
+import time
 import socket
 import queue
 
@@ -12,17 +13,19 @@ from matplotlib.figure import Figure
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg
 
 from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtNetwork import QAbstractSocket, QTcpSocket
 from PyQt5.QtWidgets import (QMainWindow, QWidget,
                              QSlider, QPushButton, QLabel,
                              QVBoxLayout, QHBoxLayout)
 
-from . import clientserver
+from . import clientserver, session
 from .ext.bunch import Bunch
 
 
 class RemoteApp(QMainWindow):
 
-    def __init__(self, host, trial_app=True):
+    def __init__(self, host, trial_app=True, render_hz=60, trail_length=30,
+                 transport="thread", request_hz=100, port=None, record=None):
 
         # Avoid Abort Trap when exception is raised in Python code
         # Otherwise even simple problems will be impossible to debug
@@ -43,10 +46,24 @@ class RemoteApp(QMainWindow):
         self.cmd_q = queue.Queue()
 
         self.poll_dur = 20
+        self.gui_dur = 200
+        self.render_dur = int(round(1000 / render_hz))
+        self.last_render = 0
+        self.render_pending = False
 
         self.host = host
+        self.port = port
+        self.screen_decoder = clientserver.ScreenDecoder()
+        self.transport = transport
+        self.request_hz = request_hz
         self.client = None
 
+        # Optionally log the data stream for later replay
+        if record is None:
+            self.recorder = None
+        else:
+            self.recorder = session.SessionRecorder(record)
+
         # Intialize the parameters and eyeopts
         # This is just one example of how this division is unclear
         # but it gets more obvious later
@@ -55,7 +72,7 @@ class RemoteApp(QMainWindow):
         self.local_eyeopt = Bunch(x_offset=0, y_offset=0, fix_window=3)
 
         self.main_frame = QWidget()
-        self.gaze_app = GazeApp(self)
+        self.gaze_app = GazeApp(self, trail_length)
         if trial_app:
             self.trial_app = TrialApp(self)
         else:
@@ -69,22 +86,14 @@ class RemoteApp(QMainWindow):
         if self.client is None:
             self.initialize_client()
 
-        # Ensure that we can animate the gaze
-        if self.gaze_app.axes_background is None:
-            self.gaze_app.initialize_animation()
-
-        # Get the most recent gaze position
-        # Previously we showed a "trail" of gaze positions rather
-        # than just one, which looked pretty and is more informative.
-        # It is a bit tricker so I am skipping for the moment to get things
-        # running, but worth revisiting.
-        screen_data = None
+        # Add every new gaze position to the trail; the screen is drawn
+        # separately at the render rate, however fast messages arrive.
+        # Messages are decoded (and coalesced) in the client thread.
         while True:
             try:
-                screen_data = json.loads(self.screen_q.get(block=False))
+                screen_data = self.screen_q.get(block=False)
             except queue.Empty:
                 break
-        if screen_data is not None:
             self.gaze_app.update_screen(screen_data)
 
         if self.trial_app is not None:
@@ -97,17 +106,60 @@ class RemoteApp(QMainWindow):
         # Update the GazeApp GUI elementes
         self.gaze_app.update_gui()
 
+    # ---- Message decoding (called from the client thread)
+
+    def decode_screen(self, data):
+        """Parse a screen message, with gaze as an (n, 2) array."""
+        screen_data = self.screen_decoder.decode(data)
+        gaze = np.array(screen_data["gaze"], float).reshape(-1, 2)
+        screen_data["gaze"] = gaze
+        return screen_data
+
+    def coalesce_screens(self, old, new):
+        """Merge a screen message that has not been drawn into a newer one."""
+        gaze = np.concatenate([old["gaze"], new["gaze"]])
+        new["gaze"] = gaze[-len(self.gaze_app.trail):]
+        return new
+
+    def decode_trial(self, data):
+        """Parse a trial message with the TrialApp deserializer, if any."""
+        if self.trial_app is None:
+            return data
+        deserialize = self.trial_app.deserialize_trial_data
+        if deserialize is None:
+            return data
+        return deserialize(data)
+
     def initialize_client(self):
 
         try:
 
-            # Boot up the client thread
-            self.client = clientserver.SocketClientThread(self)
-            self.client.start()
+            if self.transport == "qt":
+
+                # Connect a client that runs on the GUI event loop and
+                # fetch the params the server is currently using
+                client = QtSocketClient(self, self.port, self.request_hz)
+                try:
+                    params = json.loads(client.fetch_params())
+                except socket.error:
+                    client.close()
+                    raise
+                self.client = client
+
+                # The client now updates the display itself, so polling is
+                # only needed to keep the GUI controls current
+                self.timer.setInterval(self.gui_dur)
+
+            else:
+
+                # Boot up the client thread
+                self.client = clientserver.SocketClientThread(self, self.port)
+                self.client.start()
+
+                # Ask the server for the params it is currently using
+                self.cmd_q.put(self.client.PARAM_REQUEST)
+                params = json.loads(self.param_q.get())
 
-            # Ask the server for the params it is currently using
-            self.cmd_q.put(self.client.PARAM_REQUEST)
-            params = json.loads(self.param_q.get())
             self.p.update(params)
 
             # Update our understanding of the fix window size
@@ -119,9 +171,19 @@ class RemoteApp(QMainWindow):
             # This had to be deferred util we knew the active params
             self.gaze_app.initialize_stim_artists()
 
+            # Draw any screen that arrived along with the params
+            if self.transport == "qt":
+                self.request_render()
+
         except socket.error:
             pass
 
+    def closeEvent(self, event):
+
+        if self.recorder is not None:
+            self.recorder.close()
+        QMainWindow.closeEvent(self, event)
+
     def initialize_layout(self):
 
         main_hbox = QHBoxLayout()
@@ -138,16 +200,161 @@ class RemoteApp(QMainWindow):
         self.timer.timeout.connect(self.poll)
         self.timer.start(self.poll_dur)
 
+        # With the Qt transport, incoming messages schedule rendering
+        if self.transport != "qt":
+            self.render_timer = QTimer(self)
+            self.render_timer.timeout.connect(self.render)
+            self.render_timer.start(self.render_dur)
+
+    def request_render(self):
+        """Draw the screen now or, if that would exceed the cap, soon."""
+        if self.render_pending:
+            return
+        delay = self.last_render + self.render_dur / 1000 - time.perf_counter()
+        if delay <= 0:
+            self.render()
+        else:
+            self.render_pending = True
+            QTimer.singleShot(int(np.ceil(delay * 1000)), self.render)
+
+    def render(self):
+
+        self.render_pending = False
+
+        # A screen can arrive with the params, before the stimulus artists
+        # exist; it stays pending and is drawn on the next render
+        if self.gaze_app.plot_objects is None:
+            return
+
+        self.last_render = time.perf_counter()
+
+        # Ensure that we can animate the gaze
+        if self.gaze_app.axes_background is None:
+            self.gaze_app.initialize_animation()
+
+        self.gaze_app.draw_screen()
+
+
+class QtSocketClient(clientserver.MessageProtocol):
+    """Remote client driven by the Qt event loop instead of a thread.
+
+    Data from the server is read when the socket reports it is ready, and
+    each message is handed straight to the GUI components, so there is no
+    polling between the network and the display. Screen updates request a
+    render from the :class:`RemoteApp`, which caps the drawing rate.
+
+    The server only sends data in reply to a request, so a new request is
+    sent as soon as a screen arrives, and a timer running at ``request_hz``
+    keeps asking while the experiment is idle.
+
+    """
+    def __init__(self, remote, port=None, request_hz=100, timeout=1):
+
+        self.remote = remote
+        self.param_q = remote.param_q
+        self.recorder = remote.recorder
+        self.port = self.PORT if port is None else port
+
+        self.buffer = bytearray()
+        self.params = None
+
+        self.socket = QTcpSocket(remote)
+        self.socket.setSocketOption(QAbstractSocket.LowDelayOption, 1)
+        self.socket.connectToHost(remote.host, self.port)
+        if not self.socket.waitForConnected(int(timeout * 1000)):
+            raise socket.error(self.socket.errorString())
+        self.socket.readyRead.connect(self.read_messages)
+
+        self.timer = QTimer(remote)
+        self.timer.timeout.connect(self.request)
+        self.timer.start(int(round(1000 / request_hz)))
+
+    def send(self, kind, data=""):
+
+        self.socket.write(self.package(kind, data))
+        self.socket.flush()
+
+    def request(self):
+        """Ask the server to send us something."""
+        self.send(self.SERVER_REQUEST)
+
+    def fetch_params(self, timeout=5):
+        """Ask the server for its params and block until they arrive."""
+        self.params = None
+        self.send(self.PARAM_REQUEST)
+        deadline = time.perf_counter() + timeout
+        while self.params is None:
+            if time.perf_counter() > deadline:
+                raise socket.error("Timed out waiting for server params")
+            self.socket.waitForReadyRead(100)
+        return self.params
+
+    def read_messages(self):
+        """Parse and handle every complete message that has arrived."""
+        self.buffer.extend(bytes(self.socket.readAll()))
+        while len(self.buffer) >= self.HEADER_SIZE:
+            header = bytes(self.buffer[:self.HEADER_SIZE])
+            kind, size = self.read_header(header)
+            end = self.HEADER_SIZE + size
+            if len(self.buffer) < end:
+                break
+            data = self.buffer[self.HEADER_SIZE:end].decode("ascii")
+            del self.buffer[:end]
+            if self.recorder is not None:
+                self.recorder.record(kind, data)
+            self.handle_message(kind, data)
+
+    def handle_message(self, kind, data):
+
+        remote = self.remote
+
+        # Update gaze and stimulus information
+        if kind == self.NEW_SCREEN:
+            remote.gaze_app.update_screen(remote.decode_screen(data))
+            remote.request_render()
+            self.request()
+
+        # Update trial data
+        elif kind == self.TRIAL_DATA:
+            if remote.trial_app is not None:
+                remote.trial_app.update_figure(remote.decode_trial(data))
+
+        # Receive the params we asked for
+        elif kind == self.NEW_PARAMS:
+            self.params = data
+
+        # Send current parameters up to the server
+        elif kind == self.PARAM_REQUEST:
+            try:
+                self.send(self.NEW_PARAMS, self.param_q.get(block=False))
+            except queue.Empty:
+                self.send(self.OLD_PARAMS)
+
+    def close(self):
+
+        self.timer.stop()
+        self.socket.close()
+
 
 class GazeApp(object):
     """Component of the Remote GUI that monitors/controls eyetracking."""
-    def __init__(self, remote_app):
+    def __init__(self, remote_app, trail_length=30):
 
         self.remote_app = remote_app
         self.p = remote_app.p
         self.eyeopt = remote_app.eyeopt
         self.local_eyeopt = remote_app.local_eyeopt
 
+        # Ring buffer with the most recent gaze positions (oldest first
+        # starting from trail_index) and the latest stimulus information
+        self.trail = np.full((trail_length, 2), np.nan)
+        self.trail_index = 0
+        self.screen_stims = {}
+        self.screen_dirty = False
+
+        # Created once the params of the experiment are known
+        self.plot_objects = None
+
         fig, ax = self.initialize_figure()
         self.fig = fig
         self.ax = ax
@@ -237,7 +444,18 @@ class GazeApp(object):
                                             animated=True)
                 targets.extend([point, window])
 
-        self.plot_objects = Bunch(fix=fix, gaze=gaze, targets=targets)
+        # Fading trail of recent gaze positions, drawn as one collection
+        n_segments = len(self.trail) - 1
+        trail_colors = np.tile(mpl.colors.to_rgba("#4c72b0"), (n_segments, 1))
+        trail_colors[:, 3] = np.linspace(0, .8, n_segments)
+        trail = mpl.collections.LineCollection([],
+                                               colors=trail_colors,
+                                               linewidths=2,
+                                               capstyle="round",
+                                               animated=True)
+
+        self.plot_objects = Bunch(fix=fix, gaze=gaze, targets=targets,
+                                  trail=trail)
         self.plot_objects.update(self.create_stim_artists())
 
         for _, stim in self.plot_objects.items():
@@ -324,40 +542,70 @@ class GazeApp(object):
                 ax.draw_artist(obj)
 
     def update_screen(self, screen_data):
+        """Store the current gaze and what's on the screen for drawing."""
+        n = len(self.trail)
+        gaze = screen_data["gaze"][-n:]
+        idx = (self.trail_index + np.arange(len(gaze))) % n
+        self.trail[idx] = gaze
+        self.trail_index = (self.trail_index + len(gaze)) % n
+        self.screen_stims = screen_data["stims"]
+        self.screen_dirty = True
+
+    def draw_screen(self):
         """Re-draw the figure to show current gaze and what's on the screen."""
+        if not self.screen_dirty:
+            return
+        self.screen_dirty = False
 
-        # Update gaze position
-        gaze = np.array(screen_data["gaze"])
+        # Update gaze trail and position
         offsets = np.array([self.local_eyeopt["x_offset"],
                             self.local_eyeopt["y_offset"]])
-        gaze += offsets
-        self.plot_objects.gaze.center = gaze
+        trail = np.roll(self.trail, -self.trail_index, axis=0) + offsets
+        segments = np.stack([trail[:-1], trail[1:]], axis=1)
+        self.plot_objects.trail.set_segments(segments)
+        self.plot_objects.gaze.center = trail[-1]
 
         # Update fix window size
         self.plot_objects.fix.window.radius = self.local_eyeopt["fix_window"]
 
         # Draw stimuli on the screen
         self.fig.canvas.restore_region(self.axes_background)
+        self.ax.draw_artist(self.plot_objects["trail"])
         self.ax.draw_artist(self.plot_objects["gaze"])
 
-        for stim, pos in screen_data["stims"].items():
+        for stim, attrs in self.screen_stims.items():
             if stim in self.plot_objects:
+                artist = self.plot_objects[stim]
+                self.update_stim_artist(stim, artist, attrs)
+                self.draw_artist(self.ax, artist)
 
-                # TODO This lets us move stimulus objects around in the gaze
-                # app, but it's limited to Psychopy objects with a `pos`
-                # attribute and matplotlib objects with a `center` attribute.
-                # It would be nice if this were more flexible, but it's not
-                # trivial to link arbitrary psychopy attributes to arbitrary
-                # matplotlib attributes. Maybe this mapping could be defined
-                # somehow on our versions of the Psychopy objects?
-                # Punting on this for now -- it seems to work ok and the
-                # GazeApp display is intended to be pretty minimal anyway.
-                if pos is not None:
-                    self.plot_objects[stim].center = pos
+        self.screen_canvas.blit(self.ax.bbox)
 
-                self.draw_artist(self.ax, self.plot_objects[stim])
+    def update_stim_artist(self, name, artist, attrs):
+        """Reflect the synced attributes of a stimulus in its artist.
 
-        self.screen_canvas.blit(self.ax.bbox)
+        By default, the position is applied to artists with a ``center`` and
+        the opacity and color to individual artists. Studies can override
+        this (like :meth:`create_stim_artists`) to map other attributes.
+
+        """
+        pos = attrs.get("pos")
+        if pos is not None:
+            artist.center = pos
+
+        if not isinstance(artist, Artist):
+            return
+
+        opacity = attrs.get("opacity")
+        if opacity is not None:
+            artist.set_alpha(opacity)
+
+        # PsychoPy rgb colors range from -1 to 1
+        color = attrs.get("color")
+        if isinstance(color, list) and len(color) == 3:
+            artist.set_color(np.clip((np.asarray(color) + 1) / 2, 0, 1))
+        elif isinstance(color, str):
+            artist.set_color(color)
 
     def update_gui(self):
         """Sync the GUI elements with the current values."""
@@ -381,13 +629,23 @@ class GazeApp(object):
 
 class TrialApp(object):
     """Component of the Remote GUI that shows data from each trial."""
+
+    # Trial axis limits grow in steps of this many trials
+    trial_chunk = 50
+
     def __init__(self, remote_app):
 
         self.remote_app = remote_app
 
+        # Persistent artists, defined by the default figure, that are drawn
+        # by blitting (a list of artists for each axes)
+        self.artists = None
+        self.drawn = False
+
         fig, axes = self.initialize_figure()
         fig_canvas = FigureCanvasQTAgg(fig)
         fig_canvas.setParent(remote_app.main_frame)
+        fig_canvas.mpl_connect("draw_event", self.draw_artists)
 
         self.fig = fig
         self.axes = axes
@@ -408,6 +666,22 @@ class TrialApp(object):
 
     # However, note that the remote.py file should define
     # `initialize_trial_figure` and `update_trial_figure`, not the names here.
+    # It can also define `deserialize_trial_data`, which is called on the
+    # client thread so that parsing does not block the GUI.
+
+    def deserialize_trial_data(self, trial_data):
+        """Convert serialized trial data into the object used for plotting.
+
+        This method can be overloaded in a study-specific remote.py file to
+        match the server-side `Experiment.serialize_trial_info` method. It is
+        called from the network thread, not the GUI thread, and the return
+        value is passed to :meth:`TrialApp.update_figure`.
+
+        The default handles the json from a pandas Series, which is a flat
+        mapping of fields to values, and returns a dict.
+
+        """
+        return json.loads(trial_data)
 
     def initialize_figure(self):
         """Set up the figure and axes for trial data.
@@ -421,21 +695,44 @@ class TrialApp(object):
         fig = Figure((5, 5), dpi=100, facecolor="white")
         axes = [fig.add_subplot(3, 1, i) for i in range(1, 4)]
 
-        axes[0].set(ylim=(-.1, 1.1),
+        axes[0].set(xlim=(.5, self.trial_chunk + .5),
+                    ylim=(-.1, 1.1),
                     yticks=[0, 1],
                     yticklabels=["No", "Yes"],
                     ylabel="Responded")
 
-        axes[1].set(ylim=(-.1, 1.1),
+        axes[1].set(xlim=(.5, self.trial_chunk + .5),
+                    ylim=(-.1, 1.1),
                     yticks=[0, 1],
                     yticklabels=["No", "Yes"],
                     ylabel="Correct")
 
-        axes[2].set(ylim=(0, None),
+        axes[2].set(ylim=(0, 5),
                     xlabel="RT (s)")
 
         fig.subplots_adjust(.15, .125, .95, .95)
 
+        # Create artists once and update their data on each trial.
+        # They are animated, so they are drawn on top after full canvas
+        # draws. Between those, only the newest data are drawn and blitted:
+        # points are only ever added and bars only ever grow taller.
+        resp_line, = axes[0].plot([], [], "ko", animated=True)
+        cor_line, = axes[1].plot([], [], "ko", animated=True)
+        self.new_points = [axes[0].plot([], [], "ko", animated=True)[0],
+                           axes[1].plot([], [], "ko", animated=True)[0]]
+
+        self.rt_bins = np.arange(0, 5.2, .2)
+        self.rt_counts = np.zeros(len(self.rt_bins) - 1, int)
+        rt_bars = axes[2].bar(self.rt_bins[:-1], self.rt_counts, .2,
+                              facecolor=".1", edgecolor="w", linewidth=.5,
+                              animated=True)
+
+        self.artists = [[resp_line], [cor_line], list(rt_bars)]
+
+        # Columns are trial, responded, and correct
+        self.trial_values = np.full((self.trial_chunk, 3), np.nan)
+        self.n_trials = 0
+
         return fig, axes
 
     def update_figure(self, trial_data):
@@ -446,31 +743,88 @@ class TrialApp(object):
 
         Parameters
         ----------
-        trial_data : serialized object
-            The data has whatever format is defined in the server-side
-            `Experiment.serialize_trial_info` method. By default this is
-            a pandas.Series in json, but it can be made study specific
-            if you need a more complex representation of each trial's data.
+        trial_data : deserialized object
+            The data from the server-side `Experiment.serialize_trial_info`
+            method, as returned by :meth:`TrialApp.deserialize_trial_data`.
+            By default this is a dict with the fields of a pandas.Series.
 
         """
-        # Note that we need to handle deserialization here
-        # This allows support for study-specific formats of trial_data.
-        # The easiest thing to do is to have it be a Pandas Series.
-        trial_data = pd.read_json(trial_data, typ="series")
-
-        # Create a new full dataset
         self.trial_data.append(trial_data)
-        trial_df = pd.DataFrame(self.trial_data)
+
+        # A study figure that only overloads `initialize_trial_figure` does
+        # not have the persistent artists, so redraw it fully on each trial
+        if self.artists is None:
+            self.redraw_figure()
+            return
+
+        def as_float(val):
+            return np.nan if val is None else float(val)
+
+        # Store the new values, doubling the array when it is full
+        if self.n_trials == len(self.trial_values):
+            self.trial_values = np.concatenate(
+                [self.trial_values, np.full_like(self.trial_values, np.nan)]
+            )
+        trial_values = self.trial_values[self.n_trials]
+        trial_values[:] = [as_float(trial_data.get(key))
+                           for key in ["trial", "responded", "correct"]]
+        self.n_trials += 1
+        values = self.trial_values[:self.n_trials]
 
         # Get direct references to the different axes
         # Note dependence on how the figure is specified in the
         # `initialize_figure` method.
         resp_ax, cor_ax, rt_ax = self.axes
+        (resp_line,), (cor_line,), rt_bars = self.artists
+
+        # Update valid/invalid and correct/incorrect responses
+        resp_line.set_data(values[:, 0], values[:, 1])
+        cor_line.set_data(values[:, 0], values[:, 2])
+
+        new_resp, new_cor = self.new_points
+        new_resp.set_data(values[-1:, 0], values[-1:, 1])
+        new_cor.set_data(values[-1:, 0], values[-1:, 2])
+        changed = [(resp_ax, new_resp), (cor_ax, new_cor)]
+
+        # Add the RT to the histogram
+        rt = as_float(trial_data.get("rt"))
+        bins, counts = self.rt_bins, self.rt_counts
+        if bins[0] <= rt <= bins[-1]:
+            idx = min(np.searchsorted(bins, rt, "right") - 1, len(counts) - 1)
+            counts[idx] += 1
+            rt_bars[idx].set_height(counts[idx])
+            changed.append((rt_ax, rt_bars[idx]))
+
+        # Grow the axis limits in chunks, which needs a full redraw
+        redraw = not self.drawn
+
+        trial = trial_values[0]
+        if trial > resp_ax.get_xlim()[1]:
+            xmax = np.ceil(trial / self.trial_chunk) * self.trial_chunk + .5
+            resp_ax.set_xlim(.5, xmax)
+            cor_ax.set_xlim(.5, xmax)
+            redraw = True
+
+        if counts.max() + 1 > rt_ax.get_ylim()[1]:
+            rt_ax.set_ylim(0, np.ceil((counts.max() + 1) / 10) * 10)
+            redraw = True
+
+        # Otherwise draw only the new data on the axes that changed
+        if redraw:
+            self.fig_canvas.draw()
+        else:
+            for ax, artist in changed:
+                ax.draw_artist(artist)
+                self.fig_canvas.blit(ax.bbox)
+
+    # ---- Drawing methods
+
+    def redraw_figure(self):
+        """Plot all of the trial data from scratch and draw the canvas."""
+        trial_df = pd.DataFrame(self.trial_data)
 
-        # We are taking the approach of creating new artists on each trial,
-        # drawing them, then removing them before adding the next trial's data.
-        # Another approach would be to keep around references to the artists
-        # and update their data using the appropriate matplotlib methods.
+        # Get direct references to the different axes
+        resp_ax, cor_ax, rt_ax = self.axes
 
         # Draw valid and invalid responses
         resp_line, = resp_ax.plot(trial_df.trial, trial_df.responded, "ko")
@@ -490,13 +844,22 @@ class TrialApp(object):
         # Draw the canvas to show the new data
         self.fig_canvas.draw()
 
-        # By removing the stimulus artists after drawing the canvas,
-        # we are in effect clearing before drawing the new data on
-        # the *next* trial.
+        # By removing the artists after drawing the canvas, we are in effect
+        # clearing before drawing the new data on the *next* trial.
         resp_line.remove()
         cor_line.remove()
         rt_bars.remove()
 
+    def draw_artists(self, event=None):
+        """Draw the persistent artists after a full draw of the canvas."""
+        if self.artists is None:
+            return
+
+        for ax, artists in zip(self.axes, self.artists):
+            for artist in artists:
+                ax.draw_artist(artist)
+        self.drawn = True
+
 
 class ParamSlider(object):
     """Simple wrapper around a PyQT slider object, since we have a few."""
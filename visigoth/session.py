@@ -0,0 +1,177 @@
+"""Recording and replay of the data stream from the experiment server."""
+from __future__ import division
+import time
+import json
+import queue
+import struct
+import threading
+
+from . import clientserver
+from .ext.bunch import Bunch
+
+
+MAGIC = b"VGSESSION1"
+FILE_HEADER = struct.Struct("<d")
+RECORD_HEADER = struct.Struct("<dBI")
+
+
+class SessionRecorder(object):
+    """Append every message received from the server to a binary log.
+
+    The file starts with a magic string and the wall-clock time recording
+    started. Each message is then stored as its receive time (in seconds
+    since the recording started), kind, and payload size, followed by the
+    raw payload, so nothing is parsed while recording.
+
+    """
+    def __init__(self, fname):
+
+        self.fname = fname
+        self.lock = threading.Lock()
+        self.fid = open(fname, "wb")
+        self.fid.write(MAGIC)
+        self.fid.write(FILE_HEADER.pack(time.time()))
+        self.start = time.perf_counter()
+
+    def record(self, kind, data):
+        """Log a message with the time it was received."""
+        now = time.perf_counter() - self.start
+        payload = data.encode("ascii")
+        with self.lock:
+            if self.fid is not None:
+                self.fid.write(RECORD_HEADER.pack(now, kind, len(payload)))
+                self.fid.write(payload)
+
+    def close(self):
+
+        with self.lock:
+            if self.fid is not None:
+                self.fid.close()
+                self.fid = None
+
+
+def read_session(fname):
+    """Load a session log.
+
+    Returns
+    -------
+    start : float
+        Wall-clock time when the recording started.
+    records : list of (time, kind, data) tuples
+        Messages in the order they were received. A message that was only
+        partly written (e.g. if the remote crashed) is dropped.
+
+    """
+    with open(fname, "rb") as fid:
+        buf = fid.read()
+
+    if not buf.startswith(MAGIC):
+        raise ValueError(f"{fname} is not a visigoth session log")
+    offset = len(MAGIC)
+    start, = FILE_HEADER.unpack_from(buf, offset)
+    offset += FILE_HEADER.size
+
+    records = []
+    while offset + RECORD_HEADER.size <= len(buf):
+        t, kind, size = RECORD_HEADER.unpack_from(buf, offset)
+        offset += RECORD_HEADER.size
+        if offset + size > len(buf):
+            break
+        data = buf[offset:offset + size].decode("ascii")
+        offset += size
+        records.append((t, kind, data))
+
+    return start, records
+
+
+class SessionReplayer(threading.Thread):
+    """Serve a recorded session to a remote in place of an experiment.
+
+    A :class:`clientserver.SocketServerThread` is fed from the log as the
+    experiment would feed it, so the remote cannot tell the difference.
+    Messages are released with their original timing divided by ``speed``;
+    with ``speed=0`` each message is released as soon as the remote has
+    taken the previous one, which replays the session as fast as the remote
+    can render it.
+
+    """
+    def __init__(self, fname, speed=1, port=None):
+
+        super(SessionReplayer, self).__init__()
+
+        self.speed = speed
+        self.start_time, self.records = read_session(fname)
+
+        maxsize = 1 if not speed else 0
+        self.exp = Bunch(cmd_q=queue.Queue(),
+                         param_q=queue.Queue(),
+                         trial_q=queue.Queue(maxsize),
+                         screen_q=queue.Queue(maxsize),
+                         p=Bunch())
+
+        # The remote asks for params as soon as it connects
+        for _, kind, data in self.records:
+            if kind == clientserver.MessageProtocol.NEW_PARAMS:
+                self.exp.p = Bunch(json.loads(data))
+                break
+
+        self.server = clientserver.SocketServerThread(self.exp, port)
+        self.port = self.server.port
+
+        self.alive = threading.Event()
+        self.alive.set()
+        self.daemon = True
+
+        self.finished = False
+        self.elapsed = None
+
+    def join(self, timeout=None):
+
+        self.alive.clear()
+        threading.Thread.join(self, timeout)
+        self.server.join(timeout)
+
+    def put(self, q, data):
+
+        while self.alive.is_set():
+            try:
+                q.put(data, timeout=.1)
+                return
+            except queue.Full:
+                continue
+
+    def run(self):
+
+        self.server.start()
+        while not self.server.connected:
+            if not self.alive.is_set():
+                return
+            time.sleep(.01)
+
+        if not self.records:
+            self.finished = True
+            return
+
+        protocol = clientserver.MessageProtocol
+        first = self.records[0][0]
+        start = time.perf_counter()
+
+        for t, kind, data in self.records:
+
+            if not self.alive.is_set():
+                return
+
+            if self.speed:
+                delay = start + (t - first) / self.speed - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+
+            if kind == protocol.NEW_SCREEN:
+                self.put(self.exp.screen_q, data)
+            elif kind == protocol.TRIAL_DATA:
+                self.put(self.exp.trial_q, data)
+            elif kind == protocol.NEW_PARAMS:
+                self.exp.p = Bunch(json.loads(data))
+
+        self.elapsed = time.perf_counter() - start
+        self.finished = True
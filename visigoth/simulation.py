@@ -0,0 +1,232 @@
+"""Simulated gaze sources that stand in for the EyeLink in testing."""
+from __future__ import division
+import numpy as np
+import pandas as pd
+
+
+class GazeSource(object):
+    """Base class for simulated eyetracker backends.
+
+    Subclasses must define ``read``, which returns the gaze position (in
+    degrees) at a given time, with NaN values when the eye is closed. Sources
+    that can be sampled from a background thread set ``threadsafe`` and will
+    be polled at ``rate`` samples per second by the acquisition thread.
+
+    """
+    threadsafe = True
+
+    def __init__(self, rate=1000):
+
+        self.rate = rate
+        self._next_sample = None
+
+    def read(self, now):
+        """Return the (x, y) gaze position at time ``now``."""
+        raise NotImplementedError
+
+    def drain(self, now):
+        """Return the samples that would have arrived since the last call.
+
+        Each sample is a (timestamp, tracker time, x, y) tuple, matching the
+        format of :meth:`EyeTracker.drain_samples`. The simulated tracker
+        clock is the clock used to call this method.
+
+        """
+        step = 1 / self.rate
+        if self._next_sample is None or now < (self._next_sample - step):
+            # Start sampling or resync after the clock has been reset
+            self._next_sample = now
+
+        samples = []
+        while self._next_sample <= now:
+            t = self._next_sample
+            x, y = self.read(t)
+            samples.append((t, t, x, y))
+            self._next_sample = t + step
+        return samples
+
+
+class MouseGaze(GazeSource):
+    """Gaze simulated with the mouse; the main button simulates a blink."""
+    threadsafe = False
+
+    def __init__(self, win):
+
+        super(MouseGaze, self).__init__(rate=win.framerate)
+
+        from psychopy import event
+        self.mouse = event.Mouse(visible=False, win=win)
+
+    def read(self, now):
+
+        if self.mouse.getPressed()[0]:
+            return np.nan, np.nan
+        return tuple(self.mouse.getPos())
+
+
+class SyntheticGaze(GazeSource):
+    """Generator of realistic gaze traces for headless testing.
+
+    The simulated eye fixates a point with random drift and measurement noise,
+    makes corrective microsaccades, occasionally saccades to one of the target
+    positions (returning after a dwell period), and blinks. Events happen as
+    Poisson processes with the given rates (in events per second). Saccade
+    durations follow the main sequence and use a minimum-jerk profile.
+
+    """
+    def __init__(self, rate=1000, fix_pos=(0, 0), targets=None,
+                 drift=.1, noise=.01,
+                 microsaccade_rate=1, microsaccade_amplitude=.25,
+                 saccade_rate=0, saccade_dwell=.5,
+                 blink_rate=.2, blink_duration=.15,
+                 seed=None):
+
+        super(SyntheticGaze, self).__init__(rate)
+
+        self.fix_pos = np.asarray(fix_pos, float)
+        self.targets = [] if targets is None else list(targets)
+
+        self.drift = drift
+        self.noise = noise
+        self.microsaccade_rate = microsaccade_rate
+        self.microsaccade_amplitude = microsaccade_amplitude
+        self.saccade_rate = saccade_rate
+        self.saccade_dwell = saccade_dwell
+        self.blink_rate = blink_rate
+        self.blink_duration = blink_duration
+
+        self.rng = np.random.RandomState(seed)
+
+        self.anchor = self.fix_pos.copy()
+        self.pos = self.fix_pos.copy()
+        self.saccade = None
+        self.blink_end = -np.inf
+        self.return_time = np.inf
+        self.last_time = None
+
+    def _event(self, rate, dt):
+
+        return rate and self.rng.rand() < (1 - np.exp(-rate * dt))
+
+    def look_at(self, pos, now=None):
+        """Start a saccade to ``pos`` at time ``now`` (default: last read)."""
+        now = self.last_time if now is None else now
+        self.anchor = np.asarray(pos, float)
+        self._start_saccade(self.anchor, 0 if now is None else now)
+
+    def _start_saccade(self, end, now):
+
+        amplitude = np.linalg.norm(end - self.pos)
+        duration = (2.2 * amplitude + 21) / 1000
+        self.saccade = now, duration, self.pos.copy(), np.asarray(end, float)
+
+    def _advance(self, now):
+
+        if self.last_time is None or now < self.last_time:
+            self.last_time = now
+        dt = now - self.last_time
+        if not dt:
+            return
+        self.last_time = now
+
+        # Continue an ongoing saccade
+        if self.saccade is not None:
+            onset, duration, start, end = self.saccade
+            frac = (now - onset) / duration
+            if frac >= 1:
+                self.pos = end.copy()
+                self.saccade = None
+            else:
+                frac = 10 * frac ** 3 - 15 * frac ** 4 + 6 * frac ** 5
+                self.pos = start + (end - start) * frac
+            return
+
+        # Fixational drift, with a weak restoring force toward the anchor
+        self.pos += self.rng.randn(2) * self.drift * np.sqrt(dt)
+        self.pos += (self.anchor - self.pos) * min(1, dt)
+
+        # Return from a target to the fixation point
+        if now >= self.return_time:
+            self.return_time = np.inf
+            self.anchor = self.fix_pos.copy()
+            self._start_saccade(self.anchor, now)
+
+        # Saccade to a target
+        elif self.targets and self._event(self.saccade_rate, dt):
+            idx = self.rng.randint(len(self.targets))
+            self.anchor = np.asarray(self.targets[idx], float)
+            self.return_time = now + self.saccade_dwell
+            self._start_saccade(self.anchor, now)
+
+        # Corrective microsaccade
+        elif self._event(self.microsaccade_rate, dt):
+            theta = self.rng.uniform(0, 2 * np.pi)
+            step = self.microsaccade_amplitude / 2
+            offset = np.array([np.cos(theta), np.sin(theta)]) * step
+            self._start_saccade(self.anchor + offset, now)
+
+        # Blink
+        if now >= self.blink_end and self._event(self.blink_rate, dt):
+            self.blink_end = now + self.blink_duration
+
+    def read(self, now):
+
+        self._advance(now)
+        if now < self.blink_end:
+            return np.nan, np.nan
+        x, y = self.pos + self.rng.randn(2) * self.noise
+        return x, y
+
+
+class ReplayGaze(GazeSource):
+    """Replay of gaze positions from a recorded visigoth eye data file.
+
+    Either the ``_eyedat.csv`` (low-resolution) or ``_eyesamples.csv``
+    (full-rate) files can be used. The recording is aligned to the time of
+    the first read and loops when it reaches the end.
+
+    """
+    def __init__(self, fname, rate=None, loop=True):
+
+        data = pd.read_csv(fname)
+        if "time" in data:
+            times = data["time"].values
+        else:
+            times = data.iloc[:, 0].values
+
+        self.times = times - times[0]
+        self.positions = data[["x", "y"]].values
+        self.duration = self.times[-1]
+        self.loop = loop
+
+        if rate is None:
+            rate = 1 / np.median(np.diff(self.times))
+        super(ReplayGaze, self).__init__(rate)
+
+        self.start_time = None
+
+    def read(self, now):
+
+        if self.start_time is None:
+            self.start_time = now
+
+        t = now - self.start_time
+        if self.loop and self.duration > 0:
+            t = t % self.duration
+
+        idx = max(np.searchsorted(self.times, t, "right") - 1, 0)
+        x, y = self.positions[idx]
+        return x, y
+
+
+def create_gaze_source(exp):
+    """Return the simulated gaze source specified in the experiment params."""
+    source = exp.p.eye_simulate_source
+    if source is None or source == "mouse":
+        return MouseGaze(exp.win)
+    elif source == "synthetic":
+        return SyntheticGaze(rate=exp.p.eye_simulate_rate,
+                             fix_pos=exp.p.fix_pos,
+                             targets=exp.p.target_pos)
+    else:
+        return ReplayGaze(source)
@@ -1,11 +1,40 @@
-from .points import Point, Points  # noqa: F401
-from .fixation import FixationTask  # noqa: F401
-from .cue import LineCue, PointCue  # noqa: F401
-from .grating import Grating  # noqa: F401
-from .elementarray import ElementArray  # noqa: F401
-from .pattern import Pattern  # noqa: F401
-from .dots import RandomDotMotion, RandomDotColorMotion  # noqa: F401
-from .noise import GaussianNoise, UniformNoise  # noqa: F401
-from .dummy import DummyStim  # noqa: F401
-from .aperture import BoreAperture, StimAperture  # noqa: F401
-from .gaze import GazeStim  # noqa: F401
+import importlib
+
+# Stimulus modules are imported on first use so that using one stimulus does
+# not load the dependencies (e.g. OpenGL bindings, colorspacious) of the others
+_lazy_attrs = {
+    "Point": "points",
+    "Points": "points",
+    "FixationTask": "fixation",
+    "LineCue": "cue",
+    "PointCue": "cue",
+    "Grating": "grating",
+    "ElementArray": "elementarray",
+    "Pattern": "pattern",
+    "RandomDotMotion": "dots",
+    "RandomDotColorMotion": "dots",
+    "GaussianNoise": "noise",
+    "UniformNoise": "noise",
+    "DummyStim": "dummy",
+    "BoreAperture": "aperture",
+    "StimAperture": "aperture",
+    "GazeStim": "gaze",
+}
+
+__all__ = list(_lazy_attrs)
+
+
+def __getattr__(name):
+
+    if name not in _lazy_attrs:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    module = importlib.import_module("." + _lazy_attrs[name], __name__)
+    value = getattr(module, name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+
+    return sorted(set(globals()) | set(_lazy_attrs))
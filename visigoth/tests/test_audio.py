@@ -0,0 +1,107 @@
+import os
+import sys
+import types
+
+import numpy as np
+import pytest
+
+from .. import audio
+from ..audio import NullEngine, create_engine
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.time = 0
+
+    def getTime(self):
+        return self.time
+
+
+class TestNullEngine(object):
+
+    @pytest.fixture
+    def fname(self):
+
+        sound_dir = os.path.join(os.path.dirname(audio.__file__), "sounds")
+        return os.path.join(sound_dir, audio.SOUND_NAMES["correct"] + ".wav")
+
+    def test_load(self, fname):
+
+        engine = NullEngine(rate=22050, channels=2)
+        sound = engine.load("correct", fname)
+        assert sound.pcm.dtype == np.float32
+        assert sound.pcm.shape[1] == 2
+        assert sound.duration == len(sound.pcm) / 22050
+        assert np.abs(sound.pcm).max() <= 1
+
+    def test_onset_log(self, fname):
+
+        clock = FakeClock()
+        engine = NullEngine(clock, rate=1000, blocksize=10,
+                            output_latency=.005)
+        sound = engine.load("correct", fname)
+
+        for t in [.003, .02, .0305]:
+            clock.time = t
+            sound.play()
+
+        request = [e["request"] for e in engine.log]
+        onset = [e["onset"] for e in engine.log]
+        assert request == [.003, .02, .0305]
+        np.testing.assert_allclose(onset, [.015, .035, .045])
+        assert all(e["backend"] == "null" for e in engine.log)
+
+
+class TestCreateEngine(object):
+
+    @pytest.fixture(autouse=True)
+    def fake_psychopy_engine(self, monkeypatch):
+
+        class FakePsychoPyEngine(audio.AudioEngine):
+            backend = "psychopy"
+
+        monkeypatch.setattr(audio, "PsychoPyEngine", FakePsychoPyEngine)
+
+    def fake_sounddevice(self, monkeypatch, error):
+
+        class PortAudioError(Exception):
+            pass
+
+        def OutputStream(**kwargs):
+            raise error(PortAudioError)
+
+        module = types.ModuleType("sounddevice")
+        module.PortAudioError = PortAudioError
+        module.OutputStream = OutputStream
+        monkeypatch.setitem(sys.modules, "sounddevice", module)
+
+    def test_auto_without_sounddevice(self, monkeypatch, capsys):
+
+        monkeypatch.setitem(sys.modules, "sounddevice", None)
+        engine = create_engine("auto")
+        assert engine.backend == "psychopy"
+        assert "sounddevice unavailable" in capsys.readouterr().out
+
+    def test_auto_stream_error(self, monkeypatch, capsys):
+
+        self.fake_sounddevice(monkeypatch, lambda cls: cls("no device"))
+        engine = create_engine("auto")
+        assert engine.backend == "psychopy"
+        assert "no device" in capsys.readouterr().out
+
+    def test_auto_other_errors_raise(self, monkeypatch):
+
+        self.fake_sounddevice(monkeypatch, lambda cls: ValueError("bad"))
+        with pytest.raises(ValueError):
+            create_engine("auto")
+
+    def test_null(self):
+
+        engine = create_engine("null", device=None, latency="low")
+        assert engine.backend == "null"
+
+    def test_unknown(self):
+
+        with pytest.raises(ValueError):
+            create_engine("speakers")
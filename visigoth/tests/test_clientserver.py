@@ -0,0 +1,93 @@
+import json
+
+import numpy as np
+
+from ..clientserver import ScreenEncoder, ScreenDecoder, snapshot_stims
+from ..ext.bunch import Bunch
+
+
+class TestScreenEncoder(object):
+
+    def screens(self):
+
+        fix = Bunch(pos=np.zeros(2), color="white")
+        dots = Bunch(pos=(5, 0), color="red")
+        on_fix = [("fix", fix, ["pos", "color"])]
+        on_both = on_fix + [("dots", dots, ["pos"])]
+        for i in range(3):
+            yield snapshot_stims(on_fix)
+        for i in range(3):
+            dots.pos = (5 + i, 0)
+            yield snapshot_stims(on_both)
+        fix.color = "black"
+        yield snapshot_stims(on_fix)
+        yield snapshot_stims([])
+
+    def test_round_trip(self):
+
+        encoder = ScreenEncoder(keyframe_interval=60)
+        decoder = ScreenDecoder()
+
+        for i, snapshot in enumerate(self.screens()):
+            data = encoder.encode(i / 60, [i, 0], snapshot)
+            screen = decoder.decode(data)
+            assert screen["t"] == i / 60
+            assert screen["gaze"] == [i, 0]
+            assert screen["stims"] == snapshot
+
+    def test_changes_only(self):
+
+        encoder = ScreenEncoder(keyframe_interval=60)
+        snapshots = list(self.screens())
+        msgs = [json.loads(encoder.encode(i / 60, [0, 0], snapshot))
+                for i, snapshot in enumerate(snapshots)]
+
+        assert msgs[0]["key"]
+        assert msgs[0]["stims"] == snapshots[0]
+        assert msgs[1] == dict(t=1 / 60, gaze=[0, 0])
+        assert msgs[3]["on"] == ["fix", "dots"]
+        assert msgs[3]["stims"] == dict(dots=dict(pos=[5, 0]))
+        assert msgs[4]["stims"] == dict(dots=dict(pos=[6, 0]))
+        assert msgs[6] == dict(t=6 / 60, gaze=[0, 0], on=["fix"],
+                               stims=dict(fix=dict(color="black")))
+
+    def test_keyframes(self):
+
+        encoder = ScreenEncoder(keyframe_interval=0)
+        decoder = ScreenDecoder()
+        snapshots = list(self.screens())
+
+        # A client that joins late recovers the screen from any keyframe
+        for i, snapshot in enumerate(snapshots):
+            data = encoder.encode(i / 60, [0, 0], snapshot)
+            assert json.loads(data)["key"]
+        assert decoder.decode(data)["stims"] == snapshots[-1]
+
+        encoder.keyframe_interval = 60
+        encoder.reset()
+        assert json.loads(encoder.encode(0, [0, 0], snapshots[0]))["key"]
+
+    def test_keyframe_after_clock_reset(self):
+
+        encoder = ScreenEncoder(keyframe_interval=60)
+        snapshot = dict(fix=dict(pos=[0, 0]))
+
+        assert json.loads(encoder.encode(100, [0, 0], snapshot))["key"]
+
+        # Message times restart when the experiment clock is reset
+        for t in [0, .1, .2]:
+            msg = json.loads(encoder.encode(t, [0, 0], snapshot))
+            assert "key" not in msg
+
+        encoder.keyframe_interval = 0
+        assert json.loads(encoder.encode(.3, [0, 0], snapshot))["key"]
+
+
+class TestScreenDecoder(object):
+
+    def test_old_format(self):
+
+        data = json.dumps(dict(gaze=[1, 2], stims=dict(fix=[0, 0], cue=None)))
+        screen = ScreenDecoder().decode(data)
+        assert screen == dict(t=None, gaze=[1, 2],
+                              stims=dict(fix=dict(pos=[0, 0]), cue={}))
@@ -0,0 +1,72 @@
+import pytest
+
+pytest.importorskip("psychopy")
+
+from ..experiment import Experiment  # noqa: E402
+
+
+class FakeWindow(object):
+    """Window that records a fixed interval for each flip."""
+    framerate = 60
+    frametime = 1 / 60
+
+    def __init__(self, drops=()):
+
+        self.drops = drops
+        self.flips = 0
+        self.frameIntervals = []
+        self.recordFrameIntervals = False
+
+    def flip(self):
+
+        # Like PsychoPy, the interval ending at the first flip isn't recorded
+        if self.flips:
+            refreshes = 2 if self.flips in self.drops else 1
+            self.frameIntervals.append(refreshes * self.frametime)
+        self.flips += 1
+
+
+class TestFrameRange(object):
+
+    def run_frames(self, win, frames=10):
+
+        exp = Experiment()
+        exp.win = win
+        report = {}
+        shown = []
+        for frame, skipped in exp.frame_range(frames=frames,
+                                              yield_skipped=True,
+                                              report=report):
+            shown.append(frame)
+            win.flip()
+        return shown, report
+
+    def test_no_drops(self):
+
+        shown, report = self.run_frames(FakeWindow())
+
+        assert shown == list(range(10))
+        assert report["frames_skipped"] == []
+        assert report["frames_slippage"] == pytest.approx(0)
+
+    def test_one_dropped_frame(self):
+
+        # The flip of frame 4 lands a refresh late, so frame 5 is never seen
+        shown, report = self.run_frames(FakeWindow(drops=[4]))
+
+        assert shown == [0, 1, 2, 3, 4, 6, 7, 8, 9]
+        assert report["frames_shown"] == 9
+        assert report["frames_skipped"] == [5]
+        assert report["frames_slippage"] == pytest.approx(0)
+
+
+class TestRun(object):
+
+    def test_error_before_params(self):
+
+        class BrokenExperiment(Experiment):
+            def initialize_params(self):
+                raise IOError("no params file")
+
+        with pytest.raises(IOError, match="no params file"):
+            BrokenExperiment().run()
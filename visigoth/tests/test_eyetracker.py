@@ -0,0 +1,324 @@
+import os
+import time
+import uuid
+import hashlib
+import multiprocessing as mp
+
+import numpy as np
+import pytest
+
+pytest.importorskip("psychopy")
+
+from .. import eyetracker  # noqa: E402
+from ..eyetracker import (EyeTracker, GazeBuffer,  # noqa: E402
+                          GazeEventDetector, FixationMonitor, EDFTransfer,
+                          TransferLock, wait_for_transfers)
+from ..simulation import SyntheticGaze  # noqa: E402
+from ..ext.bunch import Bunch  # noqa: E402
+
+
+class FakeTracker(object):
+    """Stand-in for a pylink EyeLink connection."""
+    def __init__(self, data=b"EDF" * 1000, receiving=None, release=None):
+
+        self.data = data
+        self.receiving = receiving
+        self.release = release
+        self.calls = []
+
+    def __getattr__(self, name):
+
+        def method(*args):
+            self.calls.append(name)
+        return method
+
+    def receiveDataFile(self, host_edf, fname):
+
+        self.calls.append("receiveDataFile")
+        if self.receiving is not None:
+            self.receiving.set()
+            self.release.wait(10)
+        with open(fname, "wb") as fid:
+            fid.write(self.data)
+
+
+def receive_in_process(host, fname, receiving, release):
+
+    eyetracker.pylink = Bunch(msecDelay=lambda ms: None)
+    tracker = FakeTracker(receiving=receiving, release=release)
+    transfer = EDFTransfer(tracker, "eyedat.EDF", fname, TransferLock(host),
+                           report_interval=60)
+    transfer.start()
+
+
+class Clock(object):
+
+    def __init__(self):
+        self.start = time.perf_counter()
+
+    def getTime(self):
+        return time.perf_counter() - self.start
+
+
+class TestGazeBuffer(object):
+
+    def test_last(self):
+
+        buffer = GazeBuffer(size=8)
+        assert buffer.last(4).shape == (0, 4)
+
+        for i in range(20):
+            buffer.append((i, i, 0, 0))
+
+        np.testing.assert_array_equal(buffer.last(3)[:, 0], [17, 18, 19])
+        np.testing.assert_array_equal(buffer.last(20)[:, 0], np.arange(13, 20))
+        np.testing.assert_array_equal(buffer.latest(), [19, 19, 0, 0])
+
+
+class TestGazeAcquisition(object):
+
+    @pytest.fixture
+    def exp(self, tmpdir):
+
+        p = Bunch(eye_host_address="100.1.1.1",
+                  eye_simulate=False,
+                  eye_simulate_source="synthetic",
+                  eye_simulate_rate=1000,
+                  eye_background_transfer=True,
+                  eye_acquisition_thread=True,
+                  eye_buffer_size=256,
+                  eye_saccade_velocity=30,
+                  eye_saccade_acceleration=9500,
+                  eye_saccade_min_duration=.01,
+                  save_data=True,
+                  fix_radius=2,
+                  fix_pos=(0, 0),
+                  target_pos=[(-5, 0), (5, 0)])
+        win = Bunch(monitor=None, size=(800, 600))
+        return Bunch(p=p, win=win, clock=Clock(),
+                     output_stem=str(tmpdir.join("run")))
+
+    def test_sample_log(self, exp):
+
+        tracker = EyeTracker(exp)
+        tracker.start_run()
+        time.sleep(.3)
+        tracker.shutdown()
+
+        samples = np.genfromtxt(exp.output_stem + "_eyesamples.csv",
+                                delimiter=",", names=True)
+        assert samples.dtype.names == ("time", "tracker_time", "x", "y")
+        assert len(samples) > 200
+        assert len(samples) == tracker.buffer.count
+        assert np.all(np.diff(samples["tracker_time"]) > 0)
+
+
+class TestGazeEventDetector(object):
+
+    rate = 1000
+
+    def run_detector(self, positions, detector=None):
+
+        if detector is None:
+            detector = GazeEventDetector(velocity_threshold=30,
+                                         acceleration_threshold=9500)
+        states = []
+        for i, (x, y) in enumerate(positions):
+            states.append(detector.update(i / self.rate, x, y))
+        return detector, states
+
+    def saccades(self, detector):
+
+        return [e for e in detector.events if e.kind == "saccade"]
+
+    def test_fixation_noise(self):
+
+        rng = np.random.RandomState(0)
+        positions = rng.normal(0, .01, (10 * self.rate, 2))
+        detector, states = self.run_detector(positions)
+
+        assert not self.saccades(detector)
+        assert np.mean(np.equal(states, "saccade")) < .001
+        assert detector.current == ("fixation", 0)
+
+    def test_fixation_drift(self):
+
+        source = SyntheticGaze(self.rate, microsaccade_rate=0, blink_rate=0,
+                               seed=0)
+        positions = [source.read(i / self.rate)
+                     for i in range(10 * self.rate)]
+        detector, _ = self.run_detector(positions)
+
+        assert not self.saccades(detector)
+
+    def test_saccade(self):
+
+        source = SyntheticGaze(self.rate, microsaccade_rate=0, blink_rate=0,
+                               seed=0)
+        positions = []
+        for i in range(self.rate):
+            t = i / self.rate
+            if i == 500:
+                source.look_at((8, 0), t)
+            positions.append(source.read(t))
+        detector, _ = self.run_detector(positions)
+
+        saccade, = self.saccades(detector)
+        assert saccade.onset == pytest.approx(.5, abs=.003)
+        assert saccade.offset - saccade.onset == pytest.approx(.038, abs=.005)
+        assert saccade.end_pos[0] == pytest.approx(8, abs=.1)
+
+        fixation = detector.events[0]
+        assert fixation.kind == "fixation"
+        assert fixation.offset == saccade.onset
+
+    def test_blink(self):
+
+        positions = np.zeros((300, 2))
+        positions[100:200] = np.nan
+        detector, states = self.run_detector(positions)
+
+        kinds = [e.kind for e in detector.events]
+        assert kinds == ["fixation", "blink"]
+        assert states[150] == "blink"
+        assert detector.current == ("fixation", .2)
+
+    def test_saccade_onset(self):
+
+        detector = GazeEventDetector()
+        x = np.r_[np.zeros(100), np.linspace(0, 5, 30), np.full(100, 5)]
+        for i, x_i in enumerate(x):
+            detector.update(i / self.rate, x_i, 0)
+            if i == 115:
+                assert detector.saccade_onset(i / self.rate) is not None
+
+        onset = self.saccades(detector)[0].onset
+        assert detector.saccade_onset(.135) == onset
+        assert detector.saccade_onset(.2) is None
+
+
+class TestFixationMonitor(object):
+
+    def run_monitor(self, gaze, allow_blinks=True, rate=100):
+
+        monitor = FixationMonitor(fixbreak_timeout=.1, blink_timeout=.3)
+        held = [monitor.update(i / rate, g, (0, 0), 1, allow_blinks)
+                for i, g in enumerate(gaze)]
+        return monitor, held
+
+    def test_fixation(self):
+
+        monitor, held = self.run_monitor([(0, 0), (.5, .5), (0, -.9)])
+        assert all(held)
+        assert monitor.state == "fixating"
+        assert monitor.stats()["fix_samples"] == 3
+
+    def test_break(self):
+
+        monitor, held = self.run_monitor([(0, 0), (2, 0)], allow_blinks=False)
+        assert held == [True, False]
+        assert monitor.state == "broken"
+        assert monitor.stats()["fix_breaks"] == 1
+
+    def test_blink(self):
+
+        nan = (np.nan, np.nan)
+        gaze = [(0, 0)] * 5 + [(1.5, 0)] * 2 + [nan] * 20 + [(0, 0)] * 5
+        monitor, held = self.run_monitor(gaze)
+        assert all(held)
+
+        stats = monitor.stats()
+        assert stats["fix_blinks"] == 1
+        assert stats["fix_excursions"] == 1
+        assert stats["fix_blink_time"] == pytest.approx(.2)
+        assert stats["fix_excursion_time"] == pytest.approx(.02)
+        assert stats["fix_breaks"] == 0
+
+        monitor, held = self.run_monitor(gaze, allow_blinks=False)
+        assert not held[5]
+
+    def test_long_blink(self):
+
+        gaze = [(0, 0)] * 5 + [(np.nan, np.nan)] * 40
+        monitor, held = self.run_monitor(gaze)
+        assert held.index(False) == 34
+        assert monitor.state == "broken"
+
+    def test_long_excursion(self):
+
+        gaze = [(0, 0)] * 5 + [(1.5, 0)] * 20
+        monitor, held = self.run_monitor(gaze)
+        assert held.index(False) == 14
+
+    def test_reset_stats(self):
+
+        monitor, _ = self.run_monitor([(0, 0), (np.nan, np.nan)])
+        monitor.reset_stats()
+        assert monitor.stats() == dict(fix_samples=0, fix_blinks=0,
+                                       fix_blink_time=0, fix_excursions=0,
+                                       fix_excursion_time=0, fix_breaks=0)
+
+
+class TestEDFTransfer(object):
+
+    @pytest.fixture
+    def host(self):
+
+        host = "test-" + uuid.uuid4().hex
+        yield host
+        os.remove(TransferLock(host).fname)
+
+    @pytest.fixture(autouse=True)
+    def fake_pylink(self, monkeypatch):
+
+        monkeypatch.setattr(eyetracker, "pylink",
+                            Bunch(msecDelay=lambda ms: None))
+
+    def test_transfer(self, tmpdir, host):
+
+        tracker = FakeTracker()
+        fname = str(tmpdir.join("run_eyedat.edf"))
+        transfer = EDFTransfer(tracker, "eyedat.EDF", fname,
+                               TransferLock(host), report_interval=60)
+        transfer.start()
+        wait_for_transfers(host, timeout=5)
+
+        assert not transfer.is_alive()
+        assert transfer.error is None
+        assert tracker.calls == ["stopRecording", "setOfflineMode",
+                                 "closeDataFile", "receiveDataFile", "close"]
+
+        with open(fname, "rb") as fid:
+            assert fid.read() == tracker.data
+        assert not os.path.exists(fname + ".part")
+
+        checksum = hashlib.md5(tracker.data).hexdigest()
+        assert transfer.checksum == checksum
+        with open(fname + ".md5") as fid:
+            assert fid.read().split()[0] == checksum
+
+    def test_transfer_lock_across_processes(self, tmpdir, host):
+
+        ctx = mp.get_context("spawn")
+        receiving, release = ctx.Event(), ctx.Event()
+        fname = str(tmpdir.join("run_eyedat.edf"))
+        proc = ctx.Process(target=receive_in_process,
+                           args=(host, fname, receiving, release))
+        proc.start()
+
+        try:
+            assert receiving.wait(30)
+            assert not TransferLock(host).acquire(block=False)
+            with pytest.raises(RuntimeError):
+                wait_for_transfers(host, timeout=.2)
+        finally:
+            release.set()
+
+        wait_for_transfers(host, timeout=10)
+        proc.join(10)
+        assert proc.exitcode == 0
+        assert os.path.exists(fname)
+
+        lock = TransferLock(host)
+        assert lock.acquire(block=False)
+        lock.release()
@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+from ..headless import VsyncClock, HeadlessWindow, NullWindowError
+from ..ext.bunch import Bunch
+
+
+class TestVsyncClock(object):
+
+    def test_next_vsync(self):
+
+        clock = VsyncClock(frametime=.01)
+        assert clock.next_vsync() == pytest.approx(.01)
+        assert clock.next_vsync() == pytest.approx(.02)
+
+        clock.wait(.005)
+        assert clock.next_vsync() == pytest.approx(.03)
+
+        # A wait that overruns a refresh lands on the following one
+        clock.wait(.015)
+        assert clock.next_vsync() == pytest.approx(.05)
+
+    def test_reset(self):
+
+        clock = VsyncClock(frametime=.01)
+        clock.wait(2)
+        clock.reset()
+        assert clock.getTime() == 0
+
+        clock.wait_until(.5)
+        assert clock.getTime() == pytest.approx(.5)
+        clock.wait_until(.1)
+        assert clock.getTime() == pytest.approx(.5)
+
+
+class TestHeadlessWindow(object):
+
+    def null_window(self):
+
+        return HeadlessWindow(VsyncClock(), 100, (800, 600), None)
+
+    def test_flip(self):
+
+        win = self.null_window()
+        flips = [win.flip() for _ in range(5)]
+        np.testing.assert_allclose(flips, np.arange(1, 6) / 100)
+        assert win.clock.getTime() == pytest.approx(.05)
+        assert len(win.frame_costs) == 5
+
+    def test_frame_intervals(self):
+
+        win = self.null_window()
+        win.flip()
+
+        # As in PsychoPy, the first interval after enabling is not recorded
+        win.recordFrameIntervals = True
+        win.flip()
+        win.flip()
+        win.clock.wait(.015)
+        win.flip()
+        np.testing.assert_allclose(win.frameIntervals, [.01, .02])
+
+        win.recordFrameIntervals = False
+        win.flip()
+        assert len(win.frameIntervals) == 2
+
+    def test_null_attributes(self):
+
+        win = self.null_window()
+        np.testing.assert_array_equal(win.size, [800, 600])
+        assert win.units == "deg"
+
+        with pytest.raises(NullWindowError):
+            win.winHandle
+        assert not hasattr(win, "winHandle")
+
+    def test_wrapped_attributes(self):
+
+        flips = []
+        inner = Bunch(units="norm", flip=lambda clear: flips.append(clear))
+        win = HeadlessWindow(VsyncClock(), 60, (800, 600), None, win=inner)
+
+        assert win.units == "norm"
+        win.units = "deg"
+        assert inner.units == "deg"
+
+        win.recordFrameIntervals = True
+        assert "recordFrameIntervals" not in inner
+
+        win.flip()
+        assert flips == [True]
+
+    def test_cost_summary(self):
+
+        win = self.null_window()
+        for _ in range(10):
+            win.flip()
+        summary = win.cost_summary()
+        assert summary["headless_frames"] == 10
+        assert summary["headless_frame_overruns"] == 0
+        assert summary["headless_speedup"] > 1
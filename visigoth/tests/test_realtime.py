@@ -0,0 +1,125 @@
+import os
+import gc
+
+import pytest
+
+from .. import realtime
+from ..realtime import RealtimeMode
+
+
+class FakeLibc(object):
+
+    def __init__(self, result):
+
+        self.result = result
+        self.calls = []
+
+    def mlockall(self, flags):
+        self.calls.append(("mlockall", flags))
+        return self.result
+
+    def munlockall(self):
+        self.calls.append(("munlockall",))
+        return 0
+
+
+class TestRealtimeMode(object):
+
+    @pytest.fixture(autouse=True)
+    def restore_gc(self):
+
+        yield
+        gc.unfreeze()
+        gc.enable()
+
+    def test_affinity_unsupported(self, monkeypatch):
+
+        monkeypatch.delattr(os, "sched_setaffinity", raising=False)
+        mode = RealtimeMode(cores=[0], lock_memory=False, manage_gc=False)
+        assert mode.enable() == dict(affinity="unsupported")
+
+    def test_priority_falls_back_to_niceness(self, monkeypatch):
+
+        def sched_setscheduler(pid, policy, param):
+            raise PermissionError("Operation not permitted")
+
+        niceness = []
+
+        def setpriority(which, who, value):
+            if value < -5:
+                raise PermissionError("Permission denied")
+            niceness.append(value)
+
+        monkeypatch.setattr(os, "sched_getscheduler", lambda pid: 0,
+                            raising=False)
+        monkeypatch.setattr(os, "sched_getparam", lambda pid: None,
+                            raising=False)
+        monkeypatch.setattr(os, "sched_setscheduler", sched_setscheduler,
+                            raising=False)
+        monkeypatch.setattr(os, "getpriority", lambda which, who: 0)
+        monkeypatch.setattr(os, "setpriority", setpriority)
+
+        mode = RealtimeMode(priority=50, lock_memory=False, manage_gc=False)
+        log = mode.enable()
+        assert log["scheduler"].startswith("niceness -5 (SCHED_FIFO failed")
+        assert niceness == [-5]
+
+        mode.disable()
+        assert niceness == [-5, 0]
+
+    def test_priority_unchanged(self, monkeypatch):
+
+        def setpriority(which, who, value):
+            raise PermissionError("Permission denied")
+
+        monkeypatch.delattr(os, "sched_setscheduler", raising=False)
+        monkeypatch.setattr(os, "getpriority", lambda which, who: 0)
+        monkeypatch.setattr(os, "setpriority", setpriority)
+
+        mode = RealtimeMode(priority=50, lock_memory=False, manage_gc=False)
+        assert mode.enable() == dict(
+            scheduler="failed: unsupported; niceness unchanged"
+        )
+
+    def test_lock_memory(self, monkeypatch):
+
+        libc = FakeLibc(0)
+        monkeypatch.setattr(realtime, "_libc", lambda: libc)
+
+        mode = RealtimeMode(manage_gc=False)
+        assert mode.enable() == dict(mlockall="locked")
+        mode.disable()
+        assert libc.calls == [("mlockall", realtime.MCL_CURRENT),
+                              ("munlockall",)]
+
+    def test_lock_memory_failed(self, monkeypatch):
+
+        libc = FakeLibc(-1)
+        monkeypatch.setattr(realtime, "_libc", lambda: libc)
+
+        mode = RealtimeMode(manage_gc=False)
+        assert mode.enable()["mlockall"].startswith("failed")
+        mode.disable()
+        assert libc.calls == [("mlockall", realtime.MCL_CURRENT)]
+
+    def test_lock_memory_unsupported(self, monkeypatch):
+
+        def no_libc():
+            raise OSError("libc not found")
+
+        monkeypatch.setattr(realtime, "_libc", no_libc)
+        mode = RealtimeMode(manage_gc=False)
+        assert mode.enable() == dict(mlockall="unsupported")
+
+    def test_manage_gc(self):
+
+        mode = RealtimeMode(lock_memory=False)
+        assert mode.enable()["gc"].startswith("frozen")
+        assert not gc.isenabled()
+
+        mode.collect()
+        assert mode.gc_collections == 1
+
+        mode.disable()
+        assert gc.isenabled()
+        assert not gc.get_freeze_count()
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ..simulation import SyntheticGaze, ReplayGaze
+
+
+class TestSyntheticGaze(object):
+
+    def test_reproducible(self):
+
+        a, b = SyntheticGaze(seed=0), SyntheticGaze(seed=0)
+        for i in range(1000):
+            t = i / 1000
+            np.testing.assert_array_equal(a.read(t), b.read(t))
+
+    def test_fixation(self):
+
+        source = SyntheticGaze(fix_pos=(2, 1), blink_rate=0, seed=0)
+        gaze = np.array([source.read(i / 1000) for i in range(5000)])
+
+        assert np.isfinite(gaze).all()
+        assert np.abs(gaze - (2, 1)).max() < 1
+
+    def test_blink(self):
+
+        source = SyntheticGaze(microsaccade_rate=0, blink_rate=1000,
+                               blink_duration=.1, seed=0)
+        gaze = np.array([source.read(i / 1000) for i in range(50)])
+        assert np.isnan(gaze[10:50]).all()
+
+    def test_look_at(self):
+
+        source = SyntheticGaze(microsaccade_rate=0, blink_rate=0, noise=0,
+                               seed=0)
+        source.read(0)
+        source.look_at((10, 0), .1)
+
+        # Main sequence duration of a 10 degree saccade is 43 ms
+        x_mid, _ = source.read(.1215)
+        assert x_mid == pytest.approx(5, abs=.2)
+        x_end, _ = source.read(.2)
+        assert x_end == pytest.approx(10, abs=.2)
+
+    def test_drain(self):
+
+        source = SyntheticGaze(rate=500, seed=0)
+        assert len(source.drain(0)) == 1
+        samples = source.drain(.101)
+        assert len(samples) == 50
+        assert samples[0][0] == pytest.approx(.002)
+
+        # Sampling restarts when the clock is reset
+        samples = source.drain(.01)
+        assert samples[0][0] == .01
+
+
+class TestReplayGaze(object):
+
+    @pytest.fixture
+    def fname(self, tmpdir):
+
+        fname = str(tmpdir.join("run_eyedat.csv"))
+        data = pd.DataFrame(dict(time=[10, 10.5, 11, 11.5, 12],
+                                 x=[0, 1, 2, np.nan, 4],
+                                 y=[0, -1, -2, np.nan, -4]))
+        data.to_csv(fname, index=False)
+        return fname
+
+    def test_replay(self, fname):
+
+        source = ReplayGaze(fname, loop=False)
+        assert source.rate == 2
+        assert source.read(3) == (0, 0)
+        assert source.read(3.7) == (1, -1)
+        assert np.isnan(source.read(4.6)).all()
+        assert source.read(20) == (4, -4)
+
+    def test_loop(self, fname):
+
+        source = ReplayGaze(fname)
+        source.read(0)
+        assert source.read(1.2) == (2, -2)
+        assert source.read(2.2) == (0, 0)
+        assert source.read(2.7) == (1, -1)
@@ -0,0 +1,121 @@
+import numpy as np
+import pytest
+
+from ..timing import Phase, Timeline
+from ..headless import VsyncClock, HeadlessWindow
+
+
+class FakeExperiment(object):
+    """Draws onto a headless window, optionally overrunning some frames."""
+    def __init__(self, late_flips=()):
+
+        self.clock = VsyncClock()
+        self.win = HeadlessWindow(self.clock, 100, (800, 600), None)
+        self.late_flips = late_flips
+        self.drawn = []
+
+    def plan(self, stims):
+        return stims
+
+    def draw(self, stims):
+
+        self.drawn.append(stims)
+        if len(self.drawn) in self.late_flips:
+            self.clock.wait(self.win.frametime)
+        self.win.flip()
+        return self.clock.getTime()
+
+
+class TestTimeline(object):
+
+    def phases(self):
+
+        return [Phase("fix", draw="fix", frames=3),
+                Phase("stim", draw=["fix", "stim"], seconds=.05),
+                Phase("resp", draw="fix", frames=2)]
+
+    def test_schedule(self):
+
+        timeline = Timeline(FakeExperiment(), self.phases())
+        assert timeline.schedule == dict(fix=0, stim=3, resp=8)
+
+        phases = self.phases()
+        phases[1] = Phase("wait", until=lambda: True)
+        timeline = Timeline(FakeExperiment(), phases)
+        assert timeline.schedule == dict(fix=0, wait=3, resp=None)
+
+    def test_run(self):
+
+        exp = FakeExperiment()
+        info = {}
+        assert Timeline(exp, self.phases()).run(info) is None
+
+        assert exp.drawn == ["fix"] * 3 + [["fix", "stim"]] * 5 + ["fix"] * 2
+        assert info["fix_frames"] == 3
+        assert info["stim_frames"] == 5
+        assert info["resp_frames"] == 2
+        assert info["stim_onset"] - info["fix_onset"] == pytest.approx(.03)
+        assert info["resp_onset"] - info["fix_onset"] == pytest.approx(.08)
+
+    def test_dropped_frame(self):
+
+        # The second stim frame lands a refresh late and the next is skipped
+        exp = FakeExperiment(late_flips=[5])
+        info = {}
+        Timeline(exp, self.phases()).run(info)
+
+        assert info["stim_frames"] == 4
+        assert info["resp_onset"] - info["fix_onset"] == pytest.approx(.08)
+
+    def test_until(self):
+
+        exp = FakeExperiment()
+        frames = []
+        phases = [Phase("wait", update=frames.append,
+                        until=lambda: len(frames) == 4 and "go"),
+                  Phase("stim", frames=2)]
+        timeline = Timeline(exp, phases)
+        info = {}
+        assert timeline.run(info) is None
+
+        assert frames == [0, 1, 2, 3]
+        assert timeline.results == dict(wait="go")
+        assert info["stim_onset"] - info["wait_onset"] == pytest.approx(.04)
+
+    def test_require(self):
+
+        exp = FakeExperiment()
+        phases = self.phases()
+        phases[1].require = lambda: len(exp.drawn) < 6
+        info = {}
+        assert Timeline(exp, phases).run(info) == "stim"
+
+        assert info["stim_frames"] == 3
+        assert "resp_frames" not in info
+
+    def test_required(self):
+
+        exp = FakeExperiment()
+        phases = [Phase("resp", frames=3, until=lambda: False, required=True),
+                  Phase("feedback", frames=2)]
+        assert Timeline(exp, phases).run() == "resp"
+        assert len(exp.drawn) == 3
+
+    def test_phase_errors(self):
+
+        with pytest.raises(ValueError):
+            Phase("fix", seconds=1, frames=60)
+        with pytest.raises(ValueError):
+            Phase("fix")
+
+    def test_empty_phase(self):
+
+        exp = FakeExperiment()
+        phases = [Phase("fix", frames=2), Phase("blank", frames=0),
+                  Phase("stim", frames=2)]
+        info = {}
+        Timeline(exp, phases).run(info)
+
+        assert np.isnan(info["blank_onset"])
+        assert info["blank_frames"] == 0
+        assert info["stim_onset"] - info["fix_onset"] == pytest.approx(.02)
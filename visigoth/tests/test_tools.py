@@ -0,0 +1,47 @@
+import numpy as np
+
+from ..tools import GazeWindows, check_gaze
+
+
+class TestGazeWindows(object):
+
+    def test_contains(self):
+
+        windows = GazeWindows([(-5, 0), (5, 0), (0, 0)], 2)
+        assert len(windows) == 3
+
+        np.testing.assert_array_equal(windows.contains((4, 1)),
+                                      [False, True, False])
+        np.testing.assert_array_equal(windows.contains((10, 10)),
+                                      [False, False, False])
+        assert not windows.contains((np.nan, np.nan)).any()
+
+    def test_matches_check_gaze(self):
+
+        centers = [(-5, 0), (5, 0), (0, 3)]
+        radii = [1, 2, 3]
+        windows = GazeWindows(centers, radii)
+
+        rng = np.random.RandomState(0)
+        for gaze in rng.uniform(-8, 8, (200, 2)):
+            expected = [check_gaze(gaze, c, r) for c, r in zip(centers, radii)]
+            np.testing.assert_array_equal(windows.contains(gaze), expected)
+
+    def test_index(self):
+
+        windows = GazeWindows([(0, 0), (1, 0)], 2)
+        assert windows.index((.8, 0)) == 0
+        assert windows.index((2.5, 0)) == 1
+        assert windows.index((10, 0)) is None
+
+    def test_radii(self):
+
+        windows = GazeWindows([(0, 0), (5, 0)], [1, 1])
+
+        windows.set_radius(1, 3)
+        np.testing.assert_array_equal(windows.radii, [1, 3])
+        assert windows.index((3, 0)) == 1
+
+        windows.radii = 6
+        np.testing.assert_array_equal(windows.radii, [6, 6])
+        assert windows.index((3, 0)) == 0
@@ -0,0 +1,97 @@
+import queue
+from multiprocessing import shared_memory
+
+import pytest
+
+from ..worker import SharedRing, ServerProcess
+from ..ext.bunch import Bunch
+
+
+class TestSharedRing(object):
+
+    @pytest.fixture
+    def ring(self):
+
+        ring = SharedRing(n_slots=4, slot_size=12)
+        yield ring
+        ring.close()
+
+    def test_fifo(self, ring):
+
+        assert ring.empty()
+        with pytest.raises(queue.Empty):
+            ring.get()
+
+        for msg in ["a", "bb", ""]:
+            ring.put(msg)
+        assert ring.qsize() == 3
+        assert [ring.get() for _ in range(3)] == ["a", "bb", ""]
+        assert ring.empty()
+
+    def test_wraparound(self, ring):
+
+        # Each slot holds 8 bytes, so messages span one to three slots
+        for i in range(20):
+            msg = chr(97 + i) * (i % 3 * 8 + 1)
+            ring.put(msg)
+            assert ring.get() == msg
+
+    def test_full(self, ring):
+
+        ring.put("x" * 20)
+        with pytest.raises(queue.Full):
+            ring.put("x" * 9, block=False)
+        with pytest.raises(queue.Full):
+            ring.put("x" * 9, timeout=.01)
+
+        ring.put("y")
+        assert ring.get() == "x" * 20
+        ring.put("z" * 16)
+        assert [ring.get(), ring.get()] == ["y", "z" * 16]
+
+    def test_oversized(self, ring):
+
+        assert ring.max_size == 32
+        ring.put("x" * 32)
+        assert ring.get() == "x" * 32
+        with pytest.raises(ValueError):
+            ring.put("x" * 33)
+        assert ring.empty()
+
+    def test_attach(self, ring):
+
+        reader = SharedRing(*ring.spec)
+        try:
+            ring.put("hello")
+            assert reader.get() == "hello"
+            assert ring.empty()
+        finally:
+            reader.close()
+
+
+class TestServerProcess(object):
+
+    def assert_unlinked(self, ring):
+
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(ring.spec[2])
+
+    def test_join_before_start(self):
+
+        server = ServerProcess(Bunch(p=Bunch()))
+        server.join(timeout=2)
+        self.assert_unlinked(server.screen_q)
+        self.assert_unlinked(server.trial_q)
+
+    def test_start_timeout(self):
+
+        server = ServerProcess(Bunch(p=Bunch()))
+        with pytest.raises(RuntimeError):
+            server.start(timeout=0)
+
+        assert not server.is_alive()
+        self.assert_unlinked(server.screen_q)
+        self.assert_unlinked(server.trial_q)
+
+        # The experiment still joins the server when it shuts down
+        server.join(timeout=2)
@@ -0,0 +1,260 @@
+"""Precise waiting and scheduling on the experiment clock."""
+from __future__ import division
+import time
+
+import numpy as np
+
+
+def measure_sleep_overshoot(n=50, duration=.001):
+    """Return how much later than requested a short sleep can wake up.
+
+    Parameters
+    ----------
+    n : int
+        Number of sleeps to time.
+    duration : float
+        Requested duration of each sleep, in seconds.
+
+    Returns
+    -------
+    overshoot : float
+        Largest observed delay (in seconds) past the requested wake time.
+
+    """
+    overshoot = np.empty(n)
+    for i in range(n):
+        start = time.perf_counter()
+        time.sleep(duration)
+        overshoot[i] = time.perf_counter() - start - duration
+    return float(overshoot.max())
+
+
+class HybridSleeper(object):
+    """Wait precisely without occupying the CPU for the whole wait.
+
+    The thread sleeps until ``margin`` seconds before the deadline, which
+    lets other threads and processes run, and then spins on the clock for
+    the final window so that waking up late is not left to the scheduler.
+
+    Parameters
+    ----------
+    clock : PsychoPy Clock, optional
+        Clock that deadlines refer to; otherwise ``time.perf_counter``.
+    margin : float, optional
+        Duration of the final spin, in seconds. If None, it is set from the
+        worst sleep overshoot measured on this machine (see
+        :func:`measure_sleep_overshoot`) plus ``safety``.
+    safety : float, optional
+        Extra spin time added to a measured margin.
+
+    """
+    def __init__(self, clock=None, margin=None, safety=.0005):
+
+        self.clock = clock
+        if margin is None:
+            margin = measure_sleep_overshoot() + safety
+        self.margin = margin
+
+    def now(self):
+        """Return the current time on the sleeper's clock."""
+        if self.clock is None:
+            return time.perf_counter()
+        return self.clock.getTime()
+
+    def wait_until(self, deadline):
+        """Return as soon as the clock reaches ``deadline``."""
+        remaining = deadline - self.now()
+        if remaining > self.margin:
+            time.sleep(remaining - self.margin)
+        while self.now() < deadline:
+            pass
+
+    def wait(self, secs):
+        """Return after ``secs`` seconds."""
+        self.wait_until(self.now() + secs)
+
+
+class Phase(object):
+    """One segment of a trial, to be run as part of a :class:`Timeline`.
+
+    Parameters
+    ----------
+    name : str
+        Name of the phase, used for the values recorded in the trial info.
+    draw : string, list of strings, or DrawPlan, optional
+        Stimuli to draw on every frame of the phase.
+    seconds : float, optional
+        Duration of the phase in real time.
+    frames : int, optional
+        Duration of the phase in screen flips.
+    update : callable, optional
+        Called with the index of the frame within the phase before each
+        frame is drawn (e.g. to move dots).
+    until : callable, optional
+        Called after each flip. When it returns a true value, the phase
+        ends early (the value is stored in :attr:`Timeline.results`) and
+        the timeline continues. Without a duration, the phase lasts until
+        this happens.
+    require : callable, optional
+        Called after each flip. When it returns a false value, the whole
+        timeline stops (e.g. when fixation is broken).
+    required : bool, optional
+        If True, the timeline stops when the phase lasts its full duration
+        without ``until`` returning a true value.
+
+    """
+    def __init__(self, name, draw=None, seconds=None, frames=None,
+                 update=None, until=None, require=None, required=False):
+
+        if seconds is not None and frames is not None:
+            raise ValueError("Must specify only one of `seconds` or `frames`")
+        if seconds is None and frames is None and until is None:
+            raise ValueError("Must specify a duration or an `until` function")
+
+        self.name = name
+        self.draw = [] if draw is None else draw
+        self.seconds = seconds
+        self.frames = frames
+        self.update = update
+        self.until = until
+        self.require = require
+        self.required = required
+
+
+class Timeline(object):
+    """Sequence of trial phases executed on an absolute frame schedule.
+
+    The duration of each phase is converted to a number of frames and its
+    stimuli are resolved into a draw plan when the timeline is created. When
+    run, every phase starts on a frame counted from the first flip of the
+    trial, rather than from when the previous phase happened to end, so
+    timing errors do not accumulate across phases. The index of each flip
+    is derived from its time, so dropped frames are skipped instead of
+    delaying the rest of the trial. Only a phase that ends early (or has no
+    fixed duration) moves the schedule of the phases after it.
+
+    Obtain with :meth:`Experiment.timeline`.
+
+    Parameters
+    ----------
+    exp : Experiment
+        Experiment with an open window.
+    phases : list of :class:`Phase`
+        Phases of the trial, in order.
+    round_func : callable, optional
+        Function used to turn a duration in seconds into a number of frames.
+    check_abort : bool, optional
+        If True, check for the abort key after each flip.
+
+    """
+    def __init__(self, exp, phases, round_func=np.floor, check_abort=False):
+
+        self.exp = exp
+        self.phases = phases
+        self.check_abort = check_abort
+
+        self.compiled = []
+        for phase in phases:
+            if phase.seconds is not None:
+                n = int(round_func(phase.seconds * exp.win.framerate))
+            else:
+                n = phase.frames
+            self.compiled.append((phase, exp.plan(phase.draw), n))
+
+        self.results = {}
+
+    @property
+    def schedule(self):
+        """Nominal first frame of each phase, relative to the first flip.
+
+        The schedule of phases after a phase without a fixed duration is
+        not known until the timeline is run, so it is None.
+
+        """
+        schedule = {}
+        frame = 0
+        for phase, _, n in self.compiled:
+            schedule[phase.name] = frame
+            if frame is not None and n is not None:
+                frame += n
+            else:
+                frame = None
+        return schedule
+
+    def run(self, info=None):
+        """Execute the timeline.
+
+        Parameters
+        ----------
+        info : dict or pandas Series, optional
+            If provided, the time of the first flip of each phase (on the
+            experiment clock, or NaN if the phase was never shown) and the
+            number of frames shown are recorded as ``<name>_onset`` and
+            ``<name>_frames``.
+
+        Returns
+        -------
+        stopped : str or None
+            Name of the phase in which the timeline stopped early, or None if
+            every phase was run.
+
+        """
+        exp = self.exp
+        draw = exp.draw
+        frametime = exp.win.frametime
+        self.results = {}
+
+        first_flip = None
+        frame = 0
+        stopped = None
+
+        for phase, plan, n in self.compiled:
+
+            start = frame
+            end = np.inf if n is None else start + n
+            update, until, require = phase.update, phase.until, phase.require
+
+            onset = np.nan
+            shown = 0
+
+            while frame < end:
+
+                if update is not None:
+                    update(frame - start)
+
+                flip_time = draw(plan)
+                if first_flip is None:
+                    first_flip = flip_time
+                if not shown:
+                    onset = flip_time
+                shown += 1
+
+                # Find the frame this flip landed on to skip dropped frames
+                landed = int(round((flip_time - first_flip) / frametime))
+                frame = max(frame, landed) + 1
+
+                if self.check_abort:
+                    exp.check_abort()
+
+                if require is not None and not require():
+                    stopped = phase.name
+                    break
+
+                if until is not None:
+                    val = until()
+                    if val:
+                        self.results[phase.name] = val
+                        break
+
+            else:
+                if phase.required:
+                    stopped = phase.name
+
+            if info is not None:
+                info[phase.name + "_onset"] = onset
+                info[phase.name + "_frames"] = shown
+
+            if stopped is not None:
+                break
+
+        return stopped
@@ -1,14 +1,10 @@
 import numpy as np
-from scipy import stats
-from scipy.spatial import distance
-
-from psychopy import core, event
 
 from .ext.bunch import Bunch
 
 
 __all__ = [
-    "AcquireFixation", "AcquireTarget",
+    "AcquireFixation", "AcquireTarget", "GazeWindows",
     "check_gaze", "flexible_values", "truncated_sample",
     "limited_repeat_sequence"
 ]
@@ -18,6 +14,9 @@ class AcquireFixation(object):
     """Handler for waiting until subject fixates to begin trial."""
     def __init__(self, exp):
 
+        from psychopy import event
+        self.event = event
+
         self.check_eye = exp.p.eye_fixation
         self.check_key = bool(exp.p.key_fixation)
 
@@ -40,7 +39,7 @@ class AcquireFixation(object):
         fixation = True
 
         if self.check_key:
-            fixation &= bool(event.getKeys(self.keylist))
+            fixation &= bool(self.event.getKeys(self.keylist))
 
         if self.check_eye:
             fixation &= self.tracker.check_fixation(self.fix_pos,
@@ -54,7 +53,11 @@ class AcquireTarget(object):
     def __init__(self, exp, correct_target=None, allow_retry=False):
         self.exp = exp
 
+        from psychopy import core, event
+        self.event = event
+
         self.clock = core.Clock()
+        self.start_time = exp.clock.getTime()
 
         self.check_eye = exp.p.eye_response
         self.check_key = exp.p.key_response
@@ -67,6 +70,8 @@ class AcquireTarget(object):
             self.fix_window = exp.p.fix_window
             self.target_pos = exp.p.target_pos
             self.target_window = exp.p.target_window
+            self.target_windows = GazeWindows(self.target_pos,
+                                              self.target_window)
             self.wait_time = self.exp.p.eye_target_wait
             self.hold_time = self.exp.p.eye_target_hold
 
@@ -85,7 +90,7 @@ class AcquireTarget(object):
         if self.check_key:
 
             # Check for a press of one of the valid keys
-            keys = event.getKeys(self.keyList, timestamped=self.clock)
+            keys = self.event.getKeys(self.keyList, timestamped=self.clock)
 
             # Handle a keypress response
             if keys:
@@ -108,7 +113,7 @@ class AcquireTarget(object):
 
         if self.check_eye:
 
-            now = self.clock.getTime()
+            now = self.exp.clock.getTime() - self.start_time
             gaze = self.tracker.read_gaze()
 
             if self.fix_break_time is None:
@@ -117,34 +122,42 @@ class AcquireTarget(object):
                     # The eye is still in the fixation window
                     return False
                 else:
-                    # The eye has just broken fixation
-                    self.fix_break_time = now
+                    # The eye has just broken fixation; use the onset of the
+                    # saccade that caused it (if any) from the online event
+                    # parser, otherwise the time of the break
+                    onset = self.tracker.detector.saccade_onset(
+                        self.start_time + now
+                    )
+                    if onset is None or onset < self.start_time:
+                        self.fix_break_time = now
+                    else:
+                        self.fix_break_time = onset - self.start_time
 
             success = False
             failure = False
 
-            for i, pos in enumerate(self.target_pos):
+            # Test all of the target windows at once
+            in_window = self.target_windows.contains(gaze)
 
-                if check_gaze(gaze, pos, self.target_window):
+            for i in np.flatnonzero(in_window):
 
-                    # Check eye has just entered a target window
-                    if self.chosen_target is None:
-                        self.chosen_target = i
-                        self.target_time = now
+                # Check eye has just entered a target window
+                if self.chosen_target is None:
+                    self.chosen_target = int(i)
+                    self.target_time = now
 
-                    # Check eye used to be on a different target and has moved
-                    elif self.chosen_target != i:
-                        failure = True
-
-                    # Check eye has successfully held first target
-                    if now > (self.target_time + self.hold_time):
-                        success = True
+                # Check eye used to be on a different target and has moved
+                elif self.chosen_target != i:
+                    failure = True
 
-                else:
+                # Check eye has successfully held first target
+                if now > (self.target_time + self.hold_time):
+                    success = True
 
-                    # Check eye is no longer holding first target
-                    if self.chosen_target == i:
-                        failure = True
+            # Check eye is no longer holding first target
+            if self.chosen_target is not None:
+                if not in_window[self.chosen_target]:
+                    failure = True
 
             # Fail if too much time has elapsed since breaking fixation
             # without landing on a target
@@ -211,10 +224,69 @@ def check_gaze(gaze, point, window):
         True if the gaze is within the window of the point.
 
     """
-    if np.isnan(gaze).any():
+    x, y = gaze
+    if x != x or y != y:
         return False
-    delta = distance.euclidean(gaze, point)
-    return delta < window
+    dx, dy = x - point[0], y - point[1]
+    return (dx * dx + dy * dy) < (window * window)
+
+
+class GazeWindows(object):
+    """Set of circular windows that are tested against gaze in one operation.
+
+    The window centers and squared radii are stored in arrays when the object
+    is created (e.g., once per trial), so checking a gaze sample against many
+    windows costs a single vectorized comparison.
+
+    """
+    def __init__(self, centers, radii):
+        """Define the windows.
+
+        Parameters
+        ----------
+        centers : list of 2 tuples
+            Center of each window, (x, y).
+        radii : float or list of floats
+            Radius of every window or of each window.
+
+        """
+        self.centers = np.asarray(centers, float).reshape(-1, 2)
+        self.radii = radii
+
+    def __len__(self):
+        return len(self.centers)
+
+    @property
+    def radii(self):
+        """Radius of each window; can be updated dynamically."""
+        return self._radii
+
+    @radii.setter
+    def radii(self, val):
+        radii = np.broadcast_to(np.asarray(val, float), (len(self),))
+        self._radii = radii.copy()
+        self._radii_sq = self._radii ** 2
+
+    def set_radius(self, idx, radius):
+        """Change the radius of a single window."""
+        self._radii[idx] = radius
+        self._radii_sq[idx] = radius ** 2
+
+    def contains(self, gaze):
+        """Return a boolean array that is True for windows containing gaze.
+
+        Missing gaze data (NaN) is not contained by any window.
+
+        """
+        delta = self.centers - gaze
+        dist_sq = delta[:, 0] ** 2 + delta[:, 1] ** 2
+        return dist_sq < self._radii_sq
+
+    def index(self, gaze):
+        """Return the index of the first window containing gaze, or None."""
+        hits = np.flatnonzero(self.contains(gaze))
+        if hits.size:
+            return int(hits[0])
 
 
 def flexible_values(val, size=None, random_state=None,
@@ -265,6 +337,7 @@ def flexible_values(val, size=None, random_state=None,
         else:
             out = random_state.choice(val, size=size)
     elif isinstance(val, tuple):
+        from scipy import stats
         rv = getattr(stats, val[0])(*val[1:])
         out = truncated_sample(rv, size, min, max, random_state=random_state)
     else:
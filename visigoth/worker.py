@@ -0,0 +1,280 @@
+"""Experiment server and trial writer running in a separate process."""
+import json
+import time
+import queue
+import struct
+import multiprocessing as mp
+from multiprocessing import shared_memory
+
+from . import clientserver
+from .ext.bunch import Bunch
+
+
+class SharedRing(object):
+    """Ring of messages in shared memory for one writer and one reader.
+
+    The block starts with the number of slots written and the number read,
+    followed by fixed-size slots. A message is stored as its length, in the
+    first slot it occupies, and its ascii payload, which continues into as
+    many consecutive slots as it needs. Only the writer advances the first
+    count and only the reader advances the second, each after it has
+    finished with the slots of a whole message, so no lock is needed. The
+    ``put`` and ``get`` methods follow the Queue API so that a ring can
+    stand in for a queue.
+
+    Parameters
+    ----------
+    n_slots : int
+        Number of slots in the ring.
+    slot_size : int
+        Size of each slot in bytes; 4 bytes less than this are available
+        for the payload.
+    name : str, optional
+        Name of an existing block to attach to, otherwise one is created.
+
+    """
+    COUNTS = struct.Struct("<QQ")
+    SIZE = struct.Struct("<I")
+
+    def __init__(self, n_slots=256, slot_size=16384, name=None):
+
+        self.n_slots = n_slots
+        self.slot_size = slot_size
+        self.chunk_size = slot_size - self.SIZE.size
+        self.owner = name is None
+
+        size = self.COUNTS.size + n_slots * slot_size
+        self.shm = shared_memory.SharedMemory(name, create=self.owner,
+                                              size=size)
+        self.buf = self.shm.buf
+        if self.owner:
+            self.COUNTS.pack_into(self.buf, 0, 0, 0)
+
+    @property
+    def spec(self):
+        """Arguments for attaching to this ring from another process."""
+        return self.n_slots, self.slot_size, self.shm.name
+
+    @property
+    def max_size(self):
+        """Size in bytes of the largest message the ring can hold."""
+        return self.n_slots * self.chunk_size
+
+    def qsize(self):
+
+        written, read = self.COUNTS.unpack_from(self.buf, 0)
+        return written - read
+
+    def empty(self):
+        return not self.qsize()
+
+    def put(self, data, block=True, timeout=None):
+        """Add a message, waiting for free slots unless ``block`` is False.
+
+        Raises ValueError if the message is larger than the whole ring.
+
+        """
+        payload = data.encode("ascii")
+        size = len(payload)
+        if size > self.max_size:
+            err = (f"Message of {size} bytes does not fit in a ring of "
+                   f"{self.max_size} bytes")
+            raise ValueError(err)
+        n = max(1, -(-size // self.chunk_size))
+
+        start = time.perf_counter()
+        while True:
+            written, read = self.COUNTS.unpack_from(self.buf, 0)
+            if written - read + n <= self.n_slots:
+                break
+            if not block or (timeout is not None
+                             and time.perf_counter() - start > timeout):
+                raise queue.Full
+            time.sleep(.001)
+
+        self.SIZE.pack_into(self.buf, self._offset(written), size)
+        for i in range(n):
+            chunk = payload[i * self.chunk_size:(i + 1) * self.chunk_size]
+            pos = self._offset(written + i) + self.SIZE.size
+            self.buf[pos:pos + len(chunk)] = chunk
+        struct.pack_into("<Q", self.buf, 0, written + n)
+
+    def get(self, block=False):
+        """Take the oldest message, raising queue.Empty if there is none."""
+        written, read = self.COUNTS.unpack_from(self.buf, 0)
+        if written == read:
+            raise queue.Empty
+
+        size, = self.SIZE.unpack_from(self.buf, self._offset(read))
+        n = max(1, -(-size // self.chunk_size))
+        chunks = []
+        for i in range(n):
+            pos = self._offset(read + i) + self.SIZE.size
+            length = min(self.chunk_size, size - i * self.chunk_size)
+            chunks.append(bytes(self.buf[pos:pos + length]))
+        struct.pack_into("<Q", self.buf, 8, read + n)
+        return b"".join(chunks).decode("ascii")
+
+    def _offset(self, count):
+
+        return self.COUNTS.size + (count % self.n_slots) * self.slot_size
+
+    def close(self):
+
+        if self.buf is None:
+            return
+        self.buf = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def serve(screen_spec, trial_spec, cmd_q, param_q, control_q,
+          connected, stop, port, bound_port, params, trial_fname):
+    """Run the experiment server; the target of the child process.
+
+    Screen messages are read by the server straight from the shared ring.
+    Trial messages are appended to ``trial_fname`` (one json object per
+    line) if given, and passed on to the server once a client connects.
+    New params from the experiment arrive on ``control_q``.
+
+    """
+    screen_q = SharedRing(*screen_spec)
+    trial_ring = SharedRing(*trial_spec)
+
+    exp = Bunch(cmd_q=cmd_q, param_q=param_q, trial_q=queue.Queue(),
+                screen_q=screen_q, p=Bunch(json.loads(params)))
+
+    server = clientserver.SocketServerThread(exp, port)
+    bound_port.value = server.port
+    server.start()
+
+    fid = None if trial_fname is None else open(trial_fname, "a")
+
+    try:
+        while not stop.is_set():
+
+            idle = True
+
+            if server.connected and not connected.is_set():
+                connected.set()
+
+            while True:
+                try:
+                    data = trial_ring.get()
+                except queue.Empty:
+                    break
+                idle = False
+                if fid is not None:
+                    fid.write(data + "\n")
+                    fid.flush()
+                if server.connected:
+                    exp.trial_q.put(data)
+
+            try:
+                exp.p = Bunch(json.loads(control_q.get(block=False)))
+                idle = False
+            except queue.Empty:
+                pass
+
+            if idle:
+                time.sleep(.005)
+
+    finally:
+        server.join(timeout=2)
+        if fid is not None:
+            fid.close()
+        screen_q.close()
+        trial_ring.close()
+
+
+class ServerProcess(object):
+    """Stand-in for :class:`clientserver.SocketServerThread` in a child process.
+
+    The socket server, the serialization of params for the remote, and the
+    writing of trial data run in a separate (spawned) process, so they do
+    not compete with the drawing loop for the GIL. The experiment puts
+    screen and trial messages into shared memory rings that are exposed
+    with the Queue API as ``screen_q`` and ``trial_q``, while the infrequent
+    param exchanges go through multiprocessing queues.
+
+    Parameters
+    ----------
+    exp : Experiment
+        Object with the params (``p``) to serve to the remote.
+    port : int, optional
+        Port to listen on; 0 picks a free port.
+    trial_fname : str, optional
+        File where the child process appends each trial message.
+
+    """
+    PARAM_REQUEST = clientserver.MessageProtocol.PARAM_REQUEST
+
+    screen_slots = 256
+    screen_slot_size = 16384
+    trial_slots = 64
+    trial_slot_size = 65536
+
+    def __init__(self, exp, port=None, trial_fname=None):
+
+        ctx = mp.get_context("spawn")
+
+        self.screen_q = SharedRing(self.screen_slots, self.screen_slot_size)
+        self.trial_q = SharedRing(self.trial_slots, self.trial_slot_size)
+        self.cmd_q = ctx.Queue()
+        self.param_q = ctx.Queue()
+        self.control_q = ctx.Queue()
+
+        self._connected = ctx.Event()
+        self._stop = ctx.Event()
+        self._port = ctx.Value("i", 0)
+        self._is_connected = False
+
+        args = (self.screen_q.spec, self.trial_q.spec,
+                self.cmd_q, self.param_q, self.control_q,
+                self._connected, self._stop, port, self._port,
+                json.dumps(exp.p), trial_fname)
+        self.process = ctx.Process(target=serve, args=args, daemon=True)
+
+    @property
+    def connected(self):
+        # The server only accepts one client, so cache once it is connected
+        if not self._is_connected:
+            self._is_connected = self._connected.is_set()
+        return self._is_connected
+
+    @property
+    def port(self):
+        return self._port.value
+
+    def is_alive(self):
+        return self.process.is_alive()
+
+    def start(self, timeout=10):
+        """Start the child process and wait until the server is listening."""
+        self.process.start()
+        start = time.perf_counter()
+        while not self._port.value:
+            if not self.process.is_alive():
+                self.join(0)
+                raise RuntimeError("Server process failed to start")
+            if time.perf_counter() - start > timeout:
+                self.join(0)
+                raise RuntimeError("Timed out waiting for the server process")
+            time.sleep(.01)
+
+    def update_params(self, p):
+        """Send the current params to serve to the remote."""
+        self.control_q.put(json.dumps(p))
+
+    def join(self, timeout=None):
+
+        # The process has no pid until it has been started
+        if self.process.pid is not None:
+            self._stop.set()
+            self.process.join(timeout)
+            if self.process.is_alive():
+                self.process.terminate()
+                self.process.join()
+        self.screen_q.close()
+        self.trial_q.close()